@@ -0,0 +1,130 @@
+"""
+Compare HTTP/1.1 and HTTP/2 connections to a TLS COmanage stand-in.
+
+Usage:
+    python benchmarks/bench_http2.py [--lookups N] [--concurrency N]
+                                     [--latency-ms MS]
+
+Serves the fake registry from `fake_comanage.py` with hypercorn over TLS,
+using a throwaway CA from trustme, and resolves `--lookups` distinct people
+through `CoManageClient` with `--concurrency` lookups in flight, first with
+`comanage_http2` off and then on. For each mode it reports wall time, lookup
+latency and the number of TCP connections the registry saw.
+
+`--server-h1-only` stops the stand-in from offering h2 during TLS negotiation,
+to check that a client with HTTP/2 enabled falls back to HTTP/1.1.
+
+Needs the http2 extra plus hypercorn and trustme:
+
+    pip install -e '.[http2]' hypercorn trustme
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import trustme
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_comanage import FakeConfig, FakeRegistry, mail_for, uid_for
+from loadgen import percentile
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.settings import settings
+
+
+async def run_mode(
+    http2: bool, registry: FakeRegistry, args: argparse.Namespace
+) -> dict[str, Any]:
+    settings.comanage_http2 = http2
+    registry.connections.clear()
+    registry.http_versions.clear()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+
+    async def lookup(client: CoManageClient, person: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await client.resolve_person_by_email_and_uid(
+                mail_for(person), uid_for(person)
+            )
+            latencies.append(time.perf_counter() - started)
+
+    async with CoManageClient() as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(lookup(client, p) for p in range(1, args.lookups + 1)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "mode": "http2" if http2 else "http1.1",
+        "negotiated": dict(registry.http_versions),
+        "connections": len(registry.connections),
+        "seconds": round(elapsed, 3),
+        "lookup_p50_ms": round(percentile(latencies, 50) * 1e3, 2),
+        "lookup_p99_ms": round(percentile(latencies, 99) * 1e3, 2),
+    }
+
+
+async def run(args: argparse.Namespace, tmp: Path) -> list[dict[str, Any]]:
+    ca = trustme.CA()
+    cert = ca.issue_cert("127.0.0.1")
+    ca.cert_pem.write_to_path(str(tmp / "ca.pem"))
+    cert.cert_chain_pems[0].write_to_path(str(tmp / "cert.pem"))
+    cert.private_key_pem.write_to_path(str(tmp / "key.pem"))
+    os.environ["SSL_CERT_FILE"] = str(tmp / "ca.pem")
+
+    registry = FakeRegistry(
+        FakeConfig(people=args.lookups, latency=args.latency_ms / 1000)
+    )
+    config = Config()
+    config.bind = [f"127.0.0.1:{args.port}"]
+    config.certfile = str(tmp / "cert.pem")
+    config.keyfile = str(tmp / "key.pem")
+    config.loglevel = "WARNING"
+    if args.server_h1_only:
+        config.alpn_protocols = ["http/1.1"]
+    stop = asyncio.Event()
+    server = asyncio.create_task(
+        serve(registry.app, config, shutdown_trigger=stop.wait)  # type: ignore[arg-type]
+    )
+    await asyncio.sleep(0.5)
+
+    settings.comanage_registry_url = f"https://127.0.0.1:{args.port}"  # type: ignore[assignment]
+    settings.comanage_rate_limit = 0
+    settings.comanage_max_connections = args.concurrency
+    settings.comanage_max_keepalive_connections = args.concurrency
+    try:
+        return [await run_mode(http2, registry, args) for http2 in (False, True)]
+    finally:
+        stop.set()
+        await server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=10)
+    parser.add_argument("--port", type=int, default=9443)
+    parser.add_argument("--server-h1-only", action="store_true")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(run(args, Path(tmp)))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
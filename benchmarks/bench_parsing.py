@@ -0,0 +1,76 @@
+"""
+Benchmark parsing of a large /co_groups.json response.
+
+Usage:
+    python benchmarks/bench_parsing.py [--groups N]
+
+Compares the original `Model.model_validate(resp.json())` decoding against
+`rems_co.comanage_api.parsing` in strict and lean mode, on a listing shaped
+like COmanage's (string ids, the full set of group fields).
+"""
+
+import argparse
+import json
+import time
+from collections.abc import Callable
+
+from rems_co.comanage_api import parsing
+from rems_co.comanage_api.models import CoGroupsResponse
+from rems_co.settings import settings
+
+
+def make_listing(n: int) -> bytes:
+    groups = [
+        {
+            "Version": "1.0",
+            "Id": str(i),
+            "CoId": "2",
+            "Name": f"urn:nbn:fi:lb-{i:08d}",
+            "Description": f"Group associated with read access to resource {i}",
+            "Open": False,
+            "Status": "Active",
+            "Created": "2024-01-01 00:00:00",
+            "Modified": "2024-01-01 00:00:00",
+            "Revision": "0",
+            "Deleted": False,
+            "ActorIdentifier": "admin",
+        }
+        for i in range(n)
+    ]
+    return json.dumps(
+        {"ResponseType": "CoGroups", "Version": "1.0", "CoGroups": groups}
+    ).encode()
+
+
+def timed(fn: Callable[[], object], repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--groups", type=int, default=20000)
+    args = parser.parse_args()
+
+    raw = make_listing(args.groups)
+
+    def original() -> list[tuple[int, str]]:
+        listing = CoGroupsResponse.model_validate(json.loads(raw))
+        return [(g.Id, g.Name) for g in listing.CoGroups]
+
+    baseline = timed(original)
+    settings.comanage_lean_parsing = False
+    strict = timed(lambda: parsing.groups(raw))
+    settings.comanage_lean_parsing = True
+    lean = timed(lambda: parsing.groups(raw))
+
+    print(f"{args.groups} groups, {len(raw) / 1e6:.1f} MB")
+    print(f"json + model_validate: {baseline * 1e3:8.2f} ms")
+    print(f"model_validate_json:   {strict * 1e3:8.2f} ms ({baseline / strict:.1f}x)")
+    print(f"lean TypedDict:        {lean * 1e3:8.2f} ms ({baseline / lean:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the group-creation policy check against the plain fnmatch loop.
+
+Usage:
+    python benchmarks/bench_policy.py [--patterns N] [--resources N]
+
+Generates URN-style patterns (mostly `prefix*`, some literals, some with `?`
+and character classes), checks that both matchers agree on every resource,
+and reports the time per decision for each. `should_create_group` is timed as
+well, since that is what every event goes through.
+"""
+
+import argparse
+import fnmatch
+import random
+import time
+
+from rems_co.service.policy import ResourcePolicy
+from rems_co.service.rems_handlers import load_resource_policy, should_create_group
+from rems_co.settings import settings
+
+
+def make_patterns(n: int, rng: random.Random) -> list[str]:
+    patterns = []
+    for i in range(n):
+        kind = rng.random()
+        if kind < 0.7:
+            patterns.append(f"urn:nbn:fi:lb-{i:06d}*")
+        elif kind < 0.85:
+            patterns.append(f"urn:example.org:dataset:{i}")
+        else:
+            patterns.append(f"urn:org{i}:*:v[0-9]?")
+    return patterns
+
+
+def make_resources(n: int, rng: random.Random) -> list[str]:
+    resources = []
+    for _ in range(n):
+        i = rng.randrange(2000)
+        resources.append(
+            rng.choice(
+                [
+                    f"urn:nbn:fi:lb-{i:06d}{rng.randrange(100)}",
+                    f"urn:example.org:dataset:{i}",
+                    f"urn:org{i}:thing:v{rng.randrange(10)}a",
+                    f"doi:10.{i}/unmatched",
+                ]
+            )
+        )
+    return resources
+
+
+def fnmatch_loop(resource: str, patterns: list[str]) -> bool:
+    return any(fnmatch.fnmatch(resource, p) for p in patterns)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--patterns", type=int, default=500)
+    parser.add_argument("--resources", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    patterns = make_patterns(args.patterns, rng)
+    resources = make_resources(args.resources, rng)
+
+    start = time.perf_counter()
+    policy = ResourcePolicy(patterns)
+    compile_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [fnmatch_loop(r, patterns) for r in resources]
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [policy.matches(r) for r in resources]
+    compiled_s = time.perf_counter() - start
+
+    settings.create_groups_for_resources = patterns
+    load_resource_policy()
+    start = time.perf_counter()
+    checked = [should_create_group(r) for r in resources]
+    handler_s = time.perf_counter() - start
+
+    if actual != expected or checked != expected:
+        raise SystemExit("compiled policy disagrees with fnmatch")
+
+    per = 1e6 / len(resources)
+    print(f"{len(patterns)} patterns, {len(resources)} resources")
+    print(f"compile:        {compile_s * 1e3:8.2f} ms")
+    print(f"fnmatch loop:   {loop_s * per:8.2f} us/decision")
+    print(f"compiled:       {compiled_s * per:8.2f} us/decision")
+    print(f"should_create:  {handler_s * per:8.2f} us/decision")
+    print(f"speedup:        {loop_s / compiled_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
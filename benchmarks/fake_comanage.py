@@ -0,0 +1,206 @@
+"""
+A stand-in COmanage Registry for benchmarks.
+
+Implements the parts of the REST API the bridge uses:
+
+    GET    /co_people.json          (search.mail; limit/page)
+    GET    /identifiers.json        (copersonid; limit/page)
+    GET    /co_groups.json          (limit/page)
+    POST   /co_groups.json
+    GET    /co_group_members.json   (cogroupid, optionally copersonid; limit/page)
+    POST   /co_group_members.json
+    DELETE /co_group_members/{id}.json
+
+over a generated dataset: person `i` has mail `user{i}@example.org` and
+identifier `user{i}`, and group `j` is named `urn:bench:group-{j}`. Every
+response is delayed by `latency` seconds (+/-50% jitter), and a fraction
+`error_rate` of requests fail with `error_status`.
+
+Run it standalone to point a real deployment at it:
+
+    python benchmarks/fake_comanage.py --port 9000 --people 10000 --groups 500
+"""
+
+import argparse
+import asyncio
+import random
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+
+@dataclass
+class FakeConfig:
+    people: int = 1000
+    groups: int = 200
+    identifiers_per_person: int = 2
+    latency: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    seed: int = 42
+
+
+def mail_for(i: int) -> str:
+    return f"user{i}@example.org"
+
+
+def uid_for(i: int) -> str:
+    return f"user{i}"
+
+
+def group_name(j: int) -> str:
+    return f"urn:bench:group-{j}"
+
+
+def _page(items: list[Any], params: Any) -> list[Any]:
+    limit = int(params.get("limit", 0))
+    if not limit:
+        return items
+    page = int(params.get("page", 1))
+    return items[(page - 1) * limit : page * limit]
+
+
+class FakeRegistry:
+    """In-memory registry state plus the FastAPI app serving it."""
+
+    def __init__(self, config: FakeConfig) -> None:
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.requests: Counter[str] = Counter()
+        self.errors = 0
+        self.connections: set[tuple[str, int]] = set()
+        self.http_versions: Counter[str] = Counter()
+        self.people_by_mail = {mail_for(i): [i] for i in range(1, config.people + 1)}
+        self.groups = {j: group_name(j) for j in range(1, config.groups + 1)}
+        self.members: dict[int, tuple[int, int]] = {}
+        self.group_members: dict[int, dict[int, int]] = {}
+        self._next_id = 1_000_000
+        self.app = self._build_app()
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    async def _simulate(self, request: Request) -> None:
+        self.requests[f"{request.method} {request.url.path}"] += 1
+        if request.client is not None:
+            self.connections.add((request.client.host, request.client.port))
+        self.http_versions[request.scope.get("http_version", "")] += 1
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency * self.rng.uniform(0.5, 1.5))
+        if self.rng.random() < self.config.error_rate:
+            self.errors += 1
+            raise HTTPException(status_code=self.config.error_status)
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake COmanage Registry")
+
+        @app.get("/co_people.json")
+        async def co_people(request: Request) -> dict:
+            await self._simulate(request)
+            ids = self.people_by_mail.get(request.query_params.get("search.mail", ""))
+            people = [{"Id": i} for i in ids or []]
+            return {"CoPeople": _page(people, request.query_params)}
+
+        @app.get("/identifiers.json")
+        async def identifiers(request: Request) -> dict:
+            await self._simulate(request)
+            person = int(request.query_params["copersonid"])
+            found = [
+                {
+                    "Id": person * 10 + n,
+                    "Identifier": uid_for(person) if n == 0 else f"eppn-{person}-{n}",
+                    "Type": "oidcsub" if n == 0 else "eppn",
+                    "Person": {"Type": "CO", "Id": person},
+                }
+                for n in range(self.config.identifiers_per_person)
+            ]
+            return {"Identifiers": _page(found, request.query_params)}
+
+        @app.get("/co_groups.json")
+        async def co_groups(request: Request) -> dict:
+            await self._simulate(request)
+            groups = [{"Id": j, "Name": name} for j, name in self.groups.items()]
+            return {"CoGroups": _page(groups, request.query_params)}
+
+        @app.post("/co_groups.json", status_code=201)
+        async def add_group(request: Request) -> dict:
+            await self._simulate(request)
+            body = await request.json()
+            group_id = self._new_id()
+            self.groups[group_id] = body["CoGroups"][0]["Name"]
+            return {
+                "ResponseType": "NewObject",
+                "ObjectType": "CoGroup",
+                "Id": group_id,
+            }
+
+        @app.get("/co_group_members.json")
+        async def co_group_members(request: Request) -> dict:
+            await self._simulate(request)
+            group = int(request.query_params["cogroupid"])
+            person = request.query_params.get("copersonid")
+            members = self.group_members.get(group, {})
+            if person is not None:
+                mid = members.get(int(person))
+                members = {int(person): mid} if mid else {}
+            found = [
+                {"Id": mid, "Person": {"Type": "CO", "Id": pid}, "Member": True}
+                for pid, mid in members.items()
+            ]
+            return {"CoGroupMembers": _page(found, request.query_params)}
+
+        @app.post("/co_group_members.json", status_code=201)
+        async def add_members(request: Request) -> dict:
+            await self._simulate(request)
+            body = await request.json()
+            for member in body["CoGroupMembers"]:
+                gid, pid = member["CoGroupId"], member["Person"]["Id"]
+                members = self.group_members.setdefault(gid, {})
+                if pid not in members:
+                    members[pid] = self._new_id()
+                    self.members[members[pid]] = (gid, pid)
+            return {"ResponseType": "NewObject", "ObjectType": "CoGroupMember"}
+
+        @app.delete("/co_group_members/{member_id}.json")
+        async def delete_member(member_id: int, request: Request) -> Response:
+            await self._simulate(request)
+            key = self.members.pop(member_id, None)
+            if key is None:
+                raise HTTPException(status_code=404)
+            gid, pid = key
+            del self.group_members[gid][pid]
+            return Response(status_code=200)
+
+        return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--people", type=int, default=FakeConfig.people)
+    parser.add_argument("--groups", type=int, default=FakeConfig.groups)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--error-status", type=int, default=FakeConfig.error_status)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    registry = FakeRegistry(
+        FakeConfig(
+            people=args.people,
+            groups=args.groups,
+            latency=args.latency_ms / 1000,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+        )
+    )
+    uvicorn.run(registry.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
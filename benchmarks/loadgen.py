@@ -0,0 +1,255 @@
+"""
+End-to-end load benchmark of the bridge against a fake COmanage Registry.
+
+Usage:
+    python benchmarks/loadgen.py [--events N] [--batch-size N] [--latency-ms MS]
+                                 [--json results.json] [--min-eps N]
+                                 [--max-p99-ms MS]
+
+Runs the rems-co app in-process, with its COmanage client wired to the fake
+registry in `fake_comanage.py`, and replays webhook batches shaped like
+`resources/entitlement_post_v1_approved`: first approvals, then revocations
+of a fraction of them. For each phase it reports events per second, the
+latency of the 202 acknowledgement, and the end-to-end latency from POST
+until the event has been applied to the registry.
+
+`--min-eps` and `--max-p99-ms` make the run exit non-zero when throughput or
+end-to-end p99 latency regress past a limit, for use in CI.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_comanage import FakeConfig, FakeRegistry, group_name, mail_for, uid_for
+
+from rems_co import main as app_main
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.models import EntitlementEvent, EventOutcome
+from rems_co.service import workers
+from rems_co.service.planner import EventResult
+from rems_co.settings import settings
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def make_batches(
+    count: int, batch_size: int, config: FakeConfig, rng: random.Random
+) -> list[list[dict[str, Any]]]:
+    """Return approval batches with one unique application id per event.
+
+    Each event is for a distinct (user, resource), so none of them is merged
+    into another by the queue's coalescing window.
+    """
+    if count > config.people * config.groups:
+        raise SystemExit("more events than (person, group) pairs")
+    keys: set[tuple[int, int]] = set()
+    while len(keys) < count:
+        keys.add((rng.randint(1, config.people), rng.randint(1, config.groups)))
+    events = [
+        {
+            "application": application,
+            "resource": group_name(group),
+            "user": uid_for(person),
+            "mail": mail_for(person),
+            "end": "2099-12-31T23:59:59.000Z",
+        }
+        for application, (person, group) in enumerate(sorted(keys), start=1)
+    ]
+    rng.shuffle(events)
+    return [events[i : i + batch_size] for i in range(0, len(events), batch_size)]
+
+
+class Recorder:
+    """Records when each event is applied by the queue workers."""
+
+    def __init__(self) -> None:
+        self.applied: dict[int, float] = {}
+        self.outcomes: Counter[str] = Counter()
+        self._process_batch = workers.process_batch
+
+    async def process_batch(
+        self, events: list[EntitlementEvent], api: CoManageClient
+    ) -> list[EventResult]:
+        results = await self._process_batch(events, api)
+        now = time.perf_counter()
+        for result in results:
+            self.outcomes[result.outcome] += 1
+            if result.outcome is not EventOutcome.FAILED:
+                self.applied[result.event.application] = now
+        return results
+
+
+async def run_phase(
+    name: str,
+    path: str,
+    batches: list[list[dict[str, Any]]],
+    http: httpx.AsyncClient,
+    recorder: Recorder,
+    concurrency: int,
+    timeout: float,
+) -> dict[str, Any]:
+    posted: dict[int, float] = {}
+    acks: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    expected = {e["application"] for batch in batches for e in batch}
+
+    async def send(batch: list[dict[str, Any]]) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            for event in batch:
+                posted[event["application"]] = started
+            response = await http.post(path, json=batch)
+            response.raise_for_status()
+            acks.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(batch) for batch in batches))
+    deadline = started + timeout
+    while not expected <= recorder.applied.keys():
+        if time.perf_counter() > deadline:
+            raise SystemExit(f"{name}: timed out waiting for events to be applied")
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - started
+
+    latencies = [recorder.applied[a] - posted[a] for a in expected]
+    return {
+        "phase": name,
+        "events": len(expected),
+        "seconds": round(elapsed, 3),
+        "events_per_sec": round(len(expected) / elapsed, 1),
+        "ack_p50_ms": round(percentile(acks, 50) * 1e3, 2),
+        "ack_p99_ms": round(percentile(acks, 99) * 1e3, 2),
+        "e2e_p50_ms": round(percentile(latencies, 50) * 1e3, 2),
+        "e2e_p99_ms": round(percentile(latencies, 99) * 1e3, 2),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    config = FakeConfig(
+        people=args.people,
+        groups=args.groups,
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    registry = FakeRegistry(config)
+    recorder = Recorder()
+    workers.process_batch = recorder.process_batch  # type: ignore[assignment]
+    app_main.CoManageClient = functools.partial(  # type: ignore[misc]
+        CoManageClient, transport=httpx.ASGITransport(app=registry.app)
+    )
+
+    rng = random.Random(args.seed)
+    approvals = make_batches(args.events, args.batch_size, config, rng)
+    revocations = [
+        [dict(event, application=event["application"] + args.events)]
+        for batch in approvals
+        for event in batch
+        if rng.random() < args.revoke_fraction
+    ]
+
+    phases = []
+    async with app_main.app.router.lifespan_context(app_main.app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app_main.app), base_url="http://rems-co"
+        ) as http:
+            for name, path, batches in (
+                ("approve", "/approve", approvals),
+                ("revoke", "/revoke", revocations),
+            ):
+                if batches:
+                    phases.append(
+                        await run_phase(
+                            name,
+                            path,
+                            batches,
+                            http,
+                            recorder,
+                            args.concurrency,
+                            args.timeout,
+                        )
+                    )
+
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "json"},
+        "phases": phases,
+        "comanage_requests": sum(registry.requests.values()),
+        "comanage_errors_injected": registry.errors,
+        "outcomes": dict(recorder.outcomes),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--revoke-fraction", type=float, default=0.25)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--people", type=int, default=FakeConfig.people)
+    parser.add_argument("--groups", type=int, default=FakeConfig.groups)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--error-status", type=int, default=FakeConfig.error_status)
+    parser.add_argument("--workers", type=int, default=settings.event_queue_workers)
+    parser.add_argument(
+        "--coalesce-seconds",
+        type=float,
+        default=0,
+        help="event queue coalescing window (delays every event by this much)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--min-eps", type=float, help="fail below this throughput")
+    parser.add_argument("--max-p99-ms", type=float, help="fail above this e2e p99")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.comanage_registry_url = "http://comanage.bench"  # type: ignore[assignment]
+        settings.comanage_rate_limit = 0
+        settings.event_queue_path = str(Path(tmp) / "queue.sqlite3")
+        settings.event_queue_workers = args.workers
+        settings.event_queue_poll_interval = 0.05
+        settings.event_queue_coalesce_seconds = args.coalesce_seconds
+        settings.trace_exporter = "none"
+        results = asyncio.run(run(args))
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+    failed = False
+    for phase in results["phases"]:
+        if args.min_eps and phase["events_per_sec"] < args.min_eps:
+            print(f"{phase['phase']}: throughput below {args.min_eps}/s")
+            failed = True
+        if args.max_p99_ms and phase["e2e_p99_ms"] > args.max_p99_ms:
+            print(f"{phase['phase']}: e2e p99 above {args.max_p99_ms} ms")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Command-line entry points for the REMS-COmanage bridge.
+
+`rems-co-reconcile` brings COmanage group memberships in line with a full
+dump of REMS entitlements (see `rems_co.service.reconcile`):
+
+    rems-co-reconcile entitlements.json [--group NAME ...] [--dry-run]
+
+The dump is a JSON list in the same shape as the /approve payload; pass `-`
+to read it from stdin. A JSON report is printed on completion.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from collections.abc import Sequence
+
+from pydantic import TypeAdapter
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.models import ApproveEvent
+from rems_co.service.reconcile import ReconcileReport, reconcile
+
+Entitlements = TypeAdapter(list[ApproveEvent])
+
+
+async def _reconcile(
+    entitlements: list[ApproveEvent], groups: list[str], dry_run: bool
+) -> ReconcileReport:
+    async with CoManageClient() as api:
+        return await reconcile(entitlements, api, groups=groups, dry_run=dry_run)
+
+
+def reconcile_main(argv: Sequence[str] | None = None) -> int:
+    """Run a reconciliation from the command line; return the exit status."""
+    parser = argparse.ArgumentParser(
+        prog="rems-co-reconcile",
+        description="Sync COmanage group memberships with a REMS entitlement dump.",
+    )
+    parser.add_argument(
+        "dump", help="JSON list of entitlements, or - to read from stdin"
+    )
+    parser.add_argument(
+        "--group",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="also reconcile this group, emptying it if nothing entitles it",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="report differences without applying"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
+    )
+    if args.dump == "-":
+        raw = sys.stdin.buffer.read()
+    else:
+        with open(args.dump, "rb") as f:
+            raw = f.read()
+    entitlements = Entitlements.validate_json(raw)
+
+    report = asyncio.run(_reconcile(entitlements, args.group, args.dry_run))
+    print(json.dumps(report.as_dict(), indent=2))
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(reconcile_main())
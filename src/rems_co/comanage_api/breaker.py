@@ -0,0 +1,111 @@
+"""
+Circuit breaker for the COmanage request path.
+
+When COmanage is down, retrying every call through the full backoff schedule
+ties up workers for minutes. The breaker tracks the outcome of recent calls;
+once the failure rate crosses a threshold it opens and calls fail fast with
+CircuitOpen. After a cool-off period a few probe calls are let through
+(half-open): if they succeed the circuit closes again, otherwise it reopens.
+
+Only transport errors and 5xx responses count as failures; a 4xx means the
+registry is up and answering.
+"""
+
+import logging
+import time
+from collections import deque
+from enum import StrEnum
+
+from rems_co.exceptions import CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(StrEnum):
+    """States of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker over a sliding window of recent calls."""
+
+    def __init__(
+        self,
+        failure_rate_threshold: float,
+        window_size: int,
+        min_calls: int,
+        open_seconds: float,
+        half_open_probes: int,
+    ) -> None:
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = CircuitState.CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=max(1, window_size))
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def seconds_until_probe(self) -> float:
+        """Return how long until an open circuit lets a probe through."""
+        if self.state is not CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def before_call(self) -> None:
+        """Admit a call, or raise CircuitOpen if it must fail fast."""
+        if self.state is CircuitState.OPEN:
+            wait = self.seconds_until_probe()
+            if wait > 0:
+                raise CircuitOpen(
+                    f"COmanage circuit open; next probe in {wait:.1f}s",
+                    retry_after=wait,
+                )
+            self._transition(CircuitState.HALF_OPEN)
+
+        if self.state is CircuitState.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                raise CircuitOpen(
+                    "COmanage circuit half-open; probes in flight",
+                    retry_after=self.open_seconds,
+                )
+            self._probes_in_flight += 1
+
+    def after_call(self, success: bool | None) -> None:
+        """Record the outcome of an admitted call.
+
+        `success` is None when the call ended without a verdict on the
+        server's health (e.g. it was cancelled).
+        """
+        if self.state is CircuitState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if success is False:
+                self._open()
+            elif success:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._transition(CircuitState.CLOSED)
+            return
+
+        if success is None or self.state is not CircuitState.CLOSED:
+            return
+        self._outcomes.append(success)
+        if len(self._outcomes) >= self.min_calls:
+            failures = self._outcomes.count(False)
+            if failures / len(self._outcomes) >= self.failure_rate_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState) -> None:
+        logger.warning(f"COmanage circuit {self.state} -> {state}")
+        self.state = state
+        self._outcomes.clear()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
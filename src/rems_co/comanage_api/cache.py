@@ -0,0 +1,301 @@
+"""
+In-process caches that sit in front of COmanage lookups.
+
+These are deliberately simple and single-process: each CoManageClient owns its
+own caches, and they are only as shared as the client itself.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from typing import Generic, TypeVar
+
+from rems_co.models import Group
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded least-recently-used cache whose entries expire after a TTL.
+
+    Hit and miss counts are kept so callers can report cache effectiveness.
+    A cache with `maxsize` 0 or `ttl_seconds` 0 never stores anything.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        """Return the cached value for key, or None if absent or expired."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: K, value: V) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        if self.maxsize <= 0 or self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def peek(self, key: K) -> V | None:
+        """Return a live entry without counting a lookup or refreshing it."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry[0]:
+            return None
+        return entry[1]
+
+    def pop(self, key: K) -> None:
+        """Remove an entry, if present."""
+        self._entries.pop(key, None)
+
+    def keys(self) -> list[K]:
+        """Return the keys currently held, least recently used first."""
+        return list(self._entries)
+
+    def clear(self) -> None:
+        """Remove all entries; counters are kept."""
+        self._entries.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups served from the cache so far."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict[str, float]:
+        """Return hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+            "size": len(self._entries),
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class GroupIndex:
+    """Name -> group id index built from the CO's full group listing.
+
+    The index is considered fresh for `ttl_seconds` after the last full load.
+    That a name is missing from it is only trusted for the shorter
+    `negative_ttl_seconds`, so groups created elsewhere are picked up soon.
+    Individual entries can be added (e.g. after creating a group) or discarded
+    (e.g. after COmanage reports a group as gone) without a reload.
+
+    `can_answer` counts hits and misses: a miss is any lookup that needs a
+    reload.
+    """
+
+    def __init__(self, ttl_seconds: float, negative_ttl_seconds: float = 0) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._by_name: dict[str, int] = {}
+        self._loaded_at: float | None = None
+
+    def _loaded_within(self, seconds: float) -> bool:
+        return (
+            self._loaded_at is not None and time.monotonic() - self._loaded_at < seconds
+        )
+
+    def is_fresh(self) -> bool:
+        """Return True if the index was fully loaded within the TTL."""
+        return self._loaded_within(self.ttl_seconds)
+
+    def can_answer(self, name: str) -> bool:
+        """Return True if a lookup of name needs no reload, counting the lookup."""
+        if name in self._by_name:
+            answered = self.is_fresh()
+        else:
+            answered = self._loaded_within(
+                min(self.ttl_seconds, self.negative_ttl_seconds)
+            )
+        if answered:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return answered
+
+    def get(self, name: str) -> Group | None:
+        """Return the indexed group with this name, if any."""
+        group_id = self._by_name.get(name)
+        return None if group_id is None else Group(id=group_id, name=name)
+
+    def load(self, groups: Iterable[tuple[int, str]]) -> None:
+        """Replace the index contents with a full listing of (id, name) pairs."""
+        self._by_name = {name: group_id for group_id, name in groups}
+        self._loaded_at = time.monotonic()
+
+    def add(self, group: Group) -> None:
+        """Insert or replace a single group."""
+        self._by_name[group.name] = group.id
+
+    def discard_id(self, group_id: int) -> None:
+        """Remove any entry for the group with this id."""
+        for name, indexed_id in list(self._by_name.items()):
+            if indexed_id == group_id:
+                del self._by_name[name]
+
+    def stats(self) -> dict[str, float]:
+        """Return hit/miss counters and the number of groups indexed."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "size": len(self._by_name),
+        }
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+
+class MembershipIndex:
+    """Per-group index of person id -> membership record ids.
+
+    A group's memberships are loaded in full the first time they are needed
+    and trusted for `ttl_seconds`; at most `maxsize` groups are held. Our own
+    writes update loaded groups in place. A membership we created without
+    learning its record id is indexed with ids None.
+
+    Writes made while a group is being loaded are replayed over the loaded
+    listing, which may predate them.
+
+    A loaded listing can be stale (memberships added or removed in COmanage
+    directly or by another replica), so callers treat it as a hint. Only a
+    membership we wrote ourselves within the TTL is trusted outright.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self._groups: LRUCache[int, dict[int, list[int] | None]] = LRUCache(
+            maxsize, ttl_seconds
+        )
+        self._loading: dict[int, dict[int, list[int] | None | _Removed]] = {}
+        self._written: LRUCache[int, dict[int, float]] = LRUCache(maxsize, ttl_seconds)
+
+    @property
+    def enabled(self) -> bool:
+        return self._groups.maxsize > 0 and self._groups.ttl_seconds > 0
+
+    def members(self, group_id: int) -> dict[int, list[int] | None] | None:
+        """Return the loaded person -> membership ids of a group, if fresh."""
+        return self._groups.get(group_id)
+
+    def added_by_us(self, group_id: int, person_id: int) -> bool:
+        """Return True if we made the person a member within the TTL."""
+        written = self._written.peek(group_id)
+        written_at = written.get(person_id) if written is not None else None
+        return (
+            written_at is not None
+            and time.monotonic() - written_at < self._written.ttl_seconds
+        )
+
+    def start_load(self, group_id: int) -> None:
+        """Note that a full listing of the group is being fetched."""
+        self._loading[group_id] = {}
+
+    def load(self, group_id: int, memberships: Iterable[tuple[int, int]]) -> None:
+        """Store a group's full listing of (person id, membership id) pairs."""
+        listed: dict[int, list[int]] = {}
+        for person_id, member_id in memberships:
+            listed.setdefault(person_id, []).append(member_id)
+        members: dict[int, list[int] | None] = dict(listed)
+        for person_id, write in self._loading.pop(group_id, {}).items():
+            if isinstance(write, _Removed):
+                members.pop(person_id, None)
+            else:
+                members[person_id] = write
+        self._groups.set(group_id, members)
+
+    def abort_load(self, group_id: int) -> None:
+        """Forget a load that failed."""
+        self._loading.pop(group_id, None)
+
+    def add(self, group_id: int, person_id: int, member_id: int | None) -> None:
+        """Record that a person is now a member of a group."""
+        written = self._written.peek(group_id)
+        if written is None:
+            written = {}
+            self._written.set(group_id, written)
+        written[person_id] = time.monotonic()
+        ids = [member_id] if member_id is not None else None
+        members = self._groups.peek(group_id)
+        if members is not None:
+            known = members.get(person_id)
+            if known is not None and ids is not None:
+                ids = known + ids
+            members[person_id] = ids
+        if group_id in self._loading:
+            self._loading[group_id][person_id] = ids
+
+    def remove(self, group_id: int, person_id: int) -> None:
+        """Record that a person is no longer a member of a group."""
+        written = self._written.peek(group_id)
+        if written is not None:
+            written.pop(person_id, None)
+        members = self._groups.peek(group_id)
+        if members is not None:
+            members.pop(person_id, None)
+        if group_id in self._loading:
+            self._loading[group_id][person_id] = _REMOVED
+
+    def forget_ids(self, group_id: int, person_id: int) -> None:
+        """Keep a person listed in a group, but with unknown membership ids.
+
+        Unlike `add`, this does not count as our own write, so a later
+        approval of the person is still sent to COmanage.
+        """
+        written = self._written.peek(group_id)
+        if written is not None:
+            written.pop(person_id, None)
+        members = self._groups.peek(group_id)
+        if members is not None:
+            members[person_id] = None
+        if group_id in self._loading:
+            self._loading[group_id][person_id] = None
+
+    def discard_member(self, member_id: int) -> None:
+        """Drop a membership record, known only by its id, from loaded groups."""
+        for group_id in list(self._groups.keys()):
+            members = self._groups.peek(group_id) or {}
+            for person_id, ids in list(members.items()):
+                if ids is not None and member_id in ids:
+                    ids.remove(member_id)
+                    if not ids:
+                        self.remove(group_id, person_id)
+                    return
+
+    def discard_group(self, group_id: int) -> None:
+        """Drop a group's memberships, e.g. after the group disappeared."""
+        self._groups.pop(group_id)
+        self._written.pop(group_id)
+        self._loading.pop(group_id, None)
+
+    def stats(self) -> dict[str, float]:
+        """Return hit/miss counters and the number of groups held."""
+        return self._groups.stats()
+
+
+class _Removed:
+    """Marks a membership removed while its group was being loaded."""
+
+
+_REMOVED = _Removed()
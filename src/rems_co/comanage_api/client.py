@@ -1,55 +1,117 @@
 """
 Low-level client for interacting with the COmanage Registry API.
 
-Encapsulates basic CRUD operations and lookups.
+Encapsulates basic CRUD operations and lookups. A single client instance is
+meant to live for the lifetime of the application so that its connection pool
+is shared across events.
 """
 
+import asyncio
+import importlib.util
 import logging
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from contextlib import aclosing
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Literal
+from typing import Any, Literal, TypeVar
 
 import httpx
 from tenacity import (
+    RetryCallState,
     retry,
     retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
 )
 
+from rems_co.comanage_api import parsing
+from rems_co.comanage_api.breaker import CircuitBreaker
+from rems_co.comanage_api.cache import GroupIndex, LRUCache, MembershipIndex
 from rems_co.comanage_api.models import (
     AddGroupMemberRequest,
     AddGroupRequest,
+    CoGroupMember,
     CoGroupMemberPayload,
-    CoGroupMemberResponse,
     CoGroupPayload,
-    CoGroupsResponse,
-    CoPeopleResponse,
-    IdentifiersResponse,
-    NewObjectResponse,
     PersonRef,
 )
+from rems_co.comanage_api.ratelimit import AdaptiveRateLimiter, parse_retry_after
+from rems_co.comanage_api.singleflight import SingleFlight
 from rems_co.exceptions import (
     AlreadyMemberOfGroup,
     COmanageAPIError,
+    COmanageThrottled,
     MembershipNotFound,
     PersonNotFound,
 )
+from rems_co.metrics import (
+    COMANAGE_REQUEST_ERRORS,
+    COMANAGE_REQUEST_SECONDS,
+    COMANAGE_RETRIES,
+    path_template,
+)
 from rems_co.models import Group, Person
 from rems_co.settings import settings
+from rems_co.tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
 HttpMethod = Literal["get", "post", "delete"]
 
+T = TypeVar("T")
+
+THROTTLE_STATUSES = {429, 503}
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+@dataclass
+class MembershipRemoval:
+    """Per-record outcomes of removing a person's memberships of a group.
+
+    Records COmanage no longer has (404) count as removed.
+    """
+
+    deleted: list[int] = field(default_factory=list)
+    already_gone: list[int] = field(default_factory=list)
+    failed: dict[int, Exception] = field(default_factory=dict)
+
 
 def retry_policy() -> Any:
-    """Return the retry policy for outgoing HTTP requests."""
+    """Return the retry policy for outgoing HTTP requests.
+
+    Transport errors and throttling responses are retried. A throttled retry
+    waits for the server's Retry-After when one was given.
+    """
+    backoff = wait_exponential(
+        multiplier=settings.comanage_retry_backoff, min=1, max=10
+    )
+
+    def wait(retry_state: RetryCallState) -> float:
+        outcome = retry_state.outcome
+        error = outcome.exception() if outcome else None
+        if isinstance(error, COmanageThrottled) and error.retry_after is not None:
+            return error.retry_after
+        return backoff(retry_state)
+
+    def count_retry(retry_state: RetryCallState) -> None:
+        outcome = retry_state.outcome
+        error = outcome.exception() if outcome else None
+        reason = (
+            str(error.response.status_code)
+            if isinstance(error, COmanageAPIError) and error.response is not None
+            else type(error).__name__
+        )
+        method = retry_state.fn.__name__.lstrip("_") if retry_state.fn else ""
+        path = path_template(retry_state.args[1]) if len(retry_state.args) > 1 else ""
+        COMANAGE_RETRIES.labels(method, path, reason).inc()
+
     return retry(
         stop=stop_after_attempt(settings.comanage_retry_attempts),
-        wait=wait_exponential(
-            multiplier=settings.comanage_retry_backoff, min=1, max=10
-        ),
-        retry=retry_if_exception_type(httpx.RequestError),
+        wait=wait,
+        retry=retry_if_exception_type((httpx.RequestError, COmanageThrottled)),
+        before_sleep=count_retry,
         reraise=True,
     )
 
@@ -57,87 +119,390 @@ def retry_policy() -> Any:
 class CoManageClient:
     """Client for making authenticated calls to the COmanage Registry API."""
 
-    def __init__(self) -> None:
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None) -> None:
         self.base_url = str(settings.comanage_registry_url).rstrip("/")
         self.co_id = settings.comanage_coid
-        self.client = httpx.Client(
+        http2 = settings.comanage_http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning(
+                "COMANAGE_HTTP2 is set but the h2 package is not installed "
+                "(install rems-co[http2]); using HTTP/1.1"
+            )
+            http2 = False
+        self.client = httpx.AsyncClient(
             base_url=self.base_url,
+            transport=transport,
+            http2=http2,
             auth=(settings.comanage_api_userid, settings.comanage_api_key),
             timeout=settings.comanage_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.comanage_max_connections,
+                max_keepalive_connections=settings.comanage_max_keepalive_connections,
+                keepalive_expiry=settings.comanage_keepalive_expiry,
+            ),
+        )
+        self.rate_limiter = AdaptiveRateLimiter(
+            max_rate=settings.comanage_rate_limit,
+            burst=settings.comanage_rate_limit_burst,
+            min_rate=settings.comanage_rate_limit_min,
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_rate_threshold=settings.comanage_breaker_failure_rate,
+            window_size=settings.comanage_breaker_window,
+            min_calls=settings.comanage_breaker_min_calls,
+            open_seconds=settings.comanage_breaker_open_seconds,
+            half_open_probes=settings.comanage_breaker_half_open_probes,
+        )
+        self.single_flight = SingleFlight()
+        self.group_index = GroupIndex(
+            settings.comanage_group_cache_ttl_seconds,
+            settings.comanage_group_negative_cache_ttl_seconds,
+        )
+        self.membership_index = MembershipIndex(
+            settings.comanage_membership_cache_groups,
+            settings.comanage_membership_cache_ttl_seconds,
+        )
+        self.person_cache: LRUCache[tuple[str, str], Person] = LRUCache(
+            settings.comanage_person_cache_size,
+            settings.comanage_person_cache_ttl_seconds,
+        )
+        self.person_not_found_cache: LRUCache[tuple[str, str], str] = LRUCache(
+            settings.comanage_person_cache_size,
+            settings.comanage_person_negative_cache_ttl_seconds,
         )
         logger.debug(f"Initialized CoManageClient with base_url={self.base_url}")
 
-    def _request(self, method: HttpMethod, path: str, **kwargs: Any) -> httpx.Response:
-        """Perform an HTTP request with retries and error wrapping."""
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        await self.client.aclose()
+        logger.debug("Closed CoManageClient")
+
+    async def __aenter__(self) -> "CoManageClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def _request(
+        self, method: HttpMethod, path: str, **kwargs: Any
+    ) -> httpx.Response:
+        """Perform a rate-limited HTTP request with error wrapping.
+
+        Fails fast with CircuitOpen while the circuit breaker is open.
+        """
+        labels = (method.upper(), path_template(path))
+        with span("comanage.request", method=labels[0], path=labels[1]) as current:
+            try:
+                response = await self._send(method, path, labels, **kwargs)
+            except COmanageAPIError as e:
+                if e.response is not None:
+                    current.set("status", e.response.status_code)
+                raise
+            current.set("status", response.status_code)
+            return response
+
+    async def _send(
+        self, method: HttpMethod, path: str, labels: tuple[str, str], **kwargs: Any
+    ) -> httpx.Response:
+        """Send one request through the circuit breaker and rate limiter."""
+        self.circuit_breaker.before_call()
+        healthy: bool | None = None
         try:
+            await self.rate_limiter.acquire()
             logger.debug(f"Request: {method.upper()} {path} {kwargs}")
-            response = self.client.request(method=method, url=path, **kwargs)
+            started = time.perf_counter()
+            response = await self.client.request(method=method, url=path, **kwargs)
+            COMANAGE_REQUEST_SECONDS.labels(*labels).observe(
+                time.perf_counter() - started
+            )
+            healthy = not response.is_server_error
             response.raise_for_status()
+            self.rate_limiter.succeeded()
             return response
         except httpx.HTTPStatusError as e:
             logger.error(
                 f"HTTP error from COmanage: {e.response.status_code} {e.response.text}",
             )
+            COMANAGE_REQUEST_ERRORS.labels(*labels, str(e.response.status_code)).inc()
+            if e.response.status_code in THROTTLE_STATUSES:
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    retry_after = min(retry_after, settings.comanage_max_retry_after)
+                self.rate_limiter.throttled(retry_after)
+                raise COmanageThrottled(
+                    detail=f"{method.upper()} {path} throttled: {e.response.status_code}",
+                    response=e.response,
+                    retry_after=retry_after,
+                ) from e
             raise COmanageAPIError(
                 detail=f"{method.upper()} {path} failed: {e.response.status_code} - {e.response.text}",
                 response=e.response,
             ) from e
         except httpx.RequestError as e:
+            healthy = False
             logger.error(f"Request error from COmanage: {e}")
+            COMANAGE_REQUEST_ERRORS.labels(*labels, "transport").inc()
             raise
+        finally:
+            self.circuit_breaker.after_call(healthy)
 
+    @traced("comanage.get")
     @retry_policy()
-    def _get(self, path: str, **kwargs: Any) -> httpx.Response:
-        return self._request("get", path, **kwargs)
+    async def _get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self._request("get", path, **kwargs)
 
+    @traced("comanage.post")
     @retry_policy()
-    def _post(self, path: str, json: dict) -> httpx.Response:
-        return self._request("post", path, json=json)
+    async def _post(self, path: str, json: dict) -> httpx.Response:
+        return await self._request(
+            "post", path, content=parsing.dumps(json), headers=JSON_HEADERS
+        )
 
+    @traced("comanage.delete")
     @retry_policy()
-    def _delete(self, path: str) -> httpx.Response:
-        return self._request("delete", path)
+    async def _delete(self, path: str) -> httpx.Response:
+        return await self._request("delete", path)
 
-    def resolve_person_by_email_and_uid(self, email: str, uid: str) -> Person:
-        """Look up a person in COmanage by email and external UID."""
-        logger.debug(f"Resolving person: email={email}, uid={uid}")
-        resp = self._get(
-            "/co_people.json", params={"coid": self.co_id, "search.mail": email}
+    async def _paginate(
+        self,
+        path: str,
+        params: dict[str, Any],
+        records: Callable[[bytes], list[T]],
+    ) -> AsyncGenerator[list[T], None]:
+        """Yield the records of a list endpoint one page at a time.
+
+        Pages of `comanage_page_size` records are requested with the
+        registry's `limit`/`page` parameters; a short page ends the listing.
+        Only the current page is held in memory, and a caller that stops
+        iterating stops further requests.
+
+        A registry (or proxy) that ignores the paging parameters is detected
+        rather than looped on: a page longer than requested is taken to be
+        the whole listing, and a page starting with the same record as the
+        previous one ends the listing without being yielded again.
+        """
+        size = max(1, settings.comanage_page_size)
+        page = 1
+        first: T | None = None
+        while True:
+            resp = await self._get(path, params={**params, "limit": size, "page": page})
+            batch = records(resp.content)
+            if batch and page > 1 and batch[0] == first:
+                logger.warning(f"{path} repeated page {page - 1}; not paging")
+                return
+            if batch:
+                yield batch
+                first = batch[0]
+            if len(batch) != size:
+                if len(batch) > size:
+                    logger.warning(f"{path} ignored limit={size}; not paging")
+                return
+            page += 1
+
+    async def resolve_person_by_email_and_uid(self, email: str, uid: str) -> Person:
+        """Look up a person in COmanage by email and external UID.
+
+        Results are cached, including (briefly) the fact that no match exists,
+        so repeated events for the same user don't repeat the round trips.
+        Concurrent lookups of the same person share one resolution.
+        """
+        key = (email, uid)
+        person = self.person_cache.get(key)
+        if person is not None:
+            logger.debug(f"Person cache hit: email={email}, uid={uid}")
+            return person
+        not_found = self.person_not_found_cache.get(key)
+        if not_found is not None:
+            raise PersonNotFound(not_found)
+
+        return await self.single_flight.do(
+            ("person", email, uid), lambda: self._resolve_and_cache(email, uid)
         )
-        people = CoPeopleResponse.model_validate(resp.json()).CoPeople
-        if not people:
-            raise PersonNotFound(f"No match for email={email}")
 
-        for person in people:
-            person_id = person.Id
-            identifiers_resp = self._get(
-                "/identifiers.json", params={"copersonid": person_id}
-            )
-            identifiers = IdentifiersResponse.model_validate(
-                identifiers_resp.json()
-            ).Identifiers
+    async def _resolve_and_cache(self, email: str, uid: str) -> Person:
+        key = (email, uid)
+        try:
+            person = await self._resolve_person(email, uid)
+        except PersonNotFound as e:
+            self.person_not_found_cache.set(key, str(e))
+            raise
+        self.person_cache.set(key, person)
+        return person
+
+    def cache_stats(self) -> dict[str, dict[str, float]]:
+        """Return hit/miss counters for the client's lookup caches."""
+        return {
+            "person": self.person_cache.stats(),
+            "person_not_found": self.person_not_found_cache.stats(),
+            "membership": self.membership_index.stats(),
+            "group": self.group_index.stats(),
+        }
 
-            for ident in identifiers:
-                if ident.Identifier == uid:
+    async def _resolve_person(self, email: str, uid: str) -> Person:
+        """Resolve a person against COmanage, bypassing the caches."""
+        logger.debug(f"Resolving person: email={email}, uid={uid}")
+        candidates = 0
+        async with aclosing(self._people_with_email(email)) as pages:
+            async for people in pages:
+                candidates += len(people)
+                person_id = await self._first_person_with_identifier(people, uid)
+                if person_id is not None:
                     logger.info(f"Resolved person id={person_id} for uid={uid}")
                     return Person(id=person_id, email=email, identifier=uid)
-
+        if not candidates:
+            raise PersonNotFound(f"No match for email={email}")
         raise PersonNotFound(f"No match for email={email} and uid={uid}")
 
-    def get_group_by_name(self, name: str) -> Group | None:
-        """Return the COmanage group with the given name, if it exists."""
+    def _people_with_email(self, email: str) -> AsyncGenerator[list[int], None]:
+        """Yield pages of the ids of people registered with an email address."""
+        return self._paginate(
+            "/co_people.json",
+            {"coid": self.co_id, "search.mail": email},
+            parsing.person_ids,
+        )
+
+    async def _person_has_identifier(self, person_id: int, uid: str) -> bool:
+        """Return True if the person carries the given identifier.
+
+        Identifier pages are fetched only until the identifier is found.
+        """
+        pages = self._paginate(
+            "/identifiers.json", {"copersonid": person_id}, parsing.identifier_values
+        )
+        async with aclosing(pages):
+            async for identifiers in pages:
+                if uid in identifiers:
+                    return True
+        return False
+
+    async def _first_person_with_identifier(
+        self, person_ids: list[int], uid: str
+    ) -> int | None:
+        """Return the id of the first candidate found to carry the identifier.
+
+        Candidate identifier lookups run concurrently (bounded by
+        `comanage_identifier_lookup_concurrency`); outstanding lookups are
+        cancelled as soon as one matches. If nothing matches and any lookup
+        failed, the first failure is raised rather than reporting no match.
+        """
+        semaphore = asyncio.Semaphore(settings.comanage_identifier_lookup_concurrency)
+
+        async def check(person_id: int) -> int | None:
+            async with semaphore:
+                if await self._person_has_identifier(person_id, uid):
+                    return person_id
+                return None
+
+        tasks = [asyncio.create_task(check(pid)) for pid in person_ids]
+        errors: list[Exception] = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    match = await next_done
+                except (COmanageAPIError, httpx.RequestError) as e:
+                    errors.append(e)
+                    continue
+                if match is not None:
+                    return match
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if errors:
+            raise errors[0]
+        return None
+
+    async def open_connections(self, count: int) -> None:
+        """Fill the connection pool with up to `count` open connections.
+
+        Each connection is opened by a concurrent one-record group listing,
+        so the TLS handshakes are paid before the first event needs them.
+        Over HTTP/2 the requests share a single connection. The protocol
+        the registry negotiated is logged.
+        """
+        count = min(count, settings.comanage_max_keepalive_connections)
+        params = {"coid": self.co_id, "limit": 1, "page": 1}
+        responses = await asyncio.gather(
+            *(self._get("/co_groups.json", params=params) for _ in range(count))
+        )
+        versions = sorted({r.http_version for r in responses})
+        logger.info(f"Connected to {self.base_url} over {', '.join(versions)}")
+
+    async def refresh_group_index(self) -> None:
+        """Reload the group index now, sharing any reload already running."""
+        await self.single_flight.do(("group-index",), self._load_group_index)
+
+    async def get_group_by_name(self, name: str) -> Group | None:
+        """Return the COmanage group with the given name, if it exists.
+
+        Lookups are answered from the in-process group index while it is
+        fresh; a miss is trusted only within the shorter negative TTL.
+        Otherwise the full listing is reloaded once, so groups created
+        elsewhere are still found. Concurrent reloads are shared.
+        `create_group` reloads again before creating anything.
+        """
         logger.debug(f"Looking up group by name: {name}")
-        resp = self._get("/co_groups.json", params={"coid": self.co_id})
-        groups = CoGroupsResponse.model_validate(resp.json()).CoGroups
-        for g in groups:
-            if g.Name == name:
-                logger.info(f"Found group: {g.Name} (id={g.Id})")
-                return Group(id=g.Id, name=g.Name)
+        if self.group_index.can_answer(name):
+            group = self.group_index.get(name)
+            logger.debug(f"Group index answered {name}: {group}")
+            return group
+
+        await self.refresh_group_index()
+        group = self.group_index.get(name)
+        if group:
+            logger.info(f"Found group: {group.name} (id={group.id})")
+            return group
         logger.info(f"Group not found: {name}")
         return None
 
-    def create_group(self, name: str) -> Group:
-        """Create a new COmanage group."""
+    def _group_pages(self) -> AsyncGenerator[list[tuple[int, str]], None]:
+        """Yield pages of (id, name) pairs from the CO's group listing."""
+        return self._paginate("/co_groups.json", {"coid": self.co_id}, parsing.groups)
+
+    async def _load_group_index(self) -> None:
+        """Download the CO's group listing into the group index.
+
+        The listing is read page by page, so only the compact index (not the
+        full response) is held for large COs.
+        """
+        pairs: list[tuple[int, str]] = []
+        async with aclosing(self._group_pages()) as pages:
+            async for groups in pages:
+                pairs.extend(groups)
+        self.group_index.load(pairs)
+        logger.debug(f"Loaded group index with {len(self.group_index)} groups")
+
+    def _forget_group_if_gone(self, e: COmanageAPIError, group_id: int) -> None:
+        """Drop a group from the index when COmanage reports it as missing."""
+        if e.response is not None and e.response.status_code == 404:
+            logger.warning(
+                f"Group {group_id} not found in COmanage; dropping from index"
+            )
+            self.group_index.discard_id(group_id)
+            self.membership_index.discard_group(group_id)
+
+    async def create_group(self, name: str) -> Group:
+        """Create a new COmanage group.
+
+        Concurrent requests to create the same group collapse into one POST.
+        The group index is reloaded first, since a miss may have been
+        answered from an index that predates a group created elsewhere; a
+        group found there (or just created by another event) is returned as
+        is.
+        """
+        return await self.single_flight.do(
+            ("create-group", name), lambda: self._create_group(name)
+        )
+
+    async def _create_group(self, name: str) -> Group:
+        existing = self.group_index.get(name)
+        if not existing:
+            await self.refresh_group_index()
+            existing = self.group_index.get(name)
+        if existing:
+            logger.info(f"Group {name} already exists (id={existing.id})")
+            return existing
         logger.info(f"Creating group: {name}")
         payload = AddGroupRequest(
             CoGroups=[
@@ -149,14 +514,23 @@ class CoManageClient:
             ]
         ).model_dump(mode="json")
 
-        resp = self._post("/co_groups.json", json=payload)
-        new_group = NewObjectResponse.model_validate(resp.json())
-        return Group(id=new_group.Id, name=name)
+        resp = await self._post("/co_groups.json", json=payload)
+        group = Group(id=parsing.new_object_id(resp.content), name=name)
+        self.group_index.add(group)
+        return group
 
-    def add_person_to_group(
+    async def add_person_to_group(
         self, person_id: int, group_id: int, valid_through: datetime | None
     ) -> None:
-        """Add a person to a group, optionally with expiration."""
+        """Add a person to a group, optionally with expiration.
+
+        A person we made a member ourselves within the membership index TTL
+        is reported as AlreadyMemberOfGroup without a request.
+        """
+        if self.membership_index.added_by_us(group_id, person_id):
+            raise AlreadyMemberOfGroup(
+                f"Person {person_id} already in group {group_id} (indexed)"
+            )
         logger.info(f"Adding person {person_id} to group {group_id}")
         payload = AddGroupMemberRequest(
             CoGroupMembers=[
@@ -170,30 +544,243 @@ class CoManageClient:
         ).model_dump(mode="json", exclude_none=True)
 
         try:
-            self._post("/co_group_members.json", json=payload)
+            resp = await self._post("/co_group_members.json", json=payload)
         except COmanageAPIError as e:
             if (
                 e.response is not None
                 and e.response.status_code == 403
                 and "already member" in e.response.reason_phrase.lower()
             ):
+                self.membership_index.add(group_id, person_id, None)
                 raise AlreadyMemberOfGroup(
                     f"Person {person_id} already in group {group_id}",
                     response=e.response,
                 ) from e
+            self._forget_group_if_gone(e, group_id)
             raise
+        if self.membership_index.enabled:
+            member_id = parsing.created_id(resp.content)
+            self.membership_index.add(group_id, person_id, member_id)
+
+    async def add_people_to_groups(
+        self, members: list[CoGroupMemberPayload]
+    ) -> list[Exception | None]:
+        """Add many memberships using as few requests as possible.
+
+        Members are posted in chunks of `comanage_bulk_add_chunk_size`. If
+        COmanage rejects a chunk with a client error (typically because one
+        member already exists), that chunk is retried one member at a time so
+        each member gets its own outcome.
+
+        Members we added ourselves within the membership index TTL are not
+        posted again.
+
+        Returns, in input order, None for each member added or the exception
+        that adding it raised (AlreadyMemberOfGroup for existing members).
+        """
+        results: list[Exception | None] = [None] * len(members)
+        to_post: list[int] = []
+        for i, member in enumerate(members):
+            if self.membership_index.added_by_us(member.CoGroupId, member.Person.Id):
+                results[i] = AlreadyMemberOfGroup(
+                    f"Person {member.Person.Id} already in group "
+                    f"{member.CoGroupId} (indexed)"
+                )
+            else:
+                to_post.append(i)
+
+        size = max(1, settings.comanage_bulk_add_chunk_size)
+        for start in range(0, len(to_post), size):
+            positions = to_post[start : start + size]
+            outcomes = await self._add_member_chunk([members[i] for i in positions])
+            for i, outcome in zip(positions, outcomes, strict=True):
+                results[i] = outcome
+        return results
+
+    async def _add_member_chunk(
+        self, chunk: list[CoGroupMemberPayload]
+    ) -> list[Exception | None]:
+        """Post one chunk of memberships, falling back to single posts."""
+        if len(chunk) > 1:
+            logger.info(f"Adding {len(chunk)} group memberships in one request")
+            payload = AddGroupMemberRequest(CoGroupMembers=chunk).model_dump(
+                mode="json", exclude_none=True
+            )
+            try:
+                await self._post("/co_group_members.json", json=payload)
+                for member in chunk:
+                    self.membership_index.add(member.CoGroupId, member.Person.Id, None)
+                return [None] * len(chunk)
+            except COmanageAPIError as e:
+                if e.response is None or not e.response.is_client_error:
+                    return [e] * len(chunk)
+                logger.warning(
+                    f"Bulk add of {len(chunk)} members rejected "
+                    f"({e.response.status_code}); adding individually"
+                )
+            except httpx.RequestError as e:
+                return [e] * len(chunk)
+
+        results: list[Exception | None] = []
+        for member in chunk:
+            try:
+                await self.add_person_to_group(
+                    person_id=member.Person.Id,
+                    group_id=member.CoGroupId,
+                    valid_through=member.ValidThrough,
+                )
+                results.append(None)
+            except (COmanageAPIError, httpx.RequestError) as e:
+                results.append(e)
+        return results
 
-    def remove_person_from_group(self, person_id: int, group_id: int) -> None:
-        """Remove a person from a group, if they are a member."""
+    async def remove_person_from_group(
+        self, person_id: int, group_id: int
+    ) -> MembershipRemoval:
+        """Remove a person from a group, if they are a member.
+
+        Membership ids are taken from the group's membership index when it
+        has them, so the removal goes straight to DELETE. The index is only a
+        hint: unless the ids come from our own recent write and every one of
+        them was still there, the person's memberships are then looked up in
+        COmanage and any records left are deleted too. A person the index
+        does not list (or lists without ids) is looked up before deleting. A
+        person with several membership records has them deleted
+        concurrently; if any deletion fails, the first failure is raised once
+        all have finished.
+        """
         logger.info(f"Removing person {person_id} from group {group_id}")
-        resp = self._get(
-            "/co_group_members.json",
-            params={"cogroupid": group_id, "copersonid": person_id},
-        )
-        members = CoGroupMemberResponse.model_validate(resp.json()).CoGroupMembers
+        members = await self._group_memberships(group_id)
+        member_ids = members.get(person_id) if members is not None else None
+        indexed = member_ids is not None
+        trusted = self.membership_index.added_by_us(group_id, person_id)
+        if member_ids is None:
+            member_ids = await self._person_memberships(person_id, group_id)
 
-        if not members:
+        if not member_ids:
             raise MembershipNotFound(f"Person {person_id} not in group {group_id}")
-        for member in members:
-            logger.info(f"Found membership id={member.Id}, removing")
-            self._delete(f"/co_group_members/{member.Id}.json")
+        removal = await self._delete_memberships(member_ids)
+        if indexed and not removal.failed and (removal.already_gone or not trusted):
+            handled = set(removal.deleted) | set(removal.already_gone)
+            left = [
+                member_id
+                for member_id in await self._person_memberships(person_id, group_id)
+                if member_id not in handled
+            ]
+            if left:
+                logger.info(
+                    f"Index was stale for person {person_id} in group {group_id}; "
+                    f"removing {len(left)} more records"
+                )
+                rest = await self._delete_memberships(left)
+                removal.deleted.extend(rest.deleted)
+                removal.already_gone.extend(rest.already_gone)
+                removal.failed.update(rest.failed)
+        if removal.failed:
+            # Some records may remain; make the next attempt look them up.
+            self.membership_index.forget_ids(group_id, person_id)
+            raise next(iter(removal.failed.values()))
+        self.membership_index.remove(group_id, person_id)
+        return removal
+
+    async def _delete_memberships(self, member_ids: list[int]) -> MembershipRemoval:
+        """Delete membership records concurrently and collect their outcomes.
+
+        At most `comanage_delete_concurrency` deletions are in flight at once.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.comanage_delete_concurrency))
+
+        async def delete(member_id: int) -> bool:
+            async with semaphore:
+                return await self._delete_membership(member_id)
+
+        outcomes = await asyncio.gather(
+            *(delete(member_id) for member_id in member_ids), return_exceptions=True
+        )
+        removal = MembershipRemoval()
+        for member_id, outcome in zip(member_ids, outcomes, strict=True):
+            if isinstance(outcome, Exception):
+                removal.failed[member_id] = outcome
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            elif outcome:
+                removal.deleted.append(member_id)
+            else:
+                removal.already_gone.append(member_id)
+        return removal
+
+    async def _delete_membership(self, member_id: int) -> bool:
+        """Delete a membership record; return False if it was already gone."""
+        logger.info(f"Removing membership id={member_id}")
+        try:
+            await self._delete(f"/co_group_members/{member_id}.json")
+        except COmanageAPIError as e:
+            if e.response is not None and e.response.status_code == 404:
+                logger.info(f"Membership id={member_id} already gone")
+                return False
+            raise
+        return True
+
+    async def _person_memberships(self, person_id: int, group_id: int) -> list[int]:
+        """Look up the ids of a person's membership records in a group."""
+        try:
+            resp = await self._get(
+                "/co_group_members.json",
+                params={"cogroupid": group_id, "copersonid": person_id},
+            )
+        except COmanageAPIError as e:
+            self._forget_group_if_gone(e, group_id)
+            raise
+        return [m.Id for m in parsing.group_members(resp.content)]
+
+    async def _group_memberships(
+        self, group_id: int
+    ) -> dict[int, list[int] | None] | None:
+        """Return a group's indexed person -> membership ids, loading it if needed.
+
+        Returns None when the index is disabled or the group's memberships
+        could not be loaded, in which case callers ask COmanage directly.
+        """
+        if not self.membership_index.enabled:
+            return None
+        members = self.membership_index.members(group_id)
+        if members is not None:
+            return members
+        try:
+            await self.single_flight.do(
+                ("group-members", group_id),
+                lambda: self._load_group_memberships(group_id),
+            )
+        except (COmanageAPIError, httpx.RequestError) as e:
+            logger.warning(f"Could not load memberships of group {group_id}: {e}")
+            return None
+        return self.membership_index.members(group_id)
+
+    async def _load_group_memberships(self, group_id: int) -> None:
+        """Download a group's membership listing into the membership index."""
+        self.membership_index.start_load(group_id)
+        memberships: list[tuple[int, int]] = []
+        try:
+            async for member in self.iter_group_members(group_id):
+                if member.Person is not None and member.Member:
+                    memberships.append((member.Person.Id, member.Id))
+        except BaseException:
+            self.membership_index.abort_load(group_id)
+            raise
+        self.membership_index.load(group_id, memberships)
+        logger.debug(f"Indexed {len(memberships)} memberships of group {group_id}")
+
+    async def iter_group_members(self, group_id: int) -> AsyncIterator[CoGroupMember]:
+        """Yield the membership records of a group, page by page."""
+        pages = self._paginate(
+            "/co_group_members.json", {"cogroupid": group_id}, parsing.group_members
+        )
+        async with aclosing(pages):
+            async for members in pages:
+                for member in members:
+                    yield member
+
+    async def delete_membership(self, member_id: int) -> None:
+        """Delete a membership record by id; one already gone is not an error."""
+        await self._delete_membership(member_id)
+        self.membership_index.discard_member(member_id)
@@ -74,10 +74,19 @@ class NewObjectResponse(BaseModel):
     Id: int
 
 
+class PersonRef(BaseModel):
+    """Reference to a person in membership assignment."""
+
+    Type: Literal["CO"] = "CO"
+    Id: int
+
+
 class CoGroupMember(BaseModel):
     """Membership record within a COmanage group."""
 
     Id: int
+    Person: PersonRef | None = None
+    Member: bool = True
 
     model_config = {"extra": "ignore"}
 
@@ -112,13 +121,6 @@ class AddGroupRequest(BaseModel):
     CoGroups: list[CoGroupPayload]
 
 
-class PersonRef(BaseModel):
-    """Reference to a person in membership assignment."""
-
-    Type: Literal["CO"] = "CO"
-    Id: int
-
-
 class CoGroupMemberPayload(BaseModel):
     """Payload for adding a person to a group, with optional expiration."""
 
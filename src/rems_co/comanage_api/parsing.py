@@ -0,0 +1,123 @@
+"""
+Decoding of COmanage responses and encoding of request payloads.
+
+Responses are validated straight from the response bytes: pydantic-core
+parses the JSON itself, so no intermediate dict/list tree is built. The
+validators are built once, at import.
+
+With `comanage_lean_parsing` enabled, list responses are instead read into
+TypedDicts that declare only the fields the bridge reads (Id, Name,
+Identifier). Everything else in each record is skipped, and the envelope's
+ResponseType/Version are not checked, so lean mode is for registries you
+trust. It cuts the cost of parsing a large `/co_groups.json` by more than
+half (see `benchmarks/bench_parsing.py`).
+
+Request payloads are serialized with orjson when it is installed (it is part
+of the `prod` extra), and with the standard library otherwise.
+"""
+
+import json
+from typing import Any
+
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+from rems_co.comanage_api.models import (
+    CoGroupMember,
+    CoGroupMemberResponse,
+    CoGroupsResponse,
+    CoPeopleResponse,
+    IdentifiersResponse,
+    NewObjectResponse,
+)
+from rems_co.settings import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None  # type: ignore[assignment]
+
+
+class _LeanRecord(TypedDict):
+    Id: int
+
+
+class _LeanGroup(TypedDict):
+    Id: int
+    Name: str
+
+
+class _LeanIdentifier(TypedDict):
+    Identifier: str
+
+
+class _LeanPeople(TypedDict):
+    CoPeople: list[_LeanRecord]
+
+
+class _LeanGroups(TypedDict):
+    CoGroups: list[_LeanGroup]
+
+
+class _LeanIdentifiers(TypedDict):
+    Identifiers: list[_LeanIdentifier]
+
+
+_lean_people = TypeAdapter(_LeanPeople)
+_lean_groups = TypeAdapter(_LeanGroups)
+_lean_identifiers = TypeAdapter(_LeanIdentifiers)
+
+
+def person_ids(content: bytes) -> list[int]:
+    """Return the person ids in a /co_people.json response."""
+    if settings.comanage_lean_parsing:
+        return [p["Id"] for p in _lean_people.validate_json(content)["CoPeople"]]
+    return [p.Id for p in CoPeopleResponse.model_validate_json(content).CoPeople]
+
+
+def identifier_values(content: bytes) -> list[str]:
+    """Return the identifier values in an /identifiers.json response."""
+    if settings.comanage_lean_parsing:
+        identifiers = _lean_identifiers.validate_json(content)["Identifiers"]
+        return [i["Identifier"] for i in identifiers]
+    return [
+        i.Identifier
+        for i in IdentifiersResponse.model_validate_json(content).Identifiers
+    ]
+
+
+def groups(content: bytes) -> list[tuple[int, str]]:
+    """Return the (id, name) pairs in a /co_groups.json response."""
+    if settings.comanage_lean_parsing:
+        return [
+            (g["Id"], g["Name"])
+            for g in _lean_groups.validate_json(content)["CoGroups"]
+        ]
+    return [
+        (g.Id, g.Name) for g in CoGroupsResponse.model_validate_json(content).CoGroups
+    ]
+
+
+def group_members(content: bytes) -> list[CoGroupMember]:
+    """Return the membership records in a /co_group_members.json response."""
+    return CoGroupMemberResponse.model_validate_json(content).CoGroupMembers
+
+
+def new_object_id(content: bytes) -> int:
+    """Return the id of the object a create request made."""
+    return NewObjectResponse.model_validate_json(content).Id
+
+
+def created_id(content: bytes) -> int | None:
+    """Return the id in a create response, or None if it carries none."""
+    try:
+        return new_object_id(content)
+    except ValueError:
+        return None
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize a JSON request payload."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
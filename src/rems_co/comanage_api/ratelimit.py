@@ -0,0 +1,93 @@
+"""
+Client-side rate limiting for COmanage API calls.
+
+A single token bucket is shared by every request a CoManageClient makes. When
+COmanage pushes back (HTTP 429/503, optionally with Retry-After) the bucket's
+rate is cut and all callers pause; the rate then creeps back up with each
+successful request. This is the usual additive-increase/multiplicative-decrease
+scheme, and keeps us just under whatever the registry will sustain.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds requested by a Retry-After header, if any."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return max(0.0, (when - datetime.now(UTC)).total_seconds())
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate adapts to server throttling.
+
+    `max_rate` is the configured ceiling in requests per second; a value of 0
+    disables rate limiting, though Retry-After pauses are still honoured.
+    """
+
+    decrease_factor = 0.5
+    increase_fraction = 0.05
+
+    def __init__(self, max_rate: float, burst: int, min_rate: float) -> None:
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate) if max_rate > 0 else 0
+        self.burst = max(1, burst)
+        self.rate = max_rate
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            if self.max_rate <= 0:
+                return
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def throttled(self, retry_after: float | None) -> None:
+        """Record server throttling: slow down, and pause if asked to."""
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        if self.max_rate > 0:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        logger.warning(
+            f"COmanage throttled us; rate now {self.rate:.1f}/s"
+            + (f", pausing {retry_after:.1f}s" if retry_after else "")
+        )
+
+    def succeeded(self) -> None:
+        """Record a successful request: recover towards the configured rate."""
+        if self.max_rate > 0 and self.rate < self.max_rate:
+            self._refill(time.monotonic())
+            self.rate = min(
+                self.max_rate, self.rate + self.max_rate * self.increase_fraction
+            )
@@ -0,0 +1,45 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+When several coroutines ask for the same thing at once (the same group, the
+same person, or the creation of the same group), only the first actually calls
+COmanage; the others wait for and share its result or exception.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by what they fetch."""
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Task[Any]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of `fn()`, sharing it with concurrent callers.
+
+        The call runs in its own task, so a caller being cancelled doesn't
+        cancel the call for the others waiting on it.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        result: T = await asyncio.shield(task)
+        return result
+
+    def _finished(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away.
+            task.exception()
+
+    def in_flight(self) -> int:
+        """Return the number of calls currently in flight."""
+        return len(self._calls)
@@ -36,5 +36,26 @@ class COmanageAPIError(RemsCOError):
         self.response = response
 
 
+class COmanageThrottled(COmanageAPIError):
+    """Raised when COmanage asks us to slow down (HTTP 429 or 503)."""
+
+    def __init__(
+        self,
+        detail: str,
+        response: httpx.Response | None = None,
+        retry_after: float | None = None,
+    ) -> None:
+        super().__init__(detail, response=response)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(COmanageAPIError):
+    """Raised without calling COmanage while it is considered unavailable."""
+
+    def __init__(self, detail: str, retry_after: float) -> None:
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
 class AlreadyMemberOfGroup(COmanageAPIError):
     """Raised when attempting to add someone who is already a group member."""
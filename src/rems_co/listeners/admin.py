@@ -0,0 +1,39 @@
+"""
+Administrative HTTP routes.
+
+These act on COmanage directly rather than through the event queue. They are
+disabled unless `admin_token` is set, and then require it as a bearer token.
+"""
+
+import logging
+
+from fastapi import APIRouter, Depends, Query
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.listeners.dependencies import (
+    get_comanage_client,
+    get_expiry_scheduler,
+    require_admin_token,
+)
+from rems_co.models import ApproveEvent
+from rems_co.service.expiry import ExpiryScheduler
+from rems_co.service.reconcile import reconcile
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin_token)])
+
+
+@router.post("/reconcile")
+async def reconcile_entitlements(
+    entitlements: list[ApproveEvent],
+    dry_run: bool = False,
+    group: list[str] = Query(default=[]),
+    api: CoManageClient = Depends(get_comanage_client),
+    expiry: ExpiryScheduler | None = Depends(get_expiry_scheduler),
+) -> dict:
+    """Sync COmanage group memberships with a full REMS entitlement dump."""
+    logger.info(f"Reconciling {len(entitlements)} entitlements (dry_run={dry_run})")
+    report = await reconcile(
+        entitlements, api, groups=group, dry_run=dry_run, expiry=expiry
+    )
+    return report.as_dict()
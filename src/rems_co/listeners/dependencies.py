@@ -0,0 +1,55 @@
+"""
+FastAPI dependencies shared by the route handlers.
+
+Long-lived resources are created once in the application lifespan (see
+`rems_co.main`) and stored on `app.state`; these helpers hand them to routes.
+"""
+
+import secrets
+
+from fastapi import Header, HTTPException, Request, status
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.service.dedup import DedupWindow
+from rems_co.service.event_queue import EventQueue
+from rems_co.service.expiry import ExpiryScheduler
+from rems_co.settings import settings
+
+
+def get_comanage_client(request: Request) -> CoManageClient:
+    """Return the application-wide COmanage client."""
+    client: CoManageClient = request.app.state.comanage_client
+    return client
+
+
+def get_event_queue(request: Request) -> EventQueue:
+    """Return the application-wide event queue."""
+    queue: EventQueue = request.app.state.event_queue
+    return queue
+
+
+def get_expiry_scheduler(request: Request) -> ExpiryScheduler | None:
+    """Return the application-wide expiry scheduler, if enabled."""
+    expiry: ExpiryScheduler | None = request.app.state.expiry
+    return expiry
+
+
+def get_dedup_window(request: Request) -> DedupWindow:
+    """Return the application-wide idempotency window."""
+    dedup: DedupWindow = request.app.state.dedup
+    return dedup
+
+
+def require_admin_token(authorization: str = Header(default="")) -> None:
+    """Allow a request only if it carries the configured admin bearer token.
+
+    The admin routes are disabled (404) while no `admin_token` is set.
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    expected = f"Bearer {settings.admin_token}"
+    if not secrets.compare_digest(authorization.encode(), expected.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -1,35 +1,55 @@
 """
-HTTP routes for receiving REMS entitlement events and triggering business logic.
+HTTP routes for receiving REMS entitlement events.
+
+Events are durably queued and acknowledged with 202 straight away; background
+workers apply them to COmanage (see `rems_co.service.workers`). Exact repeats
+of events already applied are acknowledged without being queued.
 """
 
 import logging
+from collections.abc import Sequence
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, status
 
-from rems_co.models import ApproveEvent, RevokeEvent
-from rems_co.service.rems_handlers import handle_approve, handle_revoke
+from rems_co.listeners.dependencies import get_dedup_window, get_event_queue
+from rems_co.models import ApproveEvent, EntitlementEvent, RevokeEvent
+from rems_co.service.dedup import DedupWindow
+from rems_co.service.event_queue import EventQueue
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/approve")
-async def approve(events: list[ApproveEvent]) -> dict:
-    """Handle a batch of REMS approval events."""
-    for event in events:
-        try:
-            handle_approve(event)
-        except Exception as e:
-            logger.error(f"Failed to process approve event {event}: {e}", exc_info=True)
-    return {"status": "ok"}
-
-
-@router.post("/revoke")
-async def revoke(events: list[RevokeEvent]) -> dict:
-    """Handle a batch of REMS revocation events."""
-    for event in events:
-        try:
-            handle_revoke(event)
-        except Exception as e:
-            logger.error(f"Failed to process revoke event {event}: {e}", exc_info=True)
-    return {"status": "ok"}
+async def _accept(
+    kind: str,
+    events: Sequence[EntitlementEvent],
+    queue: EventQueue,
+    dedup: DedupWindow,
+) -> dict:
+    fresh = dedup.drop_duplicates(events)
+    ids = await queue.put(fresh) if fresh else []
+    logger.info(f"Queued {len(ids)} {kind} events")
+    response: dict = {"status": "accepted", "queued": len(ids)}
+    if len(fresh) < len(events):
+        response["duplicates"] = len(events) - len(fresh)
+    return response
+
+
+@router.post("/approve", status_code=status.HTTP_202_ACCEPTED)
+async def approve(
+    events: list[ApproveEvent],
+    queue: EventQueue = Depends(get_event_queue),
+    dedup: DedupWindow = Depends(get_dedup_window),
+) -> dict:
+    """Queue a batch of REMS approval events."""
+    return await _accept("approve", events, queue, dedup)
+
+
+@router.post("/revoke", status_code=status.HTTP_202_ACCEPTED)
+async def revoke(
+    events: list[RevokeEvent],
+    queue: EventQueue = Depends(get_event_queue),
+    dedup: DedupWindow = Depends(get_dedup_window),
+) -> dict:
+    """Queue a batch of REMS revocation events."""
+    return await _accept("revoke", events, queue, dedup)
@@ -1,31 +1,113 @@
 """
 Entrypoint for the REMS-COmanage bridge FastAPI application.
-Sets up routes and provides a basic healthcheck.
+Sets up routes, manages long-lived resources and provides a basic healthcheck.
 """
 
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 
 from rems_co import __version__
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.listeners.admin import router as admin_router
 from rems_co.listeners.events import router as event_router
+from rems_co.metrics import CacheCollector
+from rems_co.service.dedup import DedupWindow
+from rems_co.service.event_queue import EventQueue
+from rems_co.service.expiry import ExpiryScheduler
+from rems_co.service.rems_handlers import load_resource_policy
+from rems_co.service.warmup import WarmUp
+from rems_co.service.workers import QueueWorkers
+from rems_co.settings import settings
+from rems_co.tracing import configure_tracing, shutdown_tracing
 
 # Basic logging configuration
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s"
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create shared resources on startup and release them on shutdown."""
+    load_resource_policy()  # compile the group-creation patterns up front
+    configure_tracing()
+    queue = EventQueue(settings.event_queue_path, settings.event_queue_coalesce_seconds)
+    queue.open()
+    expiry = None
+    if settings.expiry_enabled:
+        expiry = ExpiryScheduler(
+            settings.event_queue_path, queue, settings.expiry_batch_window_seconds
+        )
+        expiry.open()
+    dedup = DedupWindow(settings.dedup_window_seconds)
+    try:
+        async with CoManageClient() as client:
+            workers = QueueWorkers(
+                queue,
+                client,
+                settings.event_queue_workers,
+                expiry=expiry,
+                dedup=dedup,
+            )
+            app.state.comanage_client = client
+            app.state.event_queue = queue
+            app.state.expiry = expiry
+            app.state.dedup = dedup
+            warmup = WarmUp(client, queue)
+            app.state.warmup = warmup
+            warmup.start()
+            cache_collector = CacheCollector(client.cache_stats)
+            REGISTRY.register(cache_collector)
+            workers.start()
+            if expiry is not None:
+                expiry.start()
+            try:
+                yield
+            finally:
+                await warmup.stop()
+                if expiry is not None:
+                    await expiry.stop()
+                await workers.stop()
+                REGISTRY.unregister(cache_collector)
+    finally:
+        if expiry is not None:
+            expiry.close()
+        queue.close()
+        await shutdown_tracing()
+
+
 app = FastAPI(
     title="REMS-COmanage Bridge",
     description="A service that syncs REMS entitlement notifications to COmanage.",
     version=__version__,
+    lifespan=lifespan,
 )
 
 # Register endpoints for /approve and /revoke
 app.include_router(event_router)
+app.include_router(admin_router)
 
 
 @app.get("/")
 def healthcheck() -> dict:
     """Basic health check endpoint."""
     return {"status": "ok"}
+
+
+@app.get("/ready")
+def readiness(request: Request, response: Response) -> dict:
+    """Readiness probe: 503 until startup warm-up has finished or timed out."""
+    if not request.app.state.warmup.ready:
+        response.status_code = 503
+        return {"status": "warming up"}
+    return {"status": "ready"}
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus metrics endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
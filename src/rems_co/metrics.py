@@ -0,0 +1,86 @@
+"""
+Prometheus metrics for the REMS-COmanage bridge.
+
+Metrics are registered in the default prometheus_client registry and served
+from `/metrics` (see `rems_co.main`). Cache statistics are read from the live
+client at scrape time by `CacheCollector`.
+"""
+
+import re
+from collections.abc import Callable, Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+_ID_SEGMENT = re.compile(r"/\d+(?=[/.]|$)")
+
+COMANAGE_REQUEST_SECONDS = Histogram(
+    "rems_co_comanage_request_seconds",
+    "Latency of COmanage API requests",
+    ["method", "path"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+COMANAGE_REQUEST_ERRORS = Counter(
+    "rems_co_comanage_request_errors_total",
+    "COmanage API requests that failed, by HTTP status or 'transport'",
+    ["method", "path", "status"],
+)
+COMANAGE_RETRIES = Counter(
+    "rems_co_comanage_retries_total",
+    "COmanage API requests retried, by reason",
+    ["method", "path", "reason"],
+)
+EVENTS_PROCESSED = Counter(
+    "rems_co_events_processed_total",
+    "Entitlement events applied to COmanage, by type and outcome",
+    ["type", "outcome"],
+)
+DUPLICATE_EVENTS = Counter(
+    "rems_co_duplicate_events_total",
+    "Entitlement events dropped as repeats of ones already applied, by type",
+    ["type"],
+)
+EVENTS_COALESCED = Counter(
+    "rems_co_events_coalesced_total",
+    "Queued events dropped because a later event for the same key superseded them",
+)
+BATCH_EVENTS_IN_FLIGHT = Gauge(
+    "rems_co_batch_events_in_flight",
+    "Events in batches currently being processed by queue workers",
+)
+
+
+def path_template(path: str) -> str:
+    """Return a request path with numeric ids replaced, for use as a label."""
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+class CacheCollector(Collector):
+    """Exposes lookup cache counters and hit ratios at scrape time.
+
+    `stats` returns per-cache counters, as `CoManageClient.cache_stats` does.
+    """
+
+    def __init__(self, stats: Callable[[], dict[str, dict[str, float]]]) -> None:
+        self.stats = stats
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        hits = CounterMetricFamily(
+            "rems_co_cache_hits", "Lookup cache hits", labels=["cache"]
+        )
+        misses = CounterMetricFamily(
+            "rems_co_cache_misses", "Lookup cache misses", labels=["cache"]
+        )
+        ratio = GaugeMetricFamily(
+            "rems_co_cache_hit_ratio", "Lookup cache hit ratio", labels=["cache"]
+        )
+        size = GaugeMetricFamily(
+            "rems_co_cache_entries", "Entries held in the cache", labels=["cache"]
+        )
+        for name, stats in self.stats().items():
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            ratio.add_metric([name], stats["hit_ratio"])
+            size.add_metric([name], stats["size"])
+        yield from (hits, misses, ratio, size)
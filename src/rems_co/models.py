@@ -6,6 +6,7 @@ with COmanage.
 """
 
 from datetime import datetime
+from enum import StrEnum
 
 from pydantic import BaseModel
 
@@ -30,6 +31,9 @@ class RevokeEvent(BaseModel):
     end: datetime | None
 
 
+EntitlementEvent = ApproveEvent | RevokeEvent
+
+
 class Person(BaseModel):
     """A known person in COmanage."""
 
@@ -43,3 +47,15 @@ class Group(BaseModel):
 
     id: int
     name: str
+
+
+class EventOutcome(StrEnum):
+    """Result of processing a single entitlement event."""
+
+    ADDED = "added"
+    REMOVED = "removed"
+    ALREADY_MEMBER = "already_member"
+    NOT_MEMBER = "not_member"
+    PERSON_NOT_FOUND = "person_not_found"
+    GROUP_NOT_FOUND = "group_not_found"
+    FAILED = "failed"
@@ -0,0 +1,107 @@
+"""
+Idempotency window that drops repeated REMS webhook deliveries.
+
+REMS re-delivers entitlement posts after timeouts and restarts. Without a
+check, each repeat would go through the whole resolve/lookup/POST chain again
+for an event that has already been applied.
+
+For every (user, resource) the window remembers a hash of the last event
+applied for it: (event type, application, resource, user, end). An incoming
+event whose hash matches is an exact repeat and is dropped without any
+COmanage traffic. Keeping only the *last* event per key means that a repeat of
+an approval that has since been revoked is still applied.
+
+Entries live in a rotating pair of dicts of integer hashes: the current
+generation takes writes, and every `window_seconds` it becomes the previous
+generation and the old previous one is dropped. An entry is remembered for
+between one and two windows, in memory only.
+"""
+
+import logging
+import time
+from collections.abc import Iterable, Sequence
+
+from rems_co.metrics import DUPLICATE_EVENTS
+from rems_co.models import EntitlementEvent, EventOutcome
+from rems_co.service.event_queue import event_kind
+from rems_co.service.executor import event_key
+from rems_co.service.planner import EventResult
+
+logger = logging.getLogger(__name__)
+
+_APPLIED = {
+    EventOutcome.ADDED,
+    EventOutcome.ALREADY_MEMBER,
+    EventOutcome.REMOVED,
+    EventOutcome.NOT_MEMBER,
+}
+
+
+def event_hash(event: EntitlementEvent) -> int:
+    """Return the hash identifying an exact repeat of an event."""
+    return hash(
+        (event_kind(event), event.application, event.resource, event.user, event.end)
+    )
+
+
+class DedupWindow:
+    """Remembers recently applied events to recognise exact repeats."""
+
+    def __init__(self, window_seconds: float) -> None:
+        self.window_seconds = window_seconds
+        self._current: dict[int, int] = {}
+        self._previous: dict[int, int] = {}
+        self._rotated_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def _rotate(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._rotated_at
+        if elapsed < self.window_seconds:
+            return
+        # After two idle windows nothing in either generation is still valid.
+        self._previous = self._current if elapsed < 2 * self.window_seconds else {}
+        self._current = {}
+        self._rotated_at = now
+
+    def is_duplicate(self, event: EntitlementEvent) -> bool:
+        """Return True if the event repeats the last one applied for its key."""
+        if not self.enabled:
+            return False
+        self._rotate()
+        key = hash(event_key(event))
+        last = self._current.get(key)
+        if last is None:
+            last = self._previous.get(key)
+        return last == event_hash(event)
+
+    def drop_duplicates(
+        self, events: Sequence[EntitlementEvent]
+    ) -> list[EntitlementEvent]:
+        """Return the events that are not repeats, counting the ones dropped."""
+        fresh = []
+        for event in events:
+            if self.is_duplicate(event):
+                logger.info(
+                    f"Dropping repeated {event_kind(event)} event for application "
+                    f"{event.application} ({event.user}, {event.resource})"
+                )
+                DUPLICATE_EVENTS.labels(event_kind(event)).inc()
+            else:
+                fresh.append(event)
+        return fresh
+
+    def record(self, results: Iterable[EventResult]) -> None:
+        """Remember the events of a processed batch that were applied."""
+        if not self.enabled:
+            return
+        self._rotate()
+        for result in results:
+            if result.outcome in _APPLIED:
+                self._current[hash(event_key(result.event))] = event_hash(result.event)
+
+    def __len__(self) -> int:
+        return len(self._current.keys() | self._previous.keys())
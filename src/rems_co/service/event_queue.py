@@ -0,0 +1,301 @@
+"""
+Durable local queue of REMS entitlement events.
+
+Routes append incoming events here and acknowledge REMS straight away; the
+background workers in `rems_co.service.workers` drain the queue into COmanage
+with retries. The queue is a single SQLite database in WAL mode with
+`synchronous=FULL`, so an event is on disk before REMS is told it was
+accepted, and survives a restart, an OS crash or a power failure.
+
+Events for the same (user, resource) are handed out strictly in arrival order:
+an event is only claimable once every earlier event for its key has been
+completed or dead-lettered, no matter how many workers are running.
+
+With a coalescing window, a new event is held for `coalesce_seconds` before it
+can be claimed. When it is claimed, later events already queued for the same
+key supersede it: only the newest is handed out and the rest are dropped. The
+newest event is the net effect of the sequence, since each REMS event states
+the membership wanted from then on. So approve+revoke leaves the revoke, and
+repeated approvals keep the latest end date.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Literal
+
+from rems_co.metrics import EVENTS_COALESCED
+from rems_co.models import ApproveEvent, EntitlementEvent, RevokeEvent
+from rems_co.service.sqlite import SQLiteStore, transaction
+
+logger = logging.getLogger(__name__)
+
+EventKind = Literal["approve", "revoke"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    user TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    received_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    claimed_at REAL
+);
+CREATE INDEX IF NOT EXISTS events_by_key ON events (user, resource, id);
+CREATE INDEX IF NOT EXISTS events_by_available ON events (available_at);
+CREATE TABLE IF NOT EXISTS dead_events (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    received_at REAL NOT NULL,
+    failed_at REAL NOT NULL,
+    error TEXT NOT NULL
+);
+"""
+
+
+def event_kind(event: EntitlementEvent) -> EventKind:
+    """Return the queue kind for an event."""
+    return "approve" if isinstance(event, ApproveEvent) else "revoke"
+
+
+def _parse_event(kind: str, payload: str) -> EntitlementEvent:
+    model = ApproveEvent if kind == "approve" else RevokeEvent
+    return model.model_validate_json(payload)
+
+
+@dataclass
+class QueuedEvent:
+    """An event claimed from the queue by a worker."""
+
+    id: int
+    event: EntitlementEvent
+    attempts: int
+    received_at: float
+
+
+def _coalesce(conn: sqlite3.Connection, head: tuple) -> tuple:
+    """Replace a key's oldest event with the newest queued, dropping the rest."""
+    user, resource = head[5], head[6]
+    newest = conn.execute(
+        "SELECT id, kind, payload, attempts, received_at, user, resource "
+        "FROM events WHERE user = ? AND resource = ? ORDER BY id DESC LIMIT 1",
+        (user, resource),
+    ).fetchone()
+    if newest[0] == head[0]:
+        return head
+    dropped = conn.execute(
+        "DELETE FROM events WHERE user = ? AND resource = ? AND id < ?",
+        (user, resource, newest[0]),
+    ).rowcount
+    EVENTS_COALESCED.inc(dropped)
+    logger.info(
+        f"Coalesced {dropped + 1} queued events for ({user}, {resource}) "
+        f"into event {newest[0]} ({newest[1]})"
+    )
+    return tuple(newest)
+
+
+class EventQueue(SQLiteStore):
+    """SQLite-backed FIFO of entitlement events with per-key ordering."""
+
+    schema = _SCHEMA
+    synchronous = "FULL"
+
+    def __init__(self, path: str, coalesce_seconds: float = 0) -> None:
+        super().__init__(path)
+        self.coalesce_seconds = coalesce_seconds
+        self.wakeup = asyncio.Event()
+
+    def open(self) -> None:
+        """Open the database, creating it if needed.
+
+        Events left claimed by a previous process (e.g. after a crash) are
+        released so they will be processed again.
+        """
+        super().open()
+        released = self.conn.execute(
+            "UPDATE events SET claimed_at = NULL WHERE claimed_at IS NOT NULL"
+        ).rowcount
+        if released:
+            logger.warning(f"Released {released} events claimed before restart")
+        logger.info(f"Opened event queue at {self.path}")
+
+    async def put(self, events: Sequence[EntitlementEvent]) -> list[int]:
+        """Durably append events and wake idle workers."""
+        now = time.time()
+        available_at = now + self.coalesce_seconds
+        rows = [
+            (event_kind(e), e.user, e.resource, e.model_dump_json(), now, available_at)
+            for e in events
+        ]
+
+        def insert(conn: sqlite3.Connection) -> list[int]:
+            ids = []
+            with transaction(conn):
+                for row in rows:
+                    cur = conn.execute(
+                        "INSERT INTO events "
+                        "(kind, user, resource, payload, received_at, available_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        row,
+                    )
+                    ids.append(int(cur.lastrowid or 0))
+            return ids
+
+        ids = await self._run(insert)
+        self.wakeup.set()
+        return ids
+
+    async def claim(self, limit: int) -> list[QueuedEvent]:
+        """Claim up to `limit` available events, oldest first.
+
+        At most one event per (user, resource) is returned: the oldest one
+        outstanding for that key or, with a coalescing window, the newest.
+        """
+        now = time.time()
+
+        def select(conn: sqlite3.Connection) -> list[QueuedEvent]:
+            with transaction(conn):
+                rows = conn.execute(
+                    """
+                    SELECT id, kind, payload, attempts, received_at, user, resource
+                    FROM events e
+                    WHERE claimed_at IS NULL AND available_at <= ?
+                    AND NOT EXISTS (
+                        SELECT 1 FROM events p
+                        WHERE p.user = e.user AND p.resource = e.resource
+                        AND p.id < e.id
+                    )
+                    ORDER BY id LIMIT ?
+                    """,
+                    (now, limit),
+                ).fetchall()
+                if self.coalesce_seconds > 0:
+                    rows = [_coalesce(conn, row) for row in rows]
+                conn.executemany(
+                    "UPDATE events SET claimed_at = ? WHERE id = ?",
+                    [(now, row[0]) for row in rows],
+                )
+            return [
+                QueuedEvent(
+                    id=row[0],
+                    event=_parse_event(row[1], row[2]),
+                    attempts=row[3],
+                    received_at=row[4],
+                )
+                for row in rows
+            ]
+
+        return await self._run(select)
+
+    async def complete(self, ids: Sequence[int]) -> None:
+        """Remove processed events from the queue."""
+
+        def delete(conn: sqlite3.Connection) -> None:
+            conn.executemany("DELETE FROM events WHERE id = ?", [(i,) for i in ids])
+
+        await self._run(delete)
+        self.wakeup.set()
+
+    async def retry(
+        self, item: QueuedEvent, delay: float, count_attempt: bool = True
+    ) -> None:
+        """Release a claimed event to be tried again after `delay` seconds.
+
+        With `count_attempt` False the event is deferred without using up one
+        of its attempts.
+        """
+        available_at = time.time() + delay
+        increment = 1 if count_attempt else 0
+
+        def release(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "UPDATE events SET claimed_at = NULL, attempts = attempts + ?, "
+                "available_at = ? WHERE id = ?",
+                (increment, available_at, item.id),
+            )
+
+        await self._run(release)
+
+    async def dead_letter(self, item: QueuedEvent, error: str) -> None:
+        """Move an event that keeps failing out of the queue."""
+
+        def move(conn: sqlite3.Connection) -> None:
+            with transaction(conn):
+                conn.execute(
+                    "INSERT OR REPLACE INTO dead_events "
+                    "(id, kind, payload, attempts, received_at, failed_at, error) "
+                    "SELECT id, kind, payload, attempts + 1, received_at, ?, ? "
+                    "FROM events WHERE id = ?",
+                    (time.time(), error, item.id),
+                )
+                conn.execute("DELETE FROM events WHERE id = ?", (item.id,))
+
+        await self._run(move)
+        self.wakeup.set()
+
+    async def pending_keys(
+        self, keys: Sequence[tuple[str, str]]
+    ) -> set[tuple[str, str]]:
+        """Return which of the given (user, resource) keys have queued events."""
+
+        def select(conn: sqlite3.Connection) -> set[tuple[str, str]]:
+            return {
+                key
+                for key in keys
+                if conn.execute(
+                    "SELECT 1 FROM events WHERE user = ? AND resource = ? LIMIT 1",
+                    key,
+                ).fetchone()
+            }
+
+        return await self._run(select)
+
+    async def recent_people(self, limit: int) -> list[tuple[str, str]]:
+        """Return up to `limit` distinct (mail, user) pairs of queued events.
+
+        The most recently received events come first. Rows are read only
+        until enough people have been found, however long the backlog.
+        """
+
+        def select(conn: sqlite3.Connection) -> list[tuple[str, str]]:
+            people: dict[tuple[str, str], None] = {}
+            if limit <= 0:
+                return []
+            rows = conn.execute("SELECT kind, payload FROM events ORDER BY id DESC")
+            for kind, payload in rows:
+                event = _parse_event(kind, payload)
+                people[(event.mail, event.user)] = None
+                if len(people) >= limit:
+                    break
+            return list(people)
+
+        return await self._run(select)
+
+    async def depth(self) -> int:
+        """Return the number of events waiting or in progress."""
+
+        def count(conn: sqlite3.Connection) -> int:
+            return int(conn.execute("SELECT COUNT(*) FROM events").fetchone()[0])
+
+        return await self._run(count)
+
+    async def next_available_at(self) -> float | None:
+        """Return when the next unclaimed event becomes available, if any."""
+
+        def earliest(conn: sqlite3.Connection) -> float | None:
+            row = conn.execute(
+                "SELECT MIN(available_at) FROM events WHERE claimed_at IS NULL"
+            ).fetchone()
+            available_at: float | None = row[0]
+            return available_at
+
+        return await self._run(earliest)
@@ -0,0 +1,56 @@
+"""
+Bounded-concurrency execution of entitlement events.
+
+Events that touch different (user, resource) pairs are independent and can be
+applied in parallel; events that share a pair must be applied in arrival
+order, so that e.g. an approve followed by a revoke is never reordered.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from typing import TypeVar
+
+from rems_co.models import EntitlementEvent
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def event_key(event: EntitlementEvent) -> tuple[str, str]:
+    """Return the (user, resource) pair whose events must stay ordered."""
+    return (event.user, event.resource)
+
+
+async def run_keyed(
+    items: Sequence[T],
+    key: Callable[[T], Hashable],
+    fn: Callable[[T], Awaitable[R]],
+    limit: int,
+) -> list[R]:
+    """Apply `fn` to every item, at most `limit` at a time.
+
+    Items with equal keys run one after another in input order; items with
+    different keys run concurrently. Results are returned in input order.
+    `fn` is expected to capture its own failures: if it raises, the exception
+    propagates once all other items have finished.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+    chains: dict[Hashable, list[int]] = {}
+    for i, item in enumerate(items):
+        chains.setdefault(key(item), []).append(i)
+
+    results: dict[int, R] = {}
+
+    async def run_chain(indices: list[int]) -> None:
+        for i in indices:
+            async with semaphore:
+                results[i] = await fn(items[i])
+
+    outcomes = await asyncio.gather(
+        *(run_chain(indices) for indices in chains.values()),
+        return_exceptions=True,
+    )
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return [results[i] for i in range(len(items))]
@@ -0,0 +1,249 @@
+"""
+Scheduler that enforces entitlement end dates (requirement X1).
+
+COmanage is told each membership's `ValidThrough`, but the membership itself
+stays in the group. This scheduler remembers the end date of every applied
+approval and, when it passes, queues a revocation for it.
+
+Pending expiries live in a min-heap ordered by end time, backed by a SQLite
+table (in the same database file as the event queue) so they survive restarts.
+The scheduler sleeps until the earliest deadline rather than polling, and
+everything due within `expiry_batch_window_seconds` of it is revoked in one
+pass: a single enqueue of revocation events.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import logging
+import sqlite3
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+
+from rems_co.models import ApproveEvent, EventOutcome, RevokeEvent
+from rems_co.service.event_queue import EventQueue
+from rems_co.service.executor import event_key
+from rems_co.service.planner import EventResult
+from rems_co.service.sqlite import SQLiteStore, transaction
+
+logger = logging.getLogger(__name__)
+
+ExpiryKey = tuple[str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS expiries (
+    user TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    mail TEXT NOT NULL,
+    application INTEGER NOT NULL,
+    end_at REAL NOT NULL,
+    PRIMARY KEY (user, resource)
+);
+CREATE INDEX IF NOT EXISTS expiries_by_end ON expiries (end_at);
+"""
+
+_APPLIED = {EventOutcome.ADDED, EventOutcome.ALREADY_MEMBER}
+
+# How long an expiry whose key still has queued events waits before it is
+# checked again.
+_BUSY_RECHECK_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class Expiry:
+    """A membership due to be revoked at `end_at` (unix time)."""
+
+    user: str
+    resource: str
+    mail: str
+    application: int
+    end_at: float
+
+    @property
+    def key(self) -> ExpiryKey:
+        return (self.user, self.resource)
+
+    def revoke_event(self) -> RevokeEvent:
+        return RevokeEvent(
+            application=self.application,
+            resource=self.resource,
+            user=self.user,
+            mail=self.mail,
+            end=None,
+        )
+
+
+class ExpiryScheduler(SQLiteStore):
+    """Min-heap of pending expiries that queues revocations when they fall due.
+
+    The heap uses lazy deletion: rescheduling or cancelling an entry only
+    updates `_pending`, and stale heap entries are skipped when popped.
+    """
+
+    schema = _SCHEMA
+
+    def __init__(self, path: str, queue: EventQueue, batch_window: float) -> None:
+        super().__init__(path)
+        self.queue = queue
+        self.batch_window = batch_window
+        self._pending: dict[ExpiryKey, Expiry] = {}
+        self._heap: list[tuple[float, ExpiryKey]] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def open(self) -> None:
+        """Open the store and load all pending expiries into the heap."""
+        super().open()
+        rows = self.conn.execute(
+            "SELECT user, resource, mail, application, end_at FROM expiries"
+        ).fetchall()
+        self._pending = {(r[0], r[1]): Expiry(*r) for r in rows}
+        self._heap = [(e.end_at, k) for k, e in self._pending.items()]
+        heapq.heapify(self._heap)
+        logger.info(f"Loaded {len(self._pending)} pending expiries")
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def next_deadline(self) -> float | None:
+        """Return the earliest pending end time, if any."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            end_at, key = self._heap[0]
+            pending = self._pending.get(key)
+            if pending is not None and pending.end_at == end_at:
+                return
+            heapq.heappop(self._heap)
+
+    async def observe(self, results: Sequence[EventResult]) -> None:
+        """Update pending expiries from a processed batch.
+
+        An applied approval with an end date schedules (or reschedules) its
+        expiry; one without clears it. A completed revocation clears it too.
+        """
+        upserts: dict[ExpiryKey, Expiry] = {}
+        removals: set[ExpiryKey] = set()
+        for result in results:
+            event = result.event
+            key = event_key(event)
+            if isinstance(event, ApproveEvent) and result.outcome in _APPLIED:
+                if event.end is not None:
+                    upserts[key] = Expiry(
+                        user=event.user,
+                        resource=event.resource,
+                        mail=event.mail,
+                        application=event.application,
+                        end_at=event.end.timestamp(),
+                    )
+                    removals.discard(key)
+                    continue
+            elif result.outcome is EventOutcome.FAILED:
+                continue
+            upserts.pop(key, None)
+            removals.add(key)
+        removals = {k for k in removals if k in self._pending}
+        if upserts or removals:
+            await self._save(list(upserts.values()), removals)
+
+    async def _save(self, upserts: list[Expiry], removals: set[ExpiryKey]) -> None:
+        def write(conn: sqlite3.Connection) -> None:
+            with transaction(conn):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO expiries "
+                    "(user, resource, mail, application, end_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (e.user, e.resource, e.mail, e.application, e.end_at)
+                        for e in upserts
+                    ],
+                )
+                conn.executemany(
+                    "DELETE FROM expiries WHERE user = ? AND resource = ?",
+                    list(removals),
+                )
+
+        await self._run(write)
+
+        earliest = self.next_deadline()
+        for key in removals:
+            self._pending.pop(key, None)
+        for expiry in upserts:
+            self._pending[expiry.key] = expiry
+            heapq.heappush(self._heap, (expiry.end_at, expiry.key))
+        if upserts and (earliest is None or min(e.end_at for e in upserts) < earliest):
+            self._wakeup.set()
+        if len(self._heap) > 2 * len(self._pending) + 1024:
+            self._heap = [(e.end_at, k) for k, e in self._pending.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now: float) -> list[Expiry]:
+        """Pop every expiry due by `now` plus the batch window."""
+        due = []
+        horizon = now + self.batch_window
+        while (deadline := self.next_deadline()) is not None and deadline <= horizon:
+            _, key = heapq.heappop(self._heap)
+            due.append(self._pending.pop(key))
+        return due
+
+    async def revoke_due(self, now: float | None = None) -> int:
+        """Queue revocations for everything due; return how many were queued.
+
+        Keys with events still waiting in the queue are deferred rather than
+        revoked: a newer approval may be about to extend them, in which case
+        processing it reschedules the expiry. If those events never get that
+        far (dead-lettered, or dropped as repeats), the deferred expiry falls
+        due again and is revoked then.
+        """
+        now = time.time() if now is None else now
+        due = self._pop_due(now)
+        if not due:
+            return 0
+        try:
+            busy = await self.queue.pending_keys([e.key for e in due])
+            revoke = [e for e in due if e.key not in busy]
+            if revoke:
+                await self.queue.put([e.revoke_event() for e in revoke])
+        except BaseException:
+            for expiry in due:
+                self._pending.setdefault(expiry.key, expiry)
+                heapq.heappush(self._heap, (expiry.end_at, expiry.key))
+            raise
+        recheck_at = now + self.batch_window + _BUSY_RECHECK_SECONDS
+        deferred = [replace(e, end_at=recheck_at) for e in due if e.key in busy]
+        await self._save(deferred, {e.key for e in revoke})
+        logger.info(
+            f"Queued {len(revoke)} expiry revocations"
+            + (f" ({len(deferred)} deferred behind queued events)" if deferred else "")
+        )
+        return len(revoke)
+
+    def start(self) -> None:
+        """Start the scheduling loop."""
+        self._task = asyncio.create_task(self._run_loop(), name="expiry-scheduler")
+
+    async def stop(self) -> None:
+        """Stop the scheduling loop."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run_loop(self) -> None:
+        while True:
+            try:
+                self._wakeup.clear()
+                await self.revoke_due()
+                deadline = self.next_deadline()
+                timeout = None if deadline is None else max(0, deadline - time.time())
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Expiry scheduler error: {e}", exc_info=True)
+                await asyncio.sleep(1)
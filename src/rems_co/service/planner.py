@@ -0,0 +1,252 @@
+"""
+Batch planning for REMS entitlement payloads.
+
+A single REMS POST frequently repeats the same user across several resources
+and the same resource across several users. Rather than handling each event
+in isolation, the planner resolves every distinct person and every distinct
+resource group once for the whole batch, then applies the membership changes
+event by event so that each event still gets its own outcome.
+"""
+
+import logging
+from dataclasses import dataclass, field
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.comanage_api.models import CoGroupMemberPayload, PersonRef
+from rems_co.exceptions import AlreadyMemberOfGroup, PersonNotFound
+from rems_co.metrics import EVENTS_PROCESSED
+from rems_co.models import (
+    ApproveEvent,
+    EntitlementEvent,
+    EventOutcome,
+    Group,
+    Person,
+    RevokeEvent,
+)
+from rems_co.service.event_queue import event_kind
+from rems_co.service.executor import event_key, run_keyed
+from rems_co.service.rems_handlers import ensure_group, remove_member
+from rems_co.settings import settings
+from rems_co.tracing import span
+
+logger = logging.getLogger(__name__)
+
+PersonKey = tuple[str, str]
+
+
+def person_key(event: EntitlementEvent) -> PersonKey:
+    """Return the (mail, user) pair that identifies an event's person."""
+    return (event.mail, event.user)
+
+
+@dataclass
+class EventResult:
+    """Outcome of one event within a batch."""
+
+    event: EntitlementEvent
+    outcome: EventOutcome
+    error: Exception | None = None
+
+
+@dataclass
+class BatchPlan:
+    """Persons and groups resolved once for a batch of events.
+
+    Lookups that failed are stored as the exception raised, so the events that
+    depend on them can be reported individually.
+    """
+
+    events: list[EntitlementEvent]
+    people: dict[PersonKey, Person | Exception] = field(default_factory=dict)
+    groups: dict[str, Group | None | Exception] = field(default_factory=dict)
+
+
+async def _resolve_person(key: PersonKey, api: CoManageClient) -> Person | Exception:
+    mail, user = key
+    try:
+        with span("resolve_person", user=user):
+            return await api.resolve_person_by_email_and_uid(email=mail, uid=user)
+    except Exception as e:
+        return e
+
+
+async def _resolve_group(
+    resource: str, create: bool, api: CoManageClient
+) -> Group | None | Exception:
+    try:
+        with span("resolve_group", resource=resource):
+            if create:
+                return await ensure_group(resource, api)
+            return await api.get_group_by_name(resource)
+    except Exception as e:
+        return e
+
+
+async def plan_batch(events: list[EntitlementEvent], api: CoManageClient) -> BatchPlan:
+    """Resolve each distinct person, then each distinct group, for a batch.
+
+    Groups are only looked up for events whose person resolved, and are only
+    created (subject to policy) when at least one approval needs them.
+    """
+    plan = BatchPlan(events=list(events))
+
+    keys = list(dict.fromkeys(person_key(e) for e in plan.events))
+    people = await run_keyed(
+        keys, lambda k: k, lambda k: _resolve_person(k, api), settings.event_concurrency
+    )
+    plan.people = dict(zip(keys, people, strict=True))
+
+    wanted: dict[str, bool] = {}
+    for event in plan.events:
+        if isinstance(plan.people[person_key(event)], Person):
+            create = isinstance(event, ApproveEvent)
+            wanted[event.resource] = wanted.get(event.resource, False) or create
+    # Sequential on purpose: the first lookup loads the group index and the
+    # rest are then answered from it.
+    for resource, create in wanted.items():
+        plan.groups[resource] = await _resolve_group(resource, create, api)
+
+    logger.debug(
+        f"Planned {len(plan.events)} events: "
+        f"{len(plan.people)} people, {len(plan.groups)} groups"
+    )
+    return plan
+
+
+def _targets(
+    event: EntitlementEvent, plan: BatchPlan
+) -> tuple[Person, Group] | EventResult:
+    """Return the planned person and group for an event.
+
+    If the event can't proceed, return its final result instead. Lookups that
+    failed are re-raised so the caller reports them against the event.
+    """
+    kind = "approval" if isinstance(event, ApproveEvent) else "revocation"
+    person = plan.people[person_key(event)]
+    if isinstance(person, PersonNotFound):
+        logger.warning(f"Skipping {kind}: {person}")
+        return EventResult(event, EventOutcome.PERSON_NOT_FOUND)
+    if isinstance(person, Exception):
+        raise person
+
+    group = plan.groups[event.resource]
+    if isinstance(group, Exception):
+        raise group
+    if group is None:
+        if isinstance(event, RevokeEvent):
+            logger.warning(
+                f"Group '{event.resource}' not found during revoke for user {person.id}. Skipping."
+            )
+        return EventResult(event, EventOutcome.GROUP_NOT_FOUND)
+    return person, group
+
+
+def _failed(event: EntitlementEvent, e: Exception) -> EventResult:
+    kind = "approve" if isinstance(event, ApproveEvent) else "revoke"
+    logger.error(f"Failed to process {kind} event {event}: {e}", exc_info=e)
+    return EventResult(event, EventOutcome.FAILED, error=e)
+
+
+async def apply_revocation(
+    event: EntitlementEvent, plan: BatchPlan, api: CoManageClient
+) -> EventResult:
+    """Apply one revocation using the plan's lookups."""
+    try:
+        targets = _targets(event, plan)
+        if isinstance(targets, EventResult):
+            return targets
+        person, group = targets
+        with span("remove_member", user=event.user, group=group.id):
+            outcome = await remove_member(person, group, api)
+        return EventResult(event, outcome)
+    except Exception as e:
+        return _failed(event, e)
+
+
+async def apply_approvals(
+    events: list[ApproveEvent], plan: BatchPlan, api: CoManageClient
+) -> list[EventResult]:
+    """Apply a run of approvals, posting their memberships in bulk."""
+    results: list[EventResult | None] = [None] * len(events)
+    pending: list[int] = []
+    payloads: list[CoGroupMemberPayload] = []
+    for i, event in enumerate(events):
+        try:
+            targets = _targets(event, plan)
+        except Exception as e:
+            results[i] = _failed(event, e)
+            continue
+        if isinstance(targets, EventResult):
+            results[i] = targets
+            continue
+        person, group = targets
+        pending.append(i)
+        payloads.append(
+            CoGroupMemberPayload(
+                CoGroupId=group.id,
+                Person=PersonRef(Id=person.id),
+                Member=True,
+                ValidThrough=event.end,
+            )
+        )
+
+    outcomes = []
+    if payloads:
+        with span("add_members", count=len(payloads)):
+            outcomes = await api.add_people_to_groups(payloads)
+    for i, payload, error in zip(pending, payloads, outcomes, strict=True):
+        event = events[i]
+        if error is None:
+            results[i] = EventResult(event, EventOutcome.ADDED)
+        elif isinstance(error, AlreadyMemberOfGroup):
+            logger.info(
+                f"User {payload.Person.Id} already in group '{event.resource}', skipping re-add."
+            )
+            results[i] = EventResult(event, EventOutcome.ALREADY_MEMBER)
+        else:
+            results[i] = _failed(event, error)
+    return [r for r in results if r is not None]
+
+
+async def process_batch(
+    events: list[EntitlementEvent], api: CoManageClient
+) -> list[EventResult]:
+    """Plan a batch and apply its events, reporting outcomes in input order.
+
+    Batches may mix approvals and revocations, as the queue workers claim
+    whatever is due. Approvals are added to their groups in bulk once all
+    lookups are done. Revocations run concurrently (up to
+    `event_concurrency`), except that revocations of the same (user,
+    resource) keep their arrival order.
+    """
+    with span("process_batch", events=len(events)):
+        return await _process_batch(events, api)
+
+
+async def _process_batch(
+    events: list[EntitlementEvent], api: CoManageClient
+) -> list[EventResult]:
+    with span("plan_batch"):
+        plan = await plan_batch(events, api)
+    approvals = [e for e in plan.events if isinstance(e, ApproveEvent)]
+    revocations = [e for e in plan.events if not isinstance(e, ApproveEvent)]
+    approved = iter(await apply_approvals(approvals, plan, api))
+    revoked = iter(
+        await run_keyed(
+            revocations,
+            event_key,
+            lambda e: apply_revocation(e, plan, api),
+            settings.event_concurrency,
+        )
+    )
+
+    results = []
+    for event in plan.events:
+        result = next(approved) if isinstance(event, ApproveEvent) else next(revoked)
+        logger.info(
+            f"Event application={event.application} resource={event.resource} "
+            f"user={event.user}: {result.outcome}"
+        )
+        EVENTS_PROCESSED.labels(event_kind(event), result.outcome).inc()
+        results.append(result)
+    return results
@@ -0,0 +1,93 @@
+"""
+Compiled matcher for the group-creation policy.
+
+`create_groups_for_resources` holds fnmatch-style patterns. Checking a
+resource against each pattern in turn with `fnmatch.fnmatch` costs a pattern
+normalisation and regex cache lookup per pattern per event, which adds up with
+hundreds of patterns. Instead the patterns are compiled once into:
+
+- a set of literal patterns (no wildcards), matched by equality,
+- a character trie of literal prefixes (patterns of the form `literal*`),
+- one alternation regex for everything else,
+
+and each resource's decision is memoised. The answers are exactly those of
+`any(fnmatch.fnmatch(resource, p) for p in patterns)`.
+"""
+
+import fnmatch
+import functools
+import os
+import re
+from collections.abc import Callable, Sequence
+
+_WILDCARDS = frozenset("*?[")
+_END = ""  # trie key marking the end of a prefix
+
+
+def _is_literal(pattern: str) -> bool:
+    return not _WILDCARDS.intersection(pattern)
+
+
+class ResourcePolicy:
+    """Decides whether a resource matches any of a set of fnmatch patterns."""
+
+    def __init__(self, patterns: Sequence[str], memo_size: int = 4096) -> None:
+        self.patterns = tuple(patterns)
+        self._literals: set[str] = set()
+        self._prefixes: dict[str, dict] = {}
+        self._match_all = False
+        others: list[str] = []
+
+        for raw in self.patterns:
+            pattern = os.path.normcase(raw)
+            if _is_literal(pattern):
+                self._literals.add(pattern)
+            elif pattern.endswith("*") and _is_literal(pattern[:-1]):
+                self._add_prefix(pattern[:-1])
+            else:
+                others.append(pattern)
+
+        self._regex = (
+            re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in others))
+            if others
+            else None
+        )
+        self.matches: Callable[[str], bool] = functools.lru_cache(maxsize=memo_size)(
+            self._matches
+        )
+
+    def _add_prefix(self, prefix: str) -> None:
+        if not prefix:
+            self._match_all = True
+            return
+        node = self._prefixes
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[_END] = {}
+
+    def _has_prefix(self, name: str) -> bool:
+        node = self._prefixes
+        for char in name:
+            node = node.get(char)  # type: ignore[assignment]
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
+
+    def _matches(self, resource: str) -> bool:
+        """Return True if the resource matches any pattern."""
+        if self._match_all:
+            return True
+        name = os.path.normcase(resource)
+        return (
+            name in self._literals
+            or self._has_prefix(name)
+            or (self._regex is not None and self._regex.match(name) is not None)
+        )
+
+
+@functools.lru_cache(maxsize=8)
+def compile_policy(patterns: tuple[str, ...]) -> ResourcePolicy:
+    """Return the compiled policy for a set of patterns, compiling it once."""
+    return ResourcePolicy(patterns)
@@ -0,0 +1,256 @@
+"""
+Full reconciliation of REMS entitlements against COmanage group memberships.
+
+A missed webhook leaves COmanage out of sync for good. Reconciliation takes a
+dump of all active entitlements (the same JSON shape as the /approve payload)
+and works through the managed groups one at a time:
+
+1. resolve the people entitled to the group,
+2. stream the group's current memberships, splitting them in a single pass
+   into entitled members and members to remove,
+3. apply only the difference: missing memberships are added in bulk and
+   unentitled ones deleted, at most `event_concurrency` at a time.
+
+Managed groups are those named by the dump's resources plus any extra group
+names given explicitly; a managed group with no entitlements is emptied. Only
+one group's membership sets are held in memory at a time.
+"""
+
+import logging
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.comanage_api.models import CoGroupMember, CoGroupMemberPayload, PersonRef
+from rems_co.exceptions import AlreadyMemberOfGroup, COmanageAPIError, PersonNotFound
+from rems_co.models import ApproveEvent, EventOutcome, Group, Person
+from rems_co.service.executor import run_keyed
+from rems_co.service.expiry import ExpiryScheduler
+from rems_co.service.planner import EventResult, person_key
+from rems_co.service.rems_handlers import should_create_group
+from rems_co.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReconcileReport:
+    """Counts of what a reconciliation run found and changed."""
+
+    dry_run: bool
+    groups: int = 0
+    unchanged: int = 0
+    added: int = 0
+    removed: int = 0
+    person_not_found: int = 0
+    group_not_found: int = 0
+    failed: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class GroupDiff:
+    """Membership changes needed to bring one group in line with REMS."""
+
+    resource: str
+    group: Group | None
+    create: bool = False
+    add: list[tuple[ApproveEvent, Person]] = field(default_factory=list)
+    remove: list[CoGroupMember] = field(default_factory=list)
+    keep: list[ApproveEvent] = field(default_factory=list)
+
+
+def group_entitlements(
+    entitlements: Iterable[ApproveEvent], now: datetime | None = None
+) -> dict[str, list[ApproveEvent]]:
+    """Group active entitlements by resource, one per user.
+
+    Entitlements whose end has passed are dropped. When a user holds several
+    entitlements to a resource, the one that lasts longest is kept.
+    """
+    now = now or datetime.now(UTC)
+    by_resource: dict[str, dict[str, ApproveEvent]] = {}
+    for event in entitlements:
+        if event.end is not None and event.end <= now:
+            continue
+        users = by_resource.setdefault(event.resource, {})
+        current = users.get(event.user)
+        if current is None or (
+            current.end is not None and (event.end is None or event.end > current.end)
+        ):
+            users[event.user] = event
+    return {resource: list(users.values()) for resource, users in by_resource.items()}
+
+
+async def _resolve(
+    event: ApproveEvent, api: CoManageClient
+) -> tuple[ApproveEvent, Person | Exception]:
+    try:
+        return event, await api.resolve_person_by_email_and_uid(
+            email=event.mail, uid=event.user
+        )
+    except Exception as e:
+        return event, e
+
+
+async def diff_group(
+    resource: str,
+    entitlements: list[ApproveEvent],
+    api: CoManageClient,
+    report: ReconcileReport,
+) -> GroupDiff:
+    """Compute the membership changes for one group.
+
+    Raises if a person lookup fails for a reason other than the person not
+    existing, so a partial view never leads to members being removed.
+    """
+    group = await api.get_group_by_name(resource)
+    diff = GroupDiff(resource=resource, group=group)
+    if group is None:
+        if not entitlements or not should_create_group(resource):
+            report.group_not_found += 1
+            return diff
+        diff.create = True
+
+    wanted: dict[int, tuple[ApproveEvent, Person]] = {}
+    resolved = await run_keyed(
+        entitlements,
+        person_key,
+        lambda e: _resolve(e, api),
+        settings.event_concurrency,
+    )
+    for event, person in resolved:
+        if isinstance(person, PersonNotFound):
+            report.person_not_found += 1
+        elif isinstance(person, Exception):
+            raise person
+        else:
+            wanted[person.id] = (event, person)
+
+    # Every record of an entitled person is left alone: a person may hold
+    # several (e.g. one per ValidThrough window), and any of them may be the
+    # one granting access.
+    present: set[int] = set()
+    if group is not None:
+        async for member in api.iter_group_members(group.id):
+            if member.Person is None or not member.Member:
+                continue
+            person_id = member.Person.Id
+            if person_id not in wanted:
+                diff.remove.append(member)
+            elif person_id not in present:
+                present.add(person_id)
+                diff.keep.append(wanted[person_id][0])
+    diff.add = [entry for pid, entry in wanted.items() if pid not in present]
+    return diff
+
+
+async def _delete(member: CoGroupMember, api: CoManageClient) -> Exception | None:
+    try:
+        await api.delete_membership(member.Id)
+    except COmanageAPIError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return None
+        return e
+    except Exception as e:
+        return e
+    return None
+
+
+async def apply_diff(
+    diff: GroupDiff, api: CoManageClient, report: ReconcileReport
+) -> list[EventResult]:
+    """Apply one group's changes; return results for the entitled members."""
+    results = [EventResult(e, EventOutcome.ALREADY_MEMBER) for e in diff.keep]
+    report.unchanged += len(diff.keep)
+
+    group = diff.group
+    if diff.create and diff.add:
+        group = await api.create_group(diff.resource)
+    if diff.add and group is not None:
+        outcomes = await api.add_people_to_groups(
+            [
+                CoGroupMemberPayload(
+                    CoGroupId=group.id,
+                    Person=PersonRef(Id=person.id),
+                    Member=True,
+                    ValidThrough=event.end,
+                )
+                for event, person in diff.add
+            ]
+        )
+        for (event, _), error in zip(diff.add, outcomes, strict=True):
+            if error is None:
+                report.added += 1
+                results.append(EventResult(event, EventOutcome.ADDED))
+            elif isinstance(error, AlreadyMemberOfGroup):
+                report.unchanged += 1
+                results.append(EventResult(event, EventOutcome.ALREADY_MEMBER))
+            else:
+                logger.error(f"Failed to add {event.user} to {diff.resource}: {error}")
+                report.failed += 1
+
+    errors = await run_keyed(
+        diff.remove,
+        lambda m: m.Id,
+        lambda m: _delete(m, api),
+        settings.event_concurrency,
+    )
+    for member, error in zip(diff.remove, errors, strict=True):
+        if error is None:
+            report.removed += 1
+        else:
+            logger.error(f"Failed to remove membership {member.Id}: {error}")
+            report.failed += 1
+    return results
+
+
+async def reconcile(
+    entitlements: Iterable[ApproveEvent],
+    api: CoManageClient,
+    *,
+    groups: Iterable[str] = (),
+    dry_run: bool = False,
+    expiry: ExpiryScheduler | None = None,
+) -> ReconcileReport:
+    """Bring COmanage group memberships in line with a full entitlement dump.
+
+    With `dry_run` the differences are counted but not applied. When an expiry
+    scheduler is given, the end dates of entitled members are re-synced too.
+    """
+    report = ReconcileReport(dry_run=dry_run)
+    by_resource = group_entitlements(entitlements)
+    for resource in sorted(set(by_resource) | set(groups)):
+        report.groups += 1
+        try:
+            diff = await diff_group(
+                resource, by_resource.get(resource, []), api, report
+            )
+        except Exception as e:
+            logger.error(f"Skipping reconciliation of {resource}: {e}", exc_info=e)
+            report.failed += 1
+            continue
+
+        logger.info(
+            f"Reconciling {resource}: {len(diff.add)} to add, "
+            f"{len(diff.remove)} to remove, {len(diff.keep)} unchanged"
+        )
+        if dry_run:
+            report.unchanged += len(diff.keep)
+            report.added += len(diff.add)
+            report.removed += len(diff.remove)
+            continue
+        try:
+            results = await apply_diff(diff, api, report)
+        except Exception as e:
+            logger.error(f"Failed to reconcile {resource}: {e}", exc_info=e)
+            report.failed += 1
+            continue
+        if expiry is not None:
+            await expiry.observe(results)
+
+    logger.info(f"Reconciliation finished: {report.as_dict()}")
+    return report
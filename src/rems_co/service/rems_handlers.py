@@ -1,93 +1,71 @@
 """
 Business logic for handling REMS entitlement events.
 
-Translates ApproveEvent and RevokeEvent objects into actions on COmanage,
-such as creating groups and managing memberships.
+The group-creation policy and the per-group steps that the batch planner
+uses to turn entitlement events into actions on COmanage.
 """
 
-import fnmatch
 import logging
 
 from rems_co.comanage_api.client import CoManageClient
-from rems_co.exceptions import (
-    AlreadyMemberOfGroup,
-    COmanageAPIError,
-    MembershipNotFound,
-    PersonNotFound,
-)
-from rems_co.models import ApproveEvent, RevokeEvent
+from rems_co.exceptions import COmanageAPIError, MembershipNotFound
+from rems_co.models import EventOutcome, Group, Person
+from rems_co.service.policy import ResourcePolicy, compile_policy
 from rems_co.settings import settings
+from rems_co.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Compiled once from settings by `load_resource_policy` (at application startup).
+_policy: ResourcePolicy | None = None
 
-def should_create_group(resource: str) -> bool:
-    """Return True if group creation is allowed for this resource."""
-    return any(
-        fnmatch.fnmatch(resource, pattern)
-        for pattern in settings.create_groups_for_resources
-    )
 
+def load_resource_policy() -> ResourcePolicy:
+    """Compile the group-creation patterns from settings and keep the result."""
+    global _policy
+    _policy = compile_policy(tuple(settings.create_groups_for_resources))
+    return _policy
 
-def handle_approve(event: ApproveEvent) -> None:
-    """Handle an approval event by ensuring the group exists and adding the user."""
-    api = CoManageClient()
 
-    try:
-        person = api.resolve_person_by_email_and_uid(email=event.mail, uid=event.user)
-    except PersonNotFound as e:
-        logger.warning(f"Skipping approval: {e}")
-        return
-
-    group = api.get_group_by_name(event.resource)
-
-    if not group:
-        if should_create_group(event.resource):
-            logger.info(f"Creating new group for resource: {event.resource}")
-            group = api.create_group(event.resource)
-        else:
-            logger.info(
-                f"Group '{event.resource}' not found and creation not allowed by policy. Skipping."
-            )
-            return
+def resource_policy() -> ResourcePolicy:
+    """Return the loaded group-creation policy, loading it on first use."""
+    return _policy if _policy is not None else load_resource_policy()
 
-    try:
-        api.add_person_to_group(
-            person_id=person.id, group_id=group.id, valid_through=event.end
-        )
-    except AlreadyMemberOfGroup:
-        logger.info(
-            f"User {person.id} already in group '{group.name}', skipping re-add."
-        )
-    except COmanageAPIError as e:
-        logger.error(f"Unexpected error adding user to group: {e}")
-        raise
 
+def should_create_group(resource: str) -> bool:
+    """Return True if group creation is allowed for this resource."""
+    return resource_policy().matches(resource)
 
-def handle_revoke(event: RevokeEvent) -> None:
-    """Handle a revocation event by removing the user from the group."""
-    api = CoManageClient()
 
-    try:
-        person = api.resolve_person_by_email_and_uid(email=event.mail, uid=event.user)
-    except PersonNotFound as e:
-        logger.warning(f"Skipping revocation: {e}")
-        return
+async def ensure_group(resource: str, api: CoManageClient) -> Group | None:
+    """Return the group for a resource, creating it if policy allows."""
+    group = await api.get_group_by_name(resource)
+    if group:
+        return group
 
-    group = api.get_group_by_name(event.resource)
+    if should_create_group(resource):
+        logger.info(f"Creating new group for resource: {resource}")
+        with span("create_group", resource=resource):
+            return await api.create_group(resource)
+
+    logger.info(
+        f"Group '{resource}' not found and creation not allowed by policy. Skipping."
+    )
+    return None
 
-    if not group:
-        logger.warning(
-            f"Group '{event.resource}' not found during revoke for user {person.id}. Skipping."
-        )
-        return
 
+async def remove_member(
+    person: Person, group: Group, api: CoManageClient
+) -> EventOutcome:
+    """Remove a resolved person from a resolved group for a revocation event."""
     try:
-        api.remove_person_from_group(person_id=person.id, group_id=group.id)
+        await api.remove_person_from_group(person_id=person.id, group_id=group.id)
     except MembershipNotFound:
         logger.warning(
             f"Membership not found: user {person.id} not in group '{group.name}'. Skipping revoke."
         )
+        return EventOutcome.NOT_MEMBER
     except COmanageAPIError as e:
         logger.error(f"Unexpected error removing user from group: {e}")
         raise
+    return EventOutcome.REMOVED
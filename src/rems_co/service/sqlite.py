@@ -0,0 +1,72 @@
+"""
+Shared plumbing for the service's local SQLite stores.
+
+Each store owns one connection in WAL mode. Operations run in a worker thread
+so they don't block the event loop, and are serialised with a lock.
+
+Stores default to `synchronous=NORMAL`: a committed write survives a crash of
+the process, but may be lost to a power failure or OS crash. A store whose
+commits must survive those too sets `synchronous = "FULL"`.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class SQLiteStore:
+    """Base class for a store backed by a single SQLite connection."""
+
+    schema = ""
+    synchronous = "NORMAL"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        """Open the database and create the store's schema if needed."""
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.executescript(self.schema)
+        self._conn = conn
+
+    def close(self) -> None:
+        """Close the database."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise RuntimeError(f"{type(self).__name__} is not open")
+        return self._conn
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run a database operation in a thread, one at a time."""
+
+        def locked() -> T:
+            with self._lock:
+                return fn(self.conn)
+
+        return await asyncio.to_thread(locked)
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Run a block in an immediate (write-locking) transaction."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -0,0 +1,94 @@
+"""
+Startup warm-up of the COmanage client.
+
+After a deploy the first webhook batches would otherwise pay for cold TLS
+handshakes and a full group-list download while REMS waits. `WarmUp` runs in
+the background from the application lifespan: it opens pooled connections to
+the registry, loads the group index and resolves the people of events still
+queued from before the restart.
+
+Until warm-up has finished (or given up after `prewarm_timeout_seconds`),
+the `/ready` endpoint reports the service as not ready. Failures are logged
+and never keep the service unready; the caches just start cold.
+"""
+
+import asyncio
+import logging
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.exceptions import PersonNotFound
+from rems_co.service.event_queue import EventQueue
+from rems_co.settings import settings
+from rems_co.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(api: CoManageClient, queue: EventQueue) -> None:
+    """Open connections and fill the client's caches."""
+    people = (
+        await queue.recent_people(settings.prewarm_people)
+        if settings.prewarm_people > 0
+        else []
+    )
+    semaphore = asyncio.Semaphore(max(1, settings.prewarm_connections))
+
+    async def resolve(mail: str, user: str) -> None:
+        async with semaphore:
+            try:
+                await api.resolve_person_by_email_and_uid(mail, user)
+            except PersonNotFound:
+                pass
+
+    with span("warmup", people=len(people)):
+        results = await asyncio.gather(
+            api.open_connections(settings.prewarm_connections),
+            api.refresh_group_index(),
+            *(resolve(mail, user) for mail, user in people),
+            return_exceptions=True,
+        )
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        logger.warning(f"{len(errors)} warm-up steps failed; first: {errors[0]}")
+    logger.info(
+        f"Warmed up: {len(api.group_index)} groups indexed, "
+        f"{len(people)} queued people looked up"
+    )
+
+
+class WarmUp:
+    """Runs `warm_up` in the background and tracks readiness."""
+
+    def __init__(self, api: CoManageClient, queue: EventQueue) -> None:
+        self.api = api
+        self.queue = queue
+        self.ready = False
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Start warming up, or report ready at once if warm-up is disabled."""
+        if not settings.prewarm_enabled:
+            self.ready = True
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            await asyncio.wait_for(
+                warm_up(self.api, self.queue), settings.prewarm_timeout_seconds
+            )
+        except TimeoutError:
+            logger.warning(
+                f"Warm-up did not finish within {settings.prewarm_timeout_seconds}s; "
+                "reporting ready anyway"
+            )
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+        self.ready = True
+
+    async def stop(self) -> None:
+        """Cancel warm-up if it is still running."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,176 @@
+"""
+Background workers that drain the event queue into COmanage.
+
+Each worker repeatedly claims a batch of events, processes it through the
+batch planner, and then completes, retries or dead-letters each event
+according to its outcome. Failed events are retried with exponential backoff
+up to `event_queue_max_attempts` times.
+
+Events that exactly repeat one already applied (see `rems_co.service.dedup`)
+are completed without being processed, and every applied event is recorded
+in the dedup window.
+
+While the client's circuit breaker is open, workers stop claiming events and
+events that failed fast are deferred without using up an attempt.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.exceptions import CircuitOpen
+from rems_co.metrics import BATCH_EVENTS_IN_FLIGHT
+from rems_co.models import EventOutcome
+from rems_co.service.dedup import DedupWindow
+from rems_co.service.event_queue import EventQueue, QueuedEvent
+from rems_co.service.expiry import ExpiryScheduler
+from rems_co.service.planner import process_batch
+from rems_co.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> float:
+    """Return the backoff before retrying an event that failed `attempts` times."""
+    delay: float = settings.event_queue_retry_backoff * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.event_queue_retry_max_delay)
+
+
+class QueueWorkers:
+    """A pool of asyncio tasks processing queued events."""
+
+    def __init__(
+        self,
+        queue: EventQueue,
+        api: CoManageClient,
+        count: int,
+        expiry: ExpiryScheduler | None = None,
+        dedup: DedupWindow | None = None,
+    ) -> None:
+        self.queue = queue
+        self.api = api
+        self.count = count
+        self.expiry = expiry
+        self.dedup = dedup
+        self._tasks: list[asyncio.Task[None]] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        """Start the worker tasks."""
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._run(n), name=f"queue-worker-{n}")
+            for n in range(self.count)
+        ]
+        logger.info(f"Started {self.count} queue workers")
+
+    async def stop(self) -> None:
+        """Stop the worker tasks.
+
+        Workers are cancelled; any batch they were processing stays in the
+        queue and is picked up again on the next start.
+        """
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        logger.info("Stopped queue workers")
+
+    async def _run(self, n: int) -> None:
+        while not self._stopping:
+            try:
+                pause = self.api.circuit_breaker.seconds_until_probe()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                    continue
+                self.queue.wakeup.clear()
+                if await self.drain_once():
+                    continue
+                await self._wait_for_work()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Queue worker {n} error: {e}", exc_info=True)
+                await asyncio.sleep(settings.event_queue_poll_interval)
+
+    async def _wait_for_work(self) -> None:
+        """Sleep until new events arrive or a retry becomes due."""
+        timeout = settings.event_queue_poll_interval
+        next_at = await self.queue.next_available_at()
+        if next_at is not None and next_at > time.time():
+            timeout = min(timeout, next_at - time.time())
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self.queue.wakeup.wait(), timeout)
+
+    async def drain_once(self) -> int:
+        """Claim and process one batch; return the number of events handled.
+
+        If handling the batch raises after the claim, the events not yet
+        settled are released for a retry before the error propagates, so
+        they don't block later events for their keys until a restart.
+        """
+        items = await self.queue.claim(settings.event_queue_batch_size)
+        if not items:
+            return 0
+        settled: set[int] = set()
+        try:
+            await self._handle(items, settled)
+        except Exception as e:
+            unsettled = [item for item in items if item.id not in settled]
+            logger.error(f"Releasing {len(unsettled)} events after error: {e}")
+            for item in unsettled:
+                await self.queue.retry(item, retry_delay(item.attempts + 1))
+            raise
+        return len(items)
+
+    async def _handle(self, items: list[QueuedEvent], settled: set[int]) -> None:
+        """Process claimed events, adding the ids of settled ones to `settled`."""
+        done = []
+        if self.dedup is not None:
+            fresh = {
+                id(e) for e in self.dedup.drop_duplicates([i.event for i in items])
+            }
+            done = [item.id for item in items if id(item.event) not in fresh]
+            items = [item for item in items if id(item.event) in fresh]
+
+        BATCH_EVENTS_IN_FLIGHT.inc(len(items))
+        try:
+            results = await process_batch([item.event for item in items], self.api)
+        finally:
+            BATCH_EVENTS_IN_FLIGHT.dec(len(items))
+        if self.expiry is not None:
+            await self.expiry.observe(results)
+        if self.dedup is not None:
+            self.dedup.record(results)
+
+        for item, result in zip(items, results, strict=True):
+            if result.outcome is EventOutcome.FAILED:
+                await self._failed(item, result.error)
+                settled.add(item.id)
+            else:
+                done.append(item.id)
+        await self.queue.complete(done)
+        settled.update(done)
+
+    async def _failed(self, item: QueuedEvent, error: Exception | None) -> None:
+        if isinstance(error, CircuitOpen):
+            logger.info(f"Deferring event {item.id} while COmanage circuit is open")
+            await self.queue.retry(item, error.retry_after, count_attempt=False)
+            return
+        attempts = item.attempts + 1
+        if attempts >= settings.event_queue_max_attempts:
+            logger.error(
+                f"Giving up on event {item.id} after {attempts} attempts: {error}"
+            )
+            await self.queue.dead_letter(item, str(error))
+            return
+        delay = retry_delay(attempts)
+        logger.warning(
+            f"Event {item.id} failed (attempt {attempts}), retrying in {delay:.0f}s"
+        )
+        await self.queue.retry(item, delay)
@@ -4,6 +4,8 @@ Runtime configuration for the REMS-COmanage bridge.
 Settings are loaded from environment variables or a `.env` file using Pydantic.
 """
 
+from typing import Literal
+
 from pydantic import Field, HttpUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -23,8 +25,151 @@ class Settings(BaseSettings):
     comanage_retry_backoff: float = Field(
         1, description="Exponential backoff multiplier"
     )
+    comanage_rate_limit: float = Field(
+        20, description="Max requests per second to COmanage (0 disables)"
+    )
+    comanage_rate_limit_burst: int = Field(
+        20, description="Requests that may be sent at once before limiting"
+    )
+    comanage_rate_limit_min: float = Field(
+        1, description="Floor for the rate after COmanage throttles us"
+    )
+    comanage_max_retry_after: float = Field(
+        60, description="Cap in seconds on a Retry-After delay we will honour"
+    )
+    comanage_breaker_failure_rate: float = Field(
+        0.5, description="Failure rate over recent calls that opens the circuit"
+    )
+    comanage_breaker_window: int = Field(
+        20, description="Number of recent calls the failure rate is taken over"
+    )
+    comanage_breaker_min_calls: int = Field(
+        10, description="Calls needed in the window before the circuit can open"
+    )
+    comanage_breaker_open_seconds: float = Field(
+        30, description="Seconds the circuit stays open before probing"
+    )
+    comanage_breaker_half_open_probes: int = Field(
+        2, description="Successful probes needed to close the circuit again"
+    )
+    comanage_max_connections: int = Field(
+        20, description="Max concurrent connections in the HTTP client pool"
+    )
+    comanage_max_keepalive_connections: int = Field(
+        10, description="Max idle keepalive connections kept in the pool"
+    )
+    comanage_keepalive_expiry: float = Field(
+        30, description="Seconds an idle keepalive connection is kept open"
+    )
+    comanage_http2: bool = Field(
+        False, description="Offer HTTP/2 to COmanage (needs the http2 extra)"
+    )
+    comanage_group_cache_ttl_seconds: float = Field(
+        300, description="Seconds a loaded group listing is trusted (0 disables)"
+    )
+    comanage_group_negative_cache_ttl_seconds: float = Field(
+        30,
+        description="Seconds a loaded group listing is trusted to show a group "
+        "does not exist (0 reloads on every miss)",
+    )
+    comanage_person_cache_size: int = Field(
+        10000, description="Max (email, uid) -> person entries to cache"
+    )
+    comanage_person_cache_ttl_seconds: float = Field(
+        600, description="Seconds a resolved person is cached (0 disables)"
+    )
+    comanage_person_negative_cache_ttl_seconds: float = Field(
+        30, description="Seconds an unresolvable (email, uid) is cached (0 disables)"
+    )
+    comanage_membership_cache_groups: int = Field(
+        1000, description="Max groups whose memberships are cached"
+    )
+    comanage_membership_cache_ttl_seconds: float = Field(
+        300, description="Seconds a group's loaded memberships are trusted (0 disables)"
+    )
+    comanage_identifier_lookup_concurrency: int = Field(
+        4, description="Max concurrent identifier lookups when resolving a person"
+    )
+    comanage_delete_concurrency: int = Field(
+        4, description="Max concurrent deletions of one person's membership records"
+    )
+    comanage_bulk_add_chunk_size: int = Field(
+        50, description="Max memberships sent in one bulk add request"
+    )
+    comanage_page_size: int = Field(
+        100, description="Records requested per page from COmanage list endpoints"
+    )
+    comanage_lean_parsing: bool = Field(
+        False, description="Parse only the fields used from trusted list responses"
+    )
     create_groups_for_resources: list[str] = ["*"]  # Default: all resources
 
+    event_concurrency: int = Field(
+        10, description="Max events of a batch applied to COmanage concurrently"
+    )
+    event_queue_path: str = Field(
+        "rems_co_queue.sqlite3", description="SQLite file holding queued events"
+    )
+    event_queue_workers: int = Field(4, description="Number of queue workers")
+    event_queue_batch_size: int = Field(
+        50, description="Max events a worker claims at once"
+    )
+    event_queue_max_attempts: int = Field(
+        10, description="Attempts before an event is dead-lettered"
+    )
+    event_queue_retry_backoff: float = Field(
+        2, description="Initial delay in seconds before retrying a failed event"
+    )
+    event_queue_retry_max_delay: float = Field(
+        300, description="Max delay in seconds between retries of an event"
+    )
+    event_queue_coalesce_seconds: float = Field(
+        2, description="Seconds new events wait to be merged with later ones (0 off)"
+    )
+    event_queue_poll_interval: float = Field(
+        1, description="Max seconds an idle worker sleeps before polling"
+    )
+    dedup_window_seconds: float = Field(
+        600, description="Seconds an applied event is remembered to drop repeats"
+    )
+
+    expiry_enabled: bool = Field(
+        True, description="Revoke memberships when their entitlement end passes"
+    )
+    expiry_batch_window_seconds: float = Field(
+        1, description="Expiries due this close together are revoked in one pass"
+    )
+
+    admin_token: str = Field(
+        "", description="Bearer token for the /admin routes (empty disables them)"
+    )
+
+    prewarm_enabled: bool = Field(
+        True, description="Warm up COmanage connections and caches on startup"
+    )
+    prewarm_timeout_seconds: float = Field(
+        30, description="Seconds warm-up may take before the service reports ready"
+    )
+    prewarm_connections: int = Field(
+        4, description="Connections to COmanage opened during warm-up"
+    )
+    prewarm_people: int = Field(
+        100, description="People of queued events resolved during warm-up (0 skips)"
+    )
+
+    trace_exporter: Literal["none", "jsonl", "otlp"] = Field(
+        "none", description="Where to export traces of slow events"
+    )
+    trace_jsonl_path: str = Field(
+        "rems_co_traces.jsonl", description="File traces are appended to (jsonl)"
+    )
+    trace_otlp_endpoint: str = Field(
+        "http://localhost:4318/v1/traces", description="OTLP/HTTP traces endpoint"
+    )
+    trace_slow_threshold_ms: float = Field(
+        1000, description="Only traces taking at least this long are exported"
+    )
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 
@@ -0,0 +1,311 @@
+"""
+Lightweight tracing of event handling and COmanage requests.
+
+Code marks the steps worth timing with `span(name, **attributes)` (or the
+`traced` decorator). Spans nest through a context variable, so spans opened
+in tasks spawned from inside a span join the same trace.
+
+A trace is buffered in memory until its root span ends and is exported only
+if the root took at least `trace_slow_threshold_ms`, so the traces written are
+the slow ones worth looking at. Exporters append JSON lines to a local file or
+POST OTLP/HTTP JSON to a collector.
+
+Tracing is off unless `trace_exporter` is set. While it is off, `span`
+returns a shared no-op object and costs a single function call.
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from types import TracebackType
+from typing import Any, ParamSpec, Protocol, TypeVar
+
+import httpx
+
+from rems_co import __version__
+from rems_co.settings import settings
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "rems_co_span", default=None
+)
+
+
+class Span:
+    """A timed step within a trace."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "error",
+        "start_ns",
+        "end_ns",
+        "_trace",
+        "_token",
+    )
+
+    def __init__(
+        self, name: str, parent: "Span | None", attributes: dict[str, Any]
+    ) -> None:
+        self.name = name
+        self.span_id = f"{random.getrandbits(64):016x}"
+        if parent is None:
+            self.trace_id = f"{random.getrandbits(128):032x}"
+            self.parent_id: str | None = None
+            self._trace: list[Span] = []
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self._trace = parent._trace
+        self.attributes = attributes
+        self.error: str | None = None
+        self.start_ns = 0
+        self.end_ns = 0
+        self._token: contextvars.Token[Span | None] | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Attach an attribute to the span."""
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.end_ns = time.time_ns()
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        if self._token is not None:
+            _current.reset(self._token)
+        self._trace.append(self)
+        if self.parent_id is None and _tracer is not None:
+            _tracer.finish(self)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned by `span` while tracing is disabled."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Exporter(Protocol):
+    def export(self, spans: Sequence[Span]) -> None: ...
+
+    async def aclose(self) -> None: ...
+
+
+class JsonlExporter:
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def export(self, spans: Sequence[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(s.as_dict(), default=str) + "\n" for s in spans)
+
+    async def aclose(self) -> None:
+        pass
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpExporter:
+    """Sends spans to an OTLP/HTTP collector using the JSON encoding.
+
+    Exports are sent in the background; failures are logged and dropped.
+    """
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self.client = httpx.AsyncClient(timeout=5)
+        self._sending: set[asyncio.Task[None]] = set()
+
+    def payload(self, spans: Sequence[Span]) -> dict[str, Any]:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": _otlp_value("rems-co")},
+                            {
+                                "key": "service.version",
+                                "value": _otlp_value(__version__),
+                            },
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [self._span(s) for s in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    @staticmethod
+    def _span(span: Span) -> dict[str, Any]:
+        encoded: dict[str, Any] = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()
+            ],
+            "status": (
+                {"code": 2, "message": span.error} if span.error else {"code": 1}
+            ),
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def export(self, spans: Sequence[Span]) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning("No event loop to export spans from; dropping trace")
+            return
+        task = loop.create_task(self._send(self.payload(spans)))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, payload: dict[str, Any]) -> None:
+        try:
+            response = await self.client.post(self.endpoint, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to export trace to {self.endpoint}: {e}")
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*self._sending, return_exceptions=True)
+        await self.client.aclose()
+
+
+class Tracer:
+    """Exports traces whose root span took at least `slow_threshold_ms`."""
+
+    def __init__(self, exporter: Exporter, slow_threshold_ms: float) -> None:
+        self.exporter = exporter
+        self.slow_threshold_ms = slow_threshold_ms
+
+    def finish(self, root: Span) -> None:
+        if root.duration_ms < self.slow_threshold_ms:
+            return
+        logger.info(f"Slow {root.name} ({root.duration_ms:.0f} ms); exporting trace")
+        try:
+            self.exporter.export(root._trace)
+        except Exception as e:
+            logger.warning(f"Failed to export trace: {e}")
+
+
+_tracer: Tracer | None = None
+
+
+def configure_tracing() -> None:
+    """Set up tracing from settings; a no-op unless an exporter is chosen."""
+    global _tracer
+    exporter: Exporter
+    if settings.trace_exporter == "jsonl":
+        exporter = JsonlExporter(settings.trace_jsonl_path)
+    elif settings.trace_exporter == "otlp":
+        exporter = OtlpExporter(settings.trace_otlp_endpoint)
+    else:
+        _tracer = None
+        return
+    _tracer = Tracer(exporter, settings.trace_slow_threshold_ms)
+    logger.info(
+        f"Tracing to {settings.trace_exporter} for events over "
+        f"{settings.trace_slow_threshold_ms} ms"
+    )
+
+
+async def shutdown_tracing() -> None:
+    """Flush and close the exporter, and disable tracing."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        await tracer.exporter.aclose()
+
+
+def span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    """Return a context manager timing a step as a child of the current span."""
+    if _tracer is None:
+        return _NOOP
+    return Span(name, _current.get(), attributes)
+
+
+def traced(
+    name: str,
+) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """Decorate a coroutine function so each call runs in a span."""
+
+    def decorate(fn: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _tracer is None:
+                return await fn(*args, **kwargs)
+            with span(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
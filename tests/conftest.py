@@ -1,7 +1,35 @@
 import pytest
 
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.service.event_queue import EventQueue
+from rems_co.settings import settings
+
+
+def make_event(cls, user="alice", resource="urn:a", application=24, end=None):
+    return cls(
+        application=application,
+        resource=resource,
+        user=user,
+        mail=f"{user}@example.com",
+        end=end,
+    )
+
 
 @pytest.fixture
 def mock_client(mocker):
-    client = mocker.patch("rems_co.comanage_api.client.CoManageClient", autospec=True)
-    return client.return_value
+    return mocker.create_autospec(CoManageClient, instance=True)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = EventQueue(str(tmp_path / "queue.db"))
+    q.open()
+    yield q
+    q.close()
+
+
+@pytest.fixture
+def queue_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "event_queue_path", str(tmp_path / "queue.db"))
+    monkeypatch.setattr(settings, "event_queue_workers", 0)
+    monkeypatch.setattr(settings, "prewarm_enabled", False)
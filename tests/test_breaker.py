@@ -0,0 +1,76 @@
+import httpx
+import pytest
+
+from rems_co.comanage_api.breaker import CircuitBreaker, CircuitState
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.exceptions import CircuitOpen
+
+
+@pytest.fixture
+def clock(mocker):
+    clock = mocker.patch("rems_co.comanage_api.breaker.time.monotonic")
+    clock.return_value = 1000.0
+    return clock
+
+
+def make_breaker():
+    return CircuitBreaker(
+        failure_rate_threshold=0.5,
+        window_size=4,
+        min_calls=4,
+        open_seconds=30,
+        half_open_probes=2,
+    )
+
+
+def record(breaker, *outcomes):
+    for outcome in outcomes:
+        breaker.before_call()
+        breaker.after_call(outcome)
+
+
+def test_opens_when_failure_rate_reached(clock):
+    breaker = make_breaker()
+    record(breaker, True, False, True)
+    assert breaker.state is CircuitState.CLOSED
+
+    record(breaker, False)
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpen) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == 30
+
+
+def test_half_open_probes_close_or_reopen(clock):
+    breaker = make_breaker()
+    record(breaker, False, False, False, False)
+
+    clock.return_value += 31
+    breaker.before_call()
+    breaker.before_call()
+    assert breaker.state is CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.after_call(True)
+    breaker.after_call(True)
+    assert breaker.state is CircuitState.CLOSED
+
+    record(breaker, False, False, False, False)
+    clock.return_value += 31
+    record(breaker, False)
+    assert breaker.state is CircuitState.OPEN
+
+
+async def test_client_fails_fast_while_open(mocker, clock):
+    client = CoManageClient()
+    client.circuit_breaker = make_breaker()
+    mock_request = mocker.patch.object(
+        client.client, "request", side_effect=httpx.ConnectError("down")
+    )
+    for _ in range(4):
+        with pytest.raises(httpx.ConnectError):
+            await client._request("get", "/co_groups.json")
+
+    with pytest.raises(CircuitOpen):
+        await client._get("/co_groups.json")
+    assert mock_request.await_count == 4
@@ -1,8 +1,10 @@
+import asyncio
 from datetime import datetime
 
 import httpx
 import pytest
 
+from rems_co.comanage_api.cache import LRUCache, MembershipIndex
 from rems_co.comanage_api.client import CoManageClient
 from rems_co.comanage_api.models import (
     AddGroupMemberRequest,
@@ -19,24 +21,40 @@ from rems_co.comanage_api.models import (
     NewObjectResponse,
     PersonRef,
 )
-from rems_co.exceptions import MembershipNotFound, PersonNotFound
+from rems_co.exceptions import (
+    AlreadyMemberOfGroup,
+    COmanageAPIError,
+    MembershipNotFound,
+    PersonNotFound,
+)
 from rems_co.models import Group, Person
 from rems_co.settings import settings
 
 
-def test_resolve_person_by_email_and_uid_found(mocker):
+@pytest.fixture(autouse=True)
+def no_membership_index(monkeypatch):
+    """Most tests here exercise the direct lookups; index tests opt back in."""
+    monkeypatch.setattr(settings, "comanage_membership_cache_ttl_seconds", 0)
+
+
+@pytest.fixture
+def membership_index(monkeypatch):
+    monkeypatch.setattr(settings, "comanage_membership_cache_ttl_seconds", 300)
+
+
+async def test_resolve_person_by_email_and_uid_found(mocker):
     mock_get = mocker.patch.object(CoManageClient, "_get")
 
     mock_get.side_effect = [
         # CoPeople response
         mocker.Mock(
-            json=lambda: CoPeopleResponse(
+            content=CoPeopleResponse(
                 CoPeople=[CoPerson(Id=1234), CoPerson(Id=5678)],
-            ).model_dump()
+            ).model_dump_json()
         ),
         # Identifiers for 1234
         mocker.Mock(
-            json=lambda: IdentifiersResponse(
+            content=IdentifiersResponse(
                 Identifiers=[
                     Identifier(
                         Id=1,
@@ -45,11 +63,11 @@ def test_resolve_person_by_email_and_uid_found(mocker):
                         Person=CoPerson(Id=1234),
                     )
                 ],
-            ).model_dump()
+            ).model_dump_json()
         ),
         # Identifiers for 5678, includes match
         mocker.Mock(
-            json=lambda: IdentifiersResponse(
+            content=IdentifiersResponse(
                 Identifiers=[
                     Identifier(
                         Id=2,
@@ -64,12 +82,12 @@ def test_resolve_person_by_email_and_uid_found(mocker):
                         Person=CoPerson(Id=5678),
                     ),
                 ],
-            ).model_dump()
+            ).model_dump_json()
         ),
     ]
 
     client = CoManageClient()
-    person = client.resolve_person_by_email_and_uid(
+    person = await client.resolve_person_by_email_and_uid(
         email="foo.bar@baz.com", uid="http://cilogon.org/serverI/users/2769"
     )
 
@@ -79,15 +97,15 @@ def test_resolve_person_by_email_and_uid_found(mocker):
     assert person.identifier == "http://cilogon.org/serverI/users/2769"
 
 
-def test_resolve_person_by_email_and_uid_not_found(mocker):
+async def test_resolve_person_by_email_and_uid_not_found(mocker):
     mock_get = mocker.patch.object(CoManageClient, "_get")
 
     mock_get.side_effect = [
         mocker.Mock(
-            json=lambda: CoPeopleResponse(CoPeople=[CoPerson(Id=5678)]).model_dump()
+            content=CoPeopleResponse(CoPeople=[CoPerson(Id=5678)]).model_dump_json()
         ),
         mocker.Mock(
-            json=lambda: IdentifiersResponse(
+            content=IdentifiersResponse(
                 Identifiers=[
                     Identifier(
                         Id=1,
@@ -96,7 +114,7 @@ def test_resolve_person_by_email_and_uid_not_found(mocker):
                         Person=CoPerson(Id=5678),
                     )
                 ],
-            ).model_dump()
+            ).model_dump_json()
         ),
     ]
 
@@ -104,18 +122,20 @@ def test_resolve_person_by_email_and_uid_not_found(mocker):
     with pytest.raises(
         PersonNotFound, match="No match for email=a@b.com and uid=someuser"
     ):
-        client.resolve_person_by_email_and_uid("a@b.com", "someuser")
+        await client.resolve_person_by_email_and_uid("a@b.com", "someuser")
 
 
-def test_create_group_success(mocker):
-    mock_post = mocker.patch.object(CoManageClient, "_post")
-    mock_post.return_value.json.return_value = NewObjectResponse(
+async def test_create_group_success(mocker):
+    mock_get = mocker.patch.object(CoManageClient, "_get", return_value=mocker.Mock())
+    mock_get.return_value.content = CoGroupsResponse(CoGroups=[]).model_dump_json()
+    mock_post = mocker.patch.object(CoManageClient, "_post", return_value=mocker.Mock())
+    mock_post.return_value.content = NewObjectResponse(
         ObjectType="CoGroup",
         Id=42,
-    ).model_dump()
+    ).model_dump_json()
 
     client = CoManageClient()
-    group = client.create_group("urn:test:xyz")
+    group = await client.create_group("urn:test:xyz")
 
     assert isinstance(group, Group)
     assert group.id == 42
@@ -129,37 +149,37 @@ def test_create_group_success(mocker):
     assert parsed.CoGroups[0].Status == "Active"
 
 
-def test_get_group_by_name_found(mocker):
-    mock_get = mocker.patch.object(CoManageClient, "_get")
-    mock_get.return_value.json.return_value = CoGroupsResponse(
+async def test_get_group_by_name_found(mocker):
+    mock_get = mocker.patch.object(CoManageClient, "_get", return_value=mocker.Mock())
+    mock_get.return_value.content = CoGroupsResponse(
         CoGroups=[
             CoGroup(Id=1, Name="urn:other"),
             CoGroup(Id=2, Name="urn:target"),
         ],
-    ).model_dump()
+    ).model_dump_json()
 
     client = CoManageClient()
-    group = client.get_group_by_name("urn:target")
+    group = await client.get_group_by_name("urn:target")
 
     assert isinstance(group, Group)
     assert group.id == 2
     assert group.name == "urn:target"
 
 
-def test_get_group_by_name_not_found(mocker):
-    mock_get = mocker.patch.object(CoManageClient, "_get")
-    mock_get.return_value.json.return_value = CoGroupsResponse(CoGroups=[]).model_dump()
+async def test_get_group_by_name_not_found(mocker):
+    mock_get = mocker.patch.object(CoManageClient, "_get", return_value=mocker.Mock())
+    mock_get.return_value.content = CoGroupsResponse(CoGroups=[]).model_dump_json()
 
     client = CoManageClient()
-    assert client.get_group_by_name("urn:missing") is None
+    assert await client.get_group_by_name("urn:missing") is None
 
 
-def test_add_person_to_group(mocker):
+async def test_add_person_to_group(mocker):
     mock_post = mocker.patch.object(CoManageClient, "_post")
     client = CoManageClient()
     end = datetime(2025, 7, 20, 23, 59, 59)
 
-    client.add_person_to_group(person_id=5678, group_id=1000, valid_through=end)
+    await client.add_person_to_group(person_id=5678, group_id=1000, valid_through=end)
 
     payload = mock_post.call_args.kwargs["json"]
     parsed = AddGroupMemberRequest.model_validate(payload)
@@ -188,33 +208,33 @@ def test_group_member_payload_omits_valid_through_if_none():
     assert "ValidThrough" not in dumped["CoGroupMembers"][0]
 
 
-def test_remove_person_from_group(mocker):
-    mock_get = mocker.patch.object(CoManageClient, "_get")
+async def test_remove_person_from_group(mocker):
+    mock_get = mocker.patch.object(CoManageClient, "_get", return_value=mocker.Mock())
     mock_delete = mocker.patch.object(CoManageClient, "_delete")
 
-    mock_get.return_value.json.return_value = CoGroupMemberResponse(
+    mock_get.return_value.content = CoGroupMemberResponse(
         CoGroupMembers=[CoGroupMember(Id=777)],
-    ).model_dump()
+    ).model_dump_json()
 
     client = CoManageClient()
-    client.remove_person_from_group(person_id=5678, group_id=1000)
+    await client.remove_person_from_group(person_id=5678, group_id=1000)
 
-    mock_delete.assert_called_once_with("/co_group_members/777.json")
+    mock_delete.assert_awaited_once_with("/co_group_members/777.json")
 
 
-def test_remove_person_from_group_missing(mocker):
-    mock_get = mocker.patch.object(CoManageClient, "_get")
+async def test_remove_person_from_group_missing(mocker):
+    mock_get = mocker.patch.object(CoManageClient, "_get", return_value=mocker.Mock())
 
-    mock_get.return_value.json.return_value = CoGroupMemberResponse(
+    mock_get.return_value.content = CoGroupMemberResponse(
         CoGroupMembers=[]
-    ).model_dump()
+    ).model_dump_json()
 
     client = CoManageClient()
     with pytest.raises(MembershipNotFound, match="not in group"):
-        client.remove_person_from_group(person_id=1, group_id=2)
+        await client.remove_person_from_group(person_id=1, group_id=2)
 
 
-def test_retry_on_request_error(mocker):
+async def test_retry_on_request_error(mocker):
 
     # Patch client.client.request so client._request receives a RequestError
     client = CoManageClient()
@@ -226,6 +246,581 @@ def test_retry_on_request_error(mocker):
     # backoff multiplier of 1, this real-time test doesn't take too long. If
     # thhose defaults change we'll need to patch things a bit more deeply.
     with pytest.raises(httpx.ConnectError):
-        client._get("/fail")
+        await client._get("/fail")
 
     assert mock_request.call_count == settings.comanage_retry_attempts
+
+
+async def test_get_group_by_name_uses_fresh_index(mocker):
+    mock_get = mocker.patch.object(CoManageClient, "_get", return_value=mocker.Mock())
+    mock_get.return_value.content = CoGroupsResponse(
+        CoGroups=[CoGroup(Id=1, Name="urn:a"), CoGroup(Id=2, Name="urn:b")],
+    ).model_dump_json()
+
+    client = CoManageClient()
+    assert (await client.get_group_by_name("urn:a")).id == 1
+    assert (await client.get_group_by_name("urn:b")).id == 2
+
+    assert mock_get.await_count == 1
+    stats = client.cache_stats()["group"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 2)
+
+
+async def test_get_group_by_name_trusts_misses_for_negative_ttl(mocker):
+    mock_get = mocker.patch.object(CoManageClient, "_get", return_value=mocker.Mock())
+    mock_get.return_value.content = CoGroupsResponse(
+        CoGroups=[CoGroup(Id=1, Name="urn:a")],
+    ).model_dump_json()
+    clock = mocker.patch("rems_co.comanage_api.cache.time.monotonic")
+    clock.return_value = 1000.0
+
+    client = CoManageClient()
+    client.group_index.ttl_seconds = 60
+    client.group_index.negative_ttl_seconds = 10
+    await client.get_group_by_name("urn:a")
+    assert await client.get_group_by_name("urn:missing") is None
+    assert mock_get.await_count == 1
+
+    clock.return_value = 1011.0
+    assert (await client.get_group_by_name("urn:a")).id == 1
+    assert mock_get.await_count == 1
+    assert await client.get_group_by_name("urn:missing") is None
+    assert mock_get.await_count == 2
+
+    clock.return_value = 1072.0
+    await client.get_group_by_name("urn:a")
+    assert mock_get.await_count == 3
+
+
+async def test_create_group_inserts_into_index(mocker):
+    mock_get = mocker.patch.object(CoManageClient, "_get", return_value=mocker.Mock())
+    mock_get.return_value.content = CoGroupsResponse(CoGroups=[]).model_dump_json()
+    mock_post = mocker.patch.object(CoManageClient, "_post", return_value=mocker.Mock())
+    mock_post.return_value.content = NewObjectResponse(
+        ObjectType="CoGroup", Id=42
+    ).model_dump_json()
+
+    client = CoManageClient()
+    assert await client.get_group_by_name("urn:new") is None
+    await client.create_group("urn:new")
+    assert mock_get.await_count == 2
+
+    assert (await client.get_group_by_name("urn:new")).id == 42
+    assert mock_get.await_count == 2
+
+
+async def test_create_group_reloads_index_before_posting(mocker):
+    listings = [
+        CoGroupsResponse(CoGroups=[]),
+        CoGroupsResponse(CoGroups=[CoGroup(Id=7, Name="urn:new")]),
+    ]
+    mocker.patch.object(
+        CoManageClient,
+        "_get",
+        side_effect=[mocker.Mock(content=g.model_dump_json()) for g in listings],
+    )
+    mock_post = mocker.patch.object(CoManageClient, "_post")
+
+    client = CoManageClient()
+    assert await client.get_group_by_name("urn:new") is None
+    group = await client.create_group("urn:new")
+
+    assert group.id == 7
+    mock_post.assert_not_awaited()
+
+
+async def test_add_person_404_drops_group_from_index(mocker):
+    response = httpx.Response(404, request=httpx.Request("POST", "http://x"))
+    mocker.patch.object(
+        CoManageClient,
+        "_post",
+        side_effect=COmanageAPIError("gone", response=response),
+    )
+
+    client = CoManageClient()
+    client.group_index.add(Group(id=1000, name="urn:gone"))
+    with pytest.raises(COmanageAPIError):
+        await client.add_person_to_group(
+            person_id=5678, group_id=1000, valid_through=None
+        )
+
+    assert client.group_index.get("urn:gone") is None
+
+
+async def test_resolve_person_is_cached(mocker):
+    mock_resolve = mocker.patch.object(
+        CoManageClient,
+        "_resolve_person",
+        return_value=Person(id=5678, email="a@b.com", identifier="uid"),
+    )
+
+    client = CoManageClient()
+    first = await client.resolve_person_by_email_and_uid("a@b.com", "uid")
+    second = await client.resolve_person_by_email_and_uid("a@b.com", "uid")
+
+    assert first == second
+    assert mock_resolve.await_count == 1
+    assert client.cache_stats()["person"]["hits"] == 1
+    assert client.cache_stats()["person"]["misses"] == 1
+
+
+async def test_resolve_person_not_found_is_negatively_cached(mocker):
+    mock_resolve = mocker.patch.object(
+        CoManageClient, "_resolve_person", side_effect=PersonNotFound("nope")
+    )
+    clock = mocker.patch("rems_co.comanage_api.cache.time.monotonic")
+    clock.return_value = 1000.0
+
+    client = CoManageClient()
+    client.person_not_found_cache.ttl_seconds = 30
+    for _ in range(2):
+        with pytest.raises(PersonNotFound, match="nope"):
+            await client.resolve_person_by_email_and_uid("a@b.com", "uid")
+    assert mock_resolve.await_count == 1
+
+    clock.return_value = 1031.0
+    with pytest.raises(PersonNotFound):
+        await client.resolve_person_by_email_and_uid("a@b.com", "uid")
+    assert mock_resolve.await_count == 2
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+async def test_identifier_lookups_stop_at_first_match(mocker):
+    slow_lookup_cancelled = asyncio.Event()
+
+    async def has_identifier(person_id, uid):
+        if person_id == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                slow_lookup_cancelled.set()
+                raise
+        return person_id == 2
+
+    mocker.patch.object(
+        CoManageClient, "_person_has_identifier", side_effect=has_identifier
+    )
+
+    client = CoManageClient()
+    match = await asyncio.wait_for(
+        client._first_person_with_identifier([1, 2, 3], "uid"), timeout=1
+    )
+
+    assert match == 2
+    assert slow_lookup_cancelled.is_set()
+
+
+async def test_identifier_lookup_failure_ignored_if_another_matches(mocker):
+    async def has_identifier(person_id, uid):
+        if person_id == 1:
+            raise COmanageAPIError("boom")
+        return person_id == 2
+
+    mocker.patch.object(
+        CoManageClient, "_person_has_identifier", side_effect=has_identifier
+    )
+
+    client = CoManageClient()
+    assert await client._first_person_with_identifier([1, 2], "uid") == 2
+    with pytest.raises(COmanageAPIError, match="boom"):
+        await client._first_person_with_identifier([1, 3], "uid")
+
+
+def _member(person_id, group_id):
+    return CoGroupMemberPayload(
+        CoGroupId=group_id, Person=PersonRef(Id=person_id), ValidThrough=None
+    )
+
+
+async def test_add_people_to_groups_chunks_requests(mocker):
+    mock_post = mocker.patch.object(CoManageClient, "_post")
+    mocker.patch.object(settings, "comanage_bulk_add_chunk_size", 2)
+
+    client = CoManageClient()
+    results = await client.add_people_to_groups([_member(p, 1000) for p in range(5)])
+
+    assert results == [None] * 5
+    sizes = [
+        len(call.kwargs["json"]["CoGroupMembers"]) for call in mock_post.await_args_list
+    ]
+    assert sizes == [2, 2, 1]
+
+
+async def test_add_people_to_groups_falls_back_to_single_posts(mocker):
+    rejected = httpx.Response(400, request=httpx.Request("POST", "http://x"))
+    already = httpx.Response(403, request=httpx.Request("POST", "http://x"))
+    already.extensions["reason_phrase"] = b"Already Member"
+
+    async def post(path, json):
+        if len(json["CoGroupMembers"]) > 1:
+            raise COmanageAPIError("batch rejected", response=rejected)
+        if json["CoGroupMembers"][0]["Person"]["Id"] == 2:
+            raise COmanageAPIError("already", response=already)
+
+    mock_post = mocker.patch.object(CoManageClient, "_post", side_effect=post)
+
+    client = CoManageClient()
+    results = await client.add_people_to_groups([_member(p, 1000) for p in (1, 2)])
+
+    assert results[0] is None
+    assert isinstance(results[1], AlreadyMemberOfGroup)
+    assert mock_post.await_count == 3
+
+
+async def test_add_people_to_groups_server_error_skips_fallback(mocker):
+    failure = httpx.Response(500, request=httpx.Request("POST", "http://x"))
+    mock_post = mocker.patch.object(
+        CoManageClient,
+        "_post",
+        side_effect=COmanageAPIError("down", response=failure),
+    )
+
+    client = CoManageClient()
+    results = await client.add_people_to_groups([_member(p, 1000) for p in (1, 2)])
+
+    assert all(isinstance(r, COmanageAPIError) for r in results)
+    assert mock_post.await_count == 1
+
+
+def _identifiers(person_id, *uids):
+    return IdentifiersResponse(
+        Identifiers=[
+            Identifier(Id=i, Identifier=uid, Type="eppn", Person=CoPerson(Id=person_id))
+            for i, uid in enumerate(uids)
+        ]
+    ).model_dump_json()
+
+
+async def test_group_index_loads_listing_page_by_page(mocker):
+    mocker.patch.object(settings, "comanage_page_size", 2)
+    pages = [
+        [CoGroup(Id=1, Name="urn:a"), CoGroup(Id=2, Name="urn:b")],
+        [CoGroup(Id=3, Name="urn:c")],
+    ]
+    mock_get = mocker.patch.object(
+        CoManageClient,
+        "_get",
+        side_effect=[
+            mocker.Mock(content=CoGroupsResponse(CoGroups=p).model_dump_json())
+            for p in pages
+        ],
+    )
+
+    client = CoManageClient()
+    assert (await client.get_group_by_name("urn:c")).id == 3
+
+    assert [c.kwargs["params"]["page"] for c in mock_get.await_args_list] == [1, 2]
+    assert all(c.kwargs["params"]["limit"] == 2 for c in mock_get.await_args_list)
+    assert len(client.group_index) == 3
+
+
+@pytest.mark.parametrize("honours_limit", [False, True])
+async def test_paging_stops_when_registry_ignores_paging(monkeypatch, honours_limit):
+    monkeypatch.setattr(settings, "comanage_page_size", 2)
+    groups = [CoGroup(Id=i, Name=f"urn:{i}") for i in range(1, 6)]
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        listed = groups[:2] if honours_limit else groups
+        return httpx.Response(
+            200, content=CoGroupsResponse(CoGroups=listed).model_dump_json()
+        )
+
+    async with CoManageClient(transport=httpx.MockTransport(handler)) as client:
+        await client.refresh_group_index()
+        found = [i for i in range(1, 6) if client.group_index.get(f"urn:{i}")]
+
+    assert found == ([1, 2] if honours_limit else [1, 2, 3, 4, 5])
+    assert len(requests) == (2 if honours_limit else 1)
+
+
+async def test_identifier_pages_stop_at_first_match(mocker):
+    mocker.patch.object(settings, "comanage_page_size", 1)
+    mock_get = mocker.patch.object(
+        CoManageClient,
+        "_get",
+        side_effect=[
+            mocker.Mock(content=_identifiers(7, "other")),
+            mocker.Mock(content=_identifiers(7, "uid")),
+            mocker.Mock(content=_identifiers(7, "never-fetched")),
+        ],
+    )
+
+    client = CoManageClient()
+    assert await client._person_has_identifier(7, "uid") is True
+    assert mock_get.await_count == 2
+
+
+async def test_resolve_person_stops_paging_people_once_matched(mocker):
+    mocker.patch.object(settings, "comanage_page_size", 1)
+    people = {
+        1: CoPeopleResponse(CoPeople=[CoPerson(Id=10)]).model_dump_json(),
+        2: CoPeopleResponse(CoPeople=[CoPerson(Id=20)]).model_dump_json(),
+    }
+
+    async def get(path, params):
+        if path == "/co_people.json":
+            return mocker.Mock(content=people[params["page"]])
+        uid = "uid" if params["copersonid"] == 10 else "other"
+        return mocker.Mock(content=_identifiers(params["copersonid"], uid))
+
+    mock_get = mocker.patch.object(CoManageClient, "_get", side_effect=get)
+
+    client = CoManageClient()
+    person = await client.resolve_person_by_email_and_uid("a@b.com", "uid")
+
+    assert person.id == 10
+    people_pages = [
+        c.kwargs["params"]["page"]
+        for c in mock_get.await_args_list
+        if c.args[0] == "/co_people.json"
+    ]
+    assert people_pages == [1]
+
+
+async def test_open_connections_is_capped_by_keepalive_pool(mocker, monkeypatch):
+    monkeypatch.setattr(settings, "comanage_max_keepalive_connections", 2)
+    mock_get = mocker.patch.object(
+        CoManageClient, "_get", return_value=httpx.Response(200)
+    )
+
+    async with CoManageClient() as client:
+        await client.open_connections(5)
+
+    assert mock_get.await_count == 2
+    assert mock_get.call_args.kwargs["params"]["limit"] == 1
+
+
+def _members_response(mocker, *pairs):
+    return mocker.Mock(
+        content=CoGroupMemberResponse(
+            CoGroupMembers=[
+                CoGroupMember(Id=member_id, Person=PersonRef(Id=person_id))
+                for person_id, member_id in pairs
+            ]
+        ).model_dump_json()
+    )
+
+
+async def test_membership_index_answers_our_own_repeat_approvals(
+    mocker, membership_index
+):
+    mock_get = mocker.patch.object(CoManageClient, "_get")
+    mock_post = mocker.patch.object(CoManageClient, "_post")
+    mock_post.return_value.content = NewObjectResponse(
+        ObjectType="CoGroupMember", Id=778
+    ).model_dump_json()
+
+    client = CoManageClient()
+    await client.add_person_to_group(9999, 1000, None)
+    with pytest.raises(AlreadyMemberOfGroup):
+        await client.add_person_to_group(9999, 1000, None)
+    await client.add_person_to_group(5678, 1000, None)
+
+    mock_get.assert_not_awaited()
+    assert mock_post.await_count == 2
+
+
+async def test_listed_members_are_still_posted(mocker, membership_index):
+    mocker.patch.object(
+        CoManageClient, "_get", return_value=_members_response(mocker, (5678, 777))
+    )
+    mock_post = mocker.patch.object(CoManageClient, "_post")
+
+    client = CoManageClient()
+    await client._group_memberships(1000)
+    await client.add_person_to_group(5678, 1000, None)
+
+    mock_post.assert_awaited_once()
+
+
+async def test_membership_index_lets_revokes_go_straight_to_delete(
+    mocker, membership_index
+):
+    mock_get = mocker.patch.object(
+        CoManageClient,
+        "_get",
+        side_effect=[
+            _members_response(mocker, (5678, 777)),
+            _members_response(mocker),
+            _members_response(mocker),
+        ],
+    )
+    mock_delete = mocker.patch.object(CoManageClient, "_delete")
+
+    client = CoManageClient()
+    await client.remove_person_from_group(person_id=5678, group_id=1000)
+    assert mock_get.await_count == 2
+    with pytest.raises(MembershipNotFound):
+        await client.remove_person_from_group(person_id=5678, group_id=1000)
+
+    mock_delete.assert_awaited_once_with("/co_group_members/777.json")
+    assert mock_get.call_args.kwargs["params"]["copersonid"] == 5678
+
+
+async def test_revoke_confirms_index_miss_with_comanage(mocker, membership_index):
+    mock_get = mocker.patch.object(
+        CoManageClient,
+        "_get",
+        side_effect=[_members_response(mocker), _members_response(mocker, (5, 99))],
+    )
+    mock_delete = mocker.patch.object(CoManageClient, "_delete")
+
+    client = CoManageClient()
+    await client._group_memberships(1000)
+    await client.remove_person_from_group(person_id=5, group_id=1000)
+
+    assert mock_get.await_count == 2
+    mock_delete.assert_awaited_once_with("/co_group_members/99.json")
+
+
+async def test_revoke_removes_records_missing_from_stale_listing(
+    mocker, membership_index
+):
+    mock_get = mocker.patch.object(
+        CoManageClient,
+        "_get",
+        side_effect=[
+            _members_response(mocker, (1, 5)),
+            _members_response(mocker, (1, 9)),
+        ],
+    )
+    gone = httpx.Response(404, request=httpx.Request("DELETE", "http://x"))
+    mock_delete = mocker.patch.object(
+        CoManageClient,
+        "_delete",
+        side_effect=[COmanageAPIError("gone", response=gone), None],
+    )
+
+    client = CoManageClient()
+    removal = await client.remove_person_from_group(person_id=1, group_id=10)
+
+    assert [c.args[0] for c in mock_delete.await_args_list] == [
+        "/co_group_members/5.json",
+        "/co_group_members/9.json",
+    ]
+    assert mock_get.call_args.kwargs["params"]["copersonid"] == 1
+    assert removal.already_gone == [5]
+    assert removal.deleted == [9]
+
+
+async def test_bulk_added_member_is_removed_after_id_lookup(mocker, membership_index):
+    mock_get = mocker.patch.object(
+        CoManageClient,
+        "_get",
+        side_effect=[_members_response(mocker), _members_response(mocker, (1, 55))],
+    )
+    mocker.patch.object(CoManageClient, "_post")
+    mock_delete = mocker.patch.object(CoManageClient, "_delete")
+
+    client = CoManageClient()
+    await client._group_memberships(1000)
+    await client.add_people_to_groups([_member(p, 1000) for p in (1, 2)])
+    await client.remove_person_from_group(person_id=1, group_id=1000)
+
+    assert mock_get.call_args.kwargs["params"]["copersonid"] == 1
+    mock_delete.assert_awaited_once_with("/co_group_members/55.json")
+
+
+def test_membership_index_replays_writes_made_during_load():
+    index = MembershipIndex(maxsize=10, ttl_seconds=60)
+
+    index.start_load(1000)
+    index.add(1000, 1, 11)
+    index.remove(1000, 2)
+    index.load(1000, [(2, 22), (3, 33)])
+
+    assert index.members(1000) == {1: [11], 3: [33]}
+
+
+async def test_remove_person_deletes_records_concurrently(mocker):
+    mocker.patch.object(
+        CoManageClient,
+        "_get",
+        return_value=_members_response(mocker, (5, 1), (5, 2), (5, 3)),
+    )
+    in_flight = 0
+    peak = 0
+
+    async def delete(path):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if path == "/co_group_members/2.json":
+            gone = httpx.Response(404, request=httpx.Request("DELETE", "http://x"))
+            raise COmanageAPIError("gone", response=gone)
+
+    mocker.patch.object(CoManageClient, "_delete", side_effect=delete)
+
+    client = CoManageClient()
+    removal = await client.remove_person_from_group(person_id=5, group_id=1000)
+
+    assert peak == 3
+    assert removal.deleted == [1, 3]
+    assert removal.already_gone == [2]
+    assert not removal.failed
+
+
+async def test_remove_person_raises_after_all_deletes_finish(mocker, membership_index):
+    mocker.patch.object(
+        CoManageClient, "_get", return_value=_members_response(mocker, (5, 1), (5, 2))
+    )
+    failure = httpx.Response(500, request=httpx.Request("DELETE", "http://x"))
+    mock_delete = mocker.patch.object(
+        CoManageClient,
+        "_delete",
+        side_effect=[COmanageAPIError("boom", response=failure), None],
+    )
+
+    client = CoManageClient()
+    with pytest.raises(COmanageAPIError, match="boom"):
+        await client.remove_person_from_group(person_id=5, group_id=1000)
+
+    assert mock_delete.await_count == 2
+    assert client.membership_index.members(1000) == {5: None}
+
+
+async def test_approval_after_failed_revoke_is_posted(mocker, membership_index):
+    mocker.patch.object(
+        CoManageClient, "_get", return_value=_members_response(mocker, (1, 5))
+    )
+    failure = httpx.Response(500, request=httpx.Request("DELETE", "http://x"))
+    mocker.patch.object(
+        CoManageClient,
+        "_delete",
+        side_effect=COmanageAPIError("boom", response=failure),
+    )
+    mock_post = mocker.patch.object(CoManageClient, "_post")
+
+    client = CoManageClient()
+    with pytest.raises(COmanageAPIError):
+        await client.remove_person_from_group(person_id=1, group_id=10)
+    await client.add_person_to_group(1, 10, None)
+
+    mock_post.assert_awaited_once()
+
+
+async def test_http2_falls_back_when_h2_is_missing(mocker, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "comanage_http2", True)
+    mocker.patch("importlib.util.find_spec", return_value=None)
+    pool = mocker.spy(httpx, "AsyncClient")
+
+    async with CoManageClient():
+        pass
+
+    assert pool.call_args.kwargs["http2"] is False
+    assert "h2 package is not installed" in caplog.text
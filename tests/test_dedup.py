@@ -0,0 +1,57 @@
+from rems_co.models import ApproveEvent, EventOutcome, RevokeEvent
+from rems_co.service import dedup as dedup_module
+from rems_co.service.dedup import DedupWindow
+from rems_co.service.planner import EventResult
+from tests.conftest import make_event
+
+
+def applied(event, outcome=EventOutcome.ADDED):
+    return [EventResult(event, outcome)]
+
+
+def test_exact_repeat_of_applied_event_is_dropped():
+    window = DedupWindow(60)
+    approve = make_event(ApproveEvent)
+    window.record(applied(approve))
+
+    assert window.drop_duplicates([make_event(ApproveEvent)]) == []
+    other = make_event(ApproveEvent, application=25)
+    assert window.drop_duplicates([other]) == [other]
+
+
+def test_repeat_of_superseded_event_is_kept():
+    window = DedupWindow(60)
+    approve = make_event(ApproveEvent)
+    window.record(applied(approve))
+    window.record(applied(make_event(RevokeEvent), EventOutcome.REMOVED))
+
+    assert not window.is_duplicate(approve)
+
+
+def test_failed_events_are_not_remembered():
+    window = DedupWindow(60)
+    approve = make_event(ApproveEvent)
+    window.record(applied(approve, EventOutcome.FAILED))
+
+    assert not window.is_duplicate(approve)
+
+
+def test_entries_expire_after_two_windows(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(dedup_module.time, "monotonic", lambda: now)
+    window = DedupWindow(60)
+    approve = make_event(ApproveEvent)
+    window.record(applied(approve))
+
+    now += 90
+    assert window.is_duplicate(approve)
+    now += 60
+    assert not window.is_duplicate(approve)
+
+
+def test_disabled_window_keeps_everything():
+    window = DedupWindow(0)
+    approve = make_event(ApproveEvent)
+    window.record(applied(approve))
+
+    assert not window.is_duplicate(approve)
@@ -0,0 +1,92 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from rems_co.main import app
+from rems_co.models import ApproveEvent, EventOutcome
+from rems_co.service.planner import EventResult
+from rems_co.service.reconcile import ReconcileReport
+from rems_co.settings import settings
+
+APPROVE_PAYLOAD = [
+    {
+        "application": 24,
+        "resource": "urn:nbn:fi:lb-201403262",
+        "user": "alice",
+        "mail": "alice@example.com",
+        "end": "2025-07-20T23:59:59.000Z",
+    }
+]
+
+
+@pytest.fixture
+def test_app(queue_settings):
+    with TestClient(app) as client:
+        yield client
+
+
+def test_approve_is_queued_and_accepted(test_app):
+    response = test_app.post("/approve", json=APPROVE_PAYLOAD * 2)
+
+    assert response.status_code == 202
+    assert response.json() == {"status": "accepted", "queued": 2}
+    assert test_app.portal.call(app.state.event_queue.depth) == 2
+
+
+def test_revoke_is_queued_and_accepted(test_app):
+    response = test_app.post("/revoke", json=APPROVE_PAYLOAD)
+
+    assert response.status_code == 202
+    assert test_app.portal.call(app.state.event_queue.depth) == 1
+
+
+def test_lifespan_closes_client_on_shutdown(queue_settings):
+    with TestClient(app):
+        shared = app.state.comanage_client
+        assert not shared.client.is_closed
+    assert shared.client.is_closed
+
+
+def test_ready_reports_warm_up_state(test_app):
+    assert test_app.get("/ready").json() == {"status": "ready"}
+
+    app.state.warmup.ready = False
+    response = test_app.get("/ready")
+
+    assert response.status_code == 503
+    assert test_app.get("/").json() == {"status": "ok"}
+
+
+def test_repeat_of_applied_event_is_not_queued(test_app):
+    event = ApproveEvent.model_validate(APPROVE_PAYLOAD[0])
+    app.state.dedup.record([EventResult(event, EventOutcome.ADDED)])
+
+    response = test_app.post("/approve", json=APPROVE_PAYLOAD)
+
+    assert response.json() == {"status": "accepted", "queued": 0, "duplicates": 1}
+    assert test_app.portal.call(app.state.event_queue.depth) == 0
+
+
+def test_admin_routes_are_disabled_without_a_token(test_app, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "")
+
+    response = test_app.post("/admin/reconcile?group=urn:a", json=[])
+
+    assert response.status_code == 404
+
+
+def test_admin_routes_require_the_token(test_app, monkeypatch, mocker):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    reconcile = mocker.patch(
+        "rems_co.listeners.admin.reconcile", return_value=ReconcileReport(dry_run=False)
+    )
+
+    denied = test_app.post(
+        "/admin/reconcile", json=[], headers={"Authorization": "Bearer wrong"}
+    )
+    allowed = test_app.post(
+        "/admin/reconcile", json=[], headers={"Authorization": "Bearer s3cret"}
+    )
+
+    assert denied.status_code == 401
+    assert allowed.json() == ReconcileReport(dry_run=False).as_dict()
+    reconcile.assert_awaited_once()
@@ -0,0 +1,42 @@
+import asyncio
+
+from rems_co.service.executor import run_keyed
+
+
+async def test_run_keyed_orders_same_key_and_overlaps_others():
+    log = []
+    running = 0
+    peak = 0
+
+    async def work(item):
+        nonlocal running, peak
+        key, n = item
+        running += 1
+        peak = max(peak, running)
+        log.append(("start", key, n))
+        await asyncio.sleep(0.01)
+        log.append(("end", key, n))
+        running -= 1
+        return f"{key}{n}"
+
+    items = [("a", 1), ("b", 1), ("a", 2), ("c", 1), ("a", 3)]
+    results = await run_keyed(items, key=lambda i: i[0], fn=work, limit=2)
+
+    assert results == ["a1", "b1", "a2", "c1", "a3"]
+    assert peak == 2
+    a_events = [entry for entry in log if entry[1] == "a"]
+    assert a_events == [
+        ("start", "a", 1),
+        ("end", "a", 1),
+        ("start", "a", 2),
+        ("end", "a", 2),
+        ("start", "a", 3),
+        ("end", "a", 3),
+    ]
+
+
+async def test_run_keyed_with_no_items():
+    async def work(item):
+        raise AssertionError("not called")
+
+    assert await run_keyed([], key=lambda i: i, fn=work, limit=4) == []
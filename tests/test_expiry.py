@@ -0,0 +1,96 @@
+from datetime import UTC, datetime
+
+import pytest
+
+from rems_co.models import ApproveEvent, EventOutcome, RevokeEvent
+from rems_co.service.expiry import ExpiryScheduler
+from rems_co.service.planner import EventResult
+from tests.conftest import make_event
+
+END = datetime(2030, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+def scheduler(tmp_path, queue):
+    s = ExpiryScheduler(str(tmp_path / "queue.db"), queue, batch_window=1)
+    s.open()
+    yield s
+    s.close()
+
+
+async def test_observe_schedules_and_cancels_expiries(scheduler):
+    approve = make_event(ApproveEvent, "alice", "urn:a", end=END)
+    await scheduler.observe([EventResult(approve, EventOutcome.ADDED)])
+    assert scheduler.next_deadline() == END.timestamp()
+
+    failed = make_event(RevokeEvent, "alice", "urn:a")
+    await scheduler.observe([EventResult(failed, EventOutcome.FAILED)])
+    assert len(scheduler) == 1
+
+    await scheduler.observe([EventResult(failed, EventOutcome.REMOVED)])
+    assert len(scheduler) == 0
+    assert scheduler.next_deadline() is None
+
+
+async def test_revoke_due_batches_revocations_into_queue(scheduler, queue):
+    results = [
+        EventResult(make_event(ApproveEvent, user, "urn:a", end=END), outcome)
+        for user, outcome in [
+            ("alice", EventOutcome.ADDED),
+            ("bob", EventOutcome.ALREADY_MEMBER),
+            ("carol", EventOutcome.PERSON_NOT_FOUND),
+        ]
+    ]
+    await scheduler.observe(results)
+
+    assert await scheduler.revoke_due(now=END.timestamp() - 60) == 0
+    assert await scheduler.revoke_due(now=END.timestamp() - 0.5) == 2
+
+    claimed = await queue.claim(10)
+    assert sorted((type(i.event), i.event.user) for i in claimed) == [
+        (RevokeEvent, "alice"),
+        (RevokeEvent, "bob"),
+    ]
+    assert len(scheduler) == 0
+
+
+async def test_revoke_due_defers_keys_with_queued_events(scheduler, queue):
+    await scheduler.observe(
+        [
+            EventResult(
+                make_event(ApproveEvent, "alice", "urn:a", end=END), EventOutcome.ADDED
+            )
+        ]
+    )
+    await queue.put([make_event(ApproveEvent, "alice", "urn:a")])
+
+    assert await scheduler.revoke_due(now=END.timestamp()) == 0
+    assert len(scheduler) == 1
+    deadline = scheduler.next_deadline()
+    assert deadline > END.timestamp()
+    [item] = await queue.claim(10)
+    assert isinstance(item.event, ApproveEvent)
+
+    # The queued event never reaches observe (e.g. it is dead-lettered), so
+    # the deferred expiry still revokes the membership.
+    await queue.complete([item.id])
+    assert await scheduler.revoke_due(now=deadline) == 1
+    assert [type(i.event) for i in await queue.claim(10)] == [RevokeEvent]
+
+
+async def test_expiries_survive_reopen(tmp_path, scheduler, queue):
+    await scheduler.observe(
+        [
+            EventResult(
+                make_event(ApproveEvent, "alice", "urn:a", end=END), EventOutcome.ADDED
+            )
+        ]
+    )
+    scheduler.close()
+
+    reopened = ExpiryScheduler(str(tmp_path / "queue.db"), queue, batch_window=1)
+    reopened.open()
+    try:
+        assert reopened.next_deadline() == END.timestamp()
+    finally:
+        reopened.close()
@@ -0,0 +1,48 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.exceptions import COmanageAPIError
+from rems_co.main import app
+from rems_co.metrics import path_template
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_path_template_replaces_ids():
+    assert path_template("/co_group_members/777.json") == "/co_group_members/{id}.json"
+    assert path_template("/co_groups.json") == "/co_groups.json"
+
+
+async def test_request_latency_and_errors_are_recorded(mocker):
+    client = CoManageClient()
+    request = httpx.Request("DELETE", "http://x/co_group_members/1.json")
+    mocker.patch.object(
+        client.client, "request", return_value=httpx.Response(404, request=request)
+    )
+    labels = {"method": "DELETE", "path": "/co_group_members/{id}.json"}
+    count = sample("rems_co_comanage_request_seconds_count", **labels)
+    errors = sample("rems_co_comanage_request_errors_total", **labels, status="404")
+
+    with pytest.raises(COmanageAPIError):
+        await client._request("delete", "/co_group_members/1.json")
+
+    assert sample("rems_co_comanage_request_seconds_count", **labels) == count + 1
+    assert (
+        sample("rems_co_comanage_request_errors_total", **labels, status="404")
+        == errors + 1
+    )
+
+
+def test_metrics_endpoint_exposes_cache_stats(queue_settings):
+    with TestClient(app) as test_app:
+        response = test_app.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'rems_co_cache_hit_ratio{cache="person"}' in response.text
+    assert 'rems_co_cache_hits_total{cache="group"}' in response.text
+    assert "rems_co_events_processed_total" in response.text
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from rems_co.comanage_api import parsing
+from rems_co.settings import settings
+
+GROUPS = json.dumps(
+    {
+        "ResponseType": "CoGroups",
+        "Version": "1.0",
+        "CoGroups": [
+            {
+                "Version": "1.0",
+                "Id": "7",
+                "CoId": "2",
+                "Name": "urn:a",
+                "Description": "Group associated with read access to resource urn:a",
+                "Open": False,
+                "Status": "Active",
+                "Created": "2024-01-01 00:00:00",
+            }
+        ],
+    }
+).encode()
+
+IDENTIFIERS = json.dumps(
+    {
+        "ResponseType": "Identifiers",
+        "Version": "1.0",
+        "Identifiers": [
+            {
+                "Id": "1",
+                "Identifier": "alice",
+                "Type": "eppn",
+                "Login": False,
+                "Person": {"Type": "CO", "Id": "5"},
+            }
+        ],
+    }
+).encode()
+
+
+@pytest.fixture(params=[False, True], ids=["strict", "lean"])
+def lean(request, monkeypatch):
+    monkeypatch.setattr(settings, "comanage_lean_parsing", request.param)
+    return request.param
+
+
+def test_list_responses_parse_alike_in_both_modes(lean):
+    assert parsing.groups(GROUPS) == [(7, "urn:a")]
+    assert parsing.identifier_values(IDENTIFIERS) == ["alice"]
+    assert parsing.person_ids(b'{"CoPeople": [{"Id": "5", "Status": "A"}]}') == [5]
+
+
+def test_lean_mode_skips_envelope_checks(monkeypatch):
+    body = b'{"ResponseType": "Unexpected", "CoGroups": [{"Id": 1, "Name": "x"}]}'
+
+    monkeypatch.setattr(settings, "comanage_lean_parsing", True)
+    assert parsing.groups(body) == [(1, "x")]
+
+    monkeypatch.setattr(settings, "comanage_lean_parsing", False)
+    with pytest.raises(ValueError):
+        parsing.groups(body)
+
+
+def test_dumps_produces_compact_json():
+    payload = {"CoGroupMembers": [{"CoGroupId": 1, "Member": True}]}
+    assert json.loads(parsing.dumps(payload)) == payload
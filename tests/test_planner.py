@@ -0,0 +1,110 @@
+import pytest
+
+from rems_co.exceptions import AlreadyMemberOfGroup, COmanageAPIError, PersonNotFound
+from rems_co.models import ApproveEvent, EventOutcome, Group, Person, RevokeEvent
+from rems_co.service.planner import process_batch
+from rems_co.service.rems_handlers import load_resource_policy
+from rems_co.settings import settings
+from tests.conftest import make_event
+
+
+@pytest.fixture
+def known_world(mock_client):
+    people = {"alice": 1, "malice": 2}
+    groups = {"urn:a": 101, "urn:b": 102}
+
+    async def resolve(email, uid):
+        if uid not in people:
+            raise PersonNotFound(f"No match for email={email}")
+        return Person(id=people[uid], email=email, identifier=uid)
+
+    async def get_group(name):
+        return Group(id=groups[name], name=name) if name in groups else None
+
+    async def add_all(members):
+        return [None] * len(members)
+
+    mock_client.resolve_person_by_email_and_uid.side_effect = resolve
+    mock_client.get_group_by_name.side_effect = get_group
+    mock_client.add_people_to_groups.side_effect = add_all
+    return mock_client
+
+
+async def test_process_batch_resolves_each_person_and_group_once(known_world):
+    events = [
+        make_event(ApproveEvent, user, resource)
+        for user in ("alice", "malice")
+        for resource in ("urn:a", "urn:b")
+    ]
+
+    results = await process_batch(events, known_world)
+
+    assert [r.outcome for r in results] == [EventOutcome.ADDED] * 4
+    assert known_world.resolve_person_by_email_and_uid.await_count == 2
+    assert known_world.get_group_by_name.await_count == 2
+    known_world.add_people_to_groups.assert_awaited_once()
+    members = known_world.add_people_to_groups.await_args.args[0]
+    assert [(m.Person.Id, m.CoGroupId) for m in members] == [
+        (1, 101),
+        (1, 102),
+        (2, 101),
+        (2, 102),
+    ]
+
+
+async def test_process_batch_reports_outcomes_individually(known_world):
+    settings.create_groups_for_resources = ["urn:allowed:*"]
+    load_resource_policy()
+    known_world.add_people_to_groups.side_effect = None
+    known_world.add_people_to_groups.return_value = [
+        AlreadyMemberOfGroup("already"),
+        COmanageAPIError("boom"),
+    ]
+    events = [
+        make_event(ApproveEvent, "alice", "urn:a"),
+        make_event(ApproveEvent, "alice", "urn:b"),
+        make_event(ApproveEvent, "nobody", "urn:a"),
+        make_event(ApproveEvent, "malice", "urn:disallowed"),
+        make_event(RevokeEvent, "malice", "urn:missing"),
+    ]
+
+    results = await process_batch(events, known_world)
+
+    assert [r.outcome for r in results] == [
+        EventOutcome.ALREADY_MEMBER,
+        EventOutcome.FAILED,
+        EventOutcome.PERSON_NOT_FOUND,
+        EventOutcome.GROUP_NOT_FOUND,
+        EventOutcome.GROUP_NOT_FOUND,
+    ]
+    assert isinstance(results[1].error, COmanageAPIError)
+    known_world.create_group.assert_not_awaited()
+
+
+async def test_process_batch_creates_each_missing_group_once(known_world):
+    settings.create_groups_for_resources = ["*"]
+    load_resource_policy()
+    known_world.create_group.return_value = Group(id=103, name="urn:new")
+    events = [
+        make_event(ApproveEvent, "alice", "urn:new"),
+        make_event(ApproveEvent, "malice", "urn:new"),
+    ]
+
+    results = await process_batch(events, known_world)
+
+    assert [r.outcome for r in results] == [EventOutcome.ADDED] * 2
+    known_world.create_group.assert_awaited_once_with("urn:new")
+
+
+async def test_process_batch_applies_revocations_in_order(known_world):
+    events = [
+        make_event(RevokeEvent, "alice", "urn:a"),
+        make_event(RevokeEvent, "malice", "urn:b"),
+    ]
+
+    results = await process_batch(events, known_world)
+
+    assert [r.outcome for r in results] == [EventOutcome.REMOVED] * 2
+    assert [
+        call.kwargs for call in known_world.remove_person_from_group.await_args_list
+    ] == [{"person_id": 1, "group_id": 101}, {"person_id": 2, "group_id": 102}]
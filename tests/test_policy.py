@@ -0,0 +1,54 @@
+import fnmatch
+import itertools
+
+import pytest
+
+from rems_co.service.policy import ResourcePolicy, compile_policy
+
+PATTERNS = [
+    "urn:abc:*",
+    "urn:def:specific",
+    "urn:g?i:*",
+    "urn:[jk]lm:*x",
+    "urn:abc",
+    "*.doi",
+    "[!u]*",
+    "urn:odd[",
+    "",
+]
+
+RESOURCES = [
+    "urn:abc:foo",
+    "urn:abc:",
+    "urn:abc",
+    "urn:ab",
+    "urn:def:specific",
+    "urn:def:specific2",
+    "urn:ghi:x",
+    "urn:g:i:x",
+    "urn:jlm:ax",
+    "urn:klm:a\nx",
+    "urn:llm:ax",
+    "10.1/abc.doi",
+    "doi:1",
+    "urn:odd[",
+    "",
+    "urn:xyz:nomatch",
+]
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, len(PATTERNS)])
+def test_policy_agrees_with_fnmatch(size):
+    for patterns in itertools.combinations(PATTERNS, size):
+        policy = ResourcePolicy(patterns)
+        for resource in RESOURCES:
+            expected = any(fnmatch.fnmatch(resource, p) for p in patterns)
+            assert policy.matches(resource) == expected, (patterns, resource)
+
+
+def test_star_matches_everything():
+    assert ResourcePolicy(["*"]).matches("anything at all")
+
+
+def test_compile_policy_is_cached():
+    assert compile_policy(("urn:a:*",)) is compile_policy(("urn:a:*",))
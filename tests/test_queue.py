@@ -0,0 +1,192 @@
+import asyncio
+from datetime import UTC, datetime
+
+import pytest
+
+from rems_co.exceptions import CircuitOpen
+from rems_co.models import ApproveEvent, EventOutcome, RevokeEvent
+from rems_co.service import event_queue
+from rems_co.service.dedup import DedupWindow
+from rems_co.service.event_queue import EventQueue
+from rems_co.service.planner import EventResult
+from rems_co.service.workers import QueueWorkers
+from rems_co.settings import settings
+from tests.conftest import make_event
+
+
+def test_queue_commits_are_fully_synced(queue):
+    # 2 is FULL: accepted events must survive a power failure, not just a crash.
+    assert queue.conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+
+
+async def test_claim_returns_oldest_event_per_key(queue):
+    await queue.put(
+        [
+            make_event(ApproveEvent, "alice", "urn:a"),
+            make_event(ApproveEvent, "alice", "urn:b"),
+            make_event(RevokeEvent, "alice", "urn:a"),
+        ]
+    )
+
+    first = await queue.claim(10)
+    assert [(type(i.event), i.event.resource) for i in first] == [
+        (ApproveEvent, "urn:a"),
+        (ApproveEvent, "urn:b"),
+    ]
+    assert await queue.claim(10) == []
+
+    await queue.complete([first[0].id])
+    second = await queue.claim(10)
+    assert [(type(i.event), i.event.resource) for i in second] == [
+        (RevokeEvent, "urn:a")
+    ]
+
+
+async def test_retry_delays_event_and_counts_attempts(queue):
+    await queue.put([make_event(ApproveEvent, "alice", "urn:a")])
+    [item] = await queue.claim(10)
+
+    await queue.retry(item, delay=3600)
+    assert await queue.claim(10) == []
+
+    await queue.retry(item, delay=0)
+    [again] = await queue.claim(10)
+    assert again.attempts == 2
+
+
+async def test_recent_people_stops_reading_once_enough_are_found(mocker, queue):
+    await queue.put(
+        [make_event(ApproveEvent, f"old{i}", "urn:a") for i in range(50)]
+        + [make_event(ApproveEvent, "bob", "urn:a")]
+        + [make_event(ApproveEvent, "alice", f"urn:{i}") for i in range(3)]
+    )
+    parse = mocker.spy(event_queue, "_parse_event")
+
+    people = await queue.recent_people(2)
+
+    assert people == [("alice@example.com", "alice"), ("bob@example.com", "bob")]
+    assert parse.call_count == 4
+
+
+async def test_reopen_releases_claimed_events(tmp_path):
+    path = str(tmp_path / "queue.db")
+    first = EventQueue(path)
+    first.open()
+    await first.put([make_event(ApproveEvent, "alice", "urn:a")])
+    assert len(await first.claim(10)) == 1
+    first.close()
+
+    second = EventQueue(path)
+    second.open()
+    assert len(await second.claim(10)) == 1
+    second.close()
+
+
+async def test_worker_completes_retries_and_dead_letters(mocker, queue, monkeypatch):
+    monkeypatch.setattr(settings, "event_queue_max_attempts", 2)
+    monkeypatch.setattr(settings, "event_queue_retry_backoff", 0)
+    ok = make_event(ApproveEvent, "alice", "urn:a")
+    bad = make_event(ApproveEvent, "malice", "urn:a")
+
+    async def process(events, api):
+        return [
+            EventResult(
+                e,
+                EventOutcome.FAILED if e.user == "malice" else EventOutcome.ADDED,
+                error=RuntimeError("boom"),
+            )
+            for e in events
+        ]
+
+    mocker.patch("rems_co.service.workers.process_batch", side_effect=process)
+    await queue.put([ok, bad])
+    workers = QueueWorkers(queue, api=mocker.Mock(), count=1)
+
+    assert await workers.drain_once() == 2
+    assert await queue.depth() == 1
+    assert await workers.drain_once() == 1
+    assert await queue.depth() == 0
+    assert await workers.drain_once() == 0
+
+
+async def test_worker_defers_circuit_open_without_using_attempt(mocker, queue):
+    event = make_event(ApproveEvent, "alice", "urn:a")
+
+    async def process(events, api):
+        return [
+            EventResult(e, EventOutcome.FAILED, error=CircuitOpen("open", 0))
+            for e in events
+        ]
+
+    mocker.patch("rems_co.service.workers.process_batch", side_effect=process)
+    await queue.put([event])
+    workers = QueueWorkers(queue, api=mocker.Mock(), count=1)
+
+    await workers.drain_once()
+
+    [item] = await queue.claim(10)
+    assert item.attempts == 0
+
+
+async def test_worker_skips_and_completes_repeats(mocker, queue):
+    event = make_event(ApproveEvent, "alice", "urn:a")
+
+    async def process(events, api):
+        return [EventResult(e, EventOutcome.ADDED) for e in events]
+
+    mock_process = mocker.patch(
+        "rems_co.service.workers.process_batch", side_effect=process
+    )
+    workers = QueueWorkers(queue, api=mocker.Mock(), count=1, dedup=DedupWindow(60))
+
+    await queue.put([event])
+    await workers.drain_once()
+    await queue.put([event])
+    assert await workers.drain_once() == 1
+
+    assert await queue.depth() == 0
+    assert mock_process.call_args_list[-1].args[0] == []
+
+
+async def test_coalescing_hands_out_only_the_net_effect(tmp_path):
+    queue = EventQueue(str(tmp_path / "queue.db"), coalesce_seconds=0.05)
+    queue.open()
+    first = make_event(ApproveEvent, "alice", "urn:a")
+    later = first.model_copy(update={"end": datetime(2030, 1, 1, tzinfo=UTC)})
+    await queue.put([first, later, make_event(ApproveEvent, "bob", "urn:a")])
+    await queue.put([make_event(RevokeEvent, "bob", "urn:a")])
+
+    assert await queue.claim(10) == []
+    await asyncio.sleep(0.06)
+    items = await queue.claim(10)
+
+    assert [(i.event.user, type(i.event)) for i in items] == [
+        ("alice", ApproveEvent),
+        ("bob", RevokeEvent),
+    ]
+    assert items[0].event.end == later.end
+    assert await queue.depth() == 2
+    queue.close()
+
+
+async def test_worker_releases_claimed_events_when_handling_fails(
+    mocker, queue, monkeypatch
+):
+    monkeypatch.setattr(settings, "event_queue_retry_backoff", 0)
+    event = make_event(ApproveEvent, "alice", "urn:a")
+
+    async def process(events, api):
+        return [EventResult(e, EventOutcome.ADDED) for e in events]
+
+    mocker.patch("rems_co.service.workers.process_batch", side_effect=process)
+    expiry = mocker.Mock(observe=mocker.AsyncMock(side_effect=RuntimeError("db")))
+    await queue.put([event])
+    workers = QueueWorkers(queue, api=mocker.Mock(), count=1, expiry=expiry)
+
+    with pytest.raises(RuntimeError):
+        await workers.drain_once()
+    await queue.put([event])
+
+    [item] = await queue.claim(10)
+    assert item.attempts == 1
+    assert await queue.depth() == 2
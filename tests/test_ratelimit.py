@@ -0,0 +1,56 @@
+import time
+
+import httpx
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.comanage_api.ratelimit import AdaptiveRateLimiter, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("not a date") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+async def test_acquire_spaces_requests_beyond_burst():
+    limiter = AdaptiveRateLimiter(max_rate=50, burst=1, min_rate=1)
+
+    start = time.monotonic()
+    for _ in range(3):
+        await limiter.acquire()
+
+    assert time.monotonic() - start >= 0.035
+
+
+def test_throttling_cuts_rate_and_success_recovers():
+    limiter = AdaptiveRateLimiter(max_rate=20, burst=5, min_rate=4)
+
+    limiter.throttled(retry_after=None)
+    assert limiter.rate == 10
+    limiter.throttled(retry_after=None)
+    limiter.throttled(retry_after=None)
+    assert limiter.rate == 4
+
+    for _ in range(100):
+        limiter.succeeded()
+    assert limiter.rate == 20
+
+
+async def test_throttled_response_is_retried(mocker):
+    request = httpx.Request("GET", "http://x/co_groups.json")
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0"}, request=request),
+        httpx.Response(503, request=request),
+        httpx.Response(200, json={}, request=request),
+    ]
+
+    client = CoManageClient()
+    mocker.patch("asyncio.sleep")
+    mock_request = mocker.patch.object(client.client, "request", side_effect=responses)
+
+    response = await client._get("/co_groups.json")
+
+    assert response.status_code == 200
+    assert mock_request.await_count == 3
+    assert client.rate_limiter.rate < client.rate_limiter.max_rate
@@ -0,0 +1,133 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from rems_co.cli import reconcile_main
+from rems_co.comanage_api.models import CoGroupMember, PersonRef
+from rems_co.exceptions import COmanageAPIError, PersonNotFound
+from rems_co.models import ApproveEvent, Group, Person
+from rems_co.service.reconcile import ReconcileReport, group_entitlements, reconcile
+
+FUTURE = datetime.now(UTC) + timedelta(days=30)
+
+
+def entitlement(user, resource, end=FUTURE):
+    return ApproveEvent(
+        application=24,
+        resource=resource,
+        user=user,
+        mail=f"{user}@example.com",
+        end=end,
+    )
+
+
+@pytest.fixture
+def registry(mock_client):
+    people = {"alice": 1, "bob": 2, "carol": 3}
+    groups = {"urn:a": 101}
+    members = {101: [(501, 1), (502, 4)]}  # alice, plus someone not entitled
+
+    async def resolve(email, uid):
+        if uid not in people:
+            raise PersonNotFound(f"No match for email={email}")
+        return Person(id=people[uid], email=email, identifier=uid)
+
+    async def get_group(name):
+        return Group(id=groups[name], name=name) if name in groups else None
+
+    async def iter_members(group_id):
+        for member_id, person_id in members.get(group_id, []):
+            yield CoGroupMember(Id=member_id, Person=PersonRef(Id=person_id))
+
+    async def add_all(payloads):
+        return [None] * len(payloads)
+
+    mock_client.resolve_person_by_email_and_uid.side_effect = resolve
+    mock_client.get_group_by_name.side_effect = get_group
+    mock_client.iter_group_members.side_effect = iter_members
+    mock_client.add_people_to_groups.side_effect = add_all
+    return mock_client
+
+
+def test_group_entitlements_drops_expired_and_keeps_longest():
+    later = FUTURE + timedelta(days=1)
+    grouped = group_entitlements(
+        [
+            entitlement("alice", "urn:a"),
+            entitlement("alice", "urn:a", end=later),
+            entitlement("bob", "urn:a", end=datetime(2000, 1, 1, tzinfo=UTC)),
+        ]
+    )
+    assert [(e.user, e.end) for e in grouped["urn:a"]] == [("alice", later)]
+
+
+async def test_reconcile_applies_only_the_difference(registry):
+    report = await reconcile(
+        [entitlement("alice", "urn:a"), entitlement("bob", "urn:a")], registry
+    )
+
+    [payloads] = registry.add_people_to_groups.call_args.args
+    assert [(p.CoGroupId, p.Person.Id) for p in payloads] == [(101, 2)]
+    registry.delete_membership.assert_awaited_once_with(502)
+    assert (report.unchanged, report.added, report.removed, report.failed) == (
+        1,
+        1,
+        1,
+        0,
+    )
+
+
+async def test_reconcile_keeps_every_record_of_an_entitled_person(registry):
+    async def iter_members(group_id):
+        for member_id, person_id in [(501, 1), (503, 1), (502, 4)]:
+            yield CoGroupMember(Id=member_id, Person=PersonRef(Id=person_id))
+
+    registry.iter_group_members.side_effect = iter_members
+
+    report = await reconcile([entitlement("alice", "urn:a")], registry)
+
+    registry.delete_membership.assert_awaited_once_with(502)
+    assert (report.unchanged, report.added, report.removed) == (1, 0, 1)
+
+
+async def test_reconcile_dry_run_changes_nothing(registry):
+    report = await reconcile(
+        [entitlement("bob", "urn:a"), entitlement("dave", "urn:a")],
+        registry,
+        dry_run=True,
+    )
+
+    registry.add_people_to_groups.assert_not_called()
+    registry.delete_membership.assert_not_called()
+    assert (report.added, report.removed, report.person_not_found) == (1, 2, 1)
+
+
+async def test_reconcile_skips_group_when_lookup_fails(registry):
+    registry.resolve_person_by_email_and_uid.side_effect = COmanageAPIError("boom")
+
+    report = await reconcile([entitlement("alice", "urn:a")], registry)
+
+    registry.delete_membership.assert_not_called()
+    assert report.failed == 1
+
+
+async def test_reconcile_empties_explicit_group_without_entitlements(registry):
+    report = await reconcile([], registry, groups=["urn:a"])
+
+    assert registry.delete_membership.await_count == 2
+    assert report.removed == 2
+
+
+def test_cli_reports_dry_run(mocker, tmp_path, capsys):
+    dump = tmp_path / "entitlements.json"
+    dump.write_text(f"[{entitlement('alice', 'urn:a').model_dump_json()}]")
+    run = mocker.patch(
+        "rems_co.cli._reconcile", return_value=ReconcileReport(dry_run=True)
+    )
+
+    assert reconcile_main([str(dump), "--dry-run", "--group", "urn:b"]) == 0
+
+    entitlements, groups, dry_run = run.call_args.args
+    assert [e.user for e in entitlements] == ["alice"]
+    assert (groups, dry_run) == (["urn:b"], True)
+    assert '"dry_run": true' in capsys.readouterr().out
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from rems_co.comanage_api.client import CoManageClient
+from rems_co.comanage_api.models import CoGroupsResponse, NewObjectResponse
+from rems_co.comanage_api.singleflight import SingleFlight
+from rems_co.models import Person
+
+
+def slow(result):
+    async def call(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return result
+
+    return call
+
+
+async def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+
+    assert results == [1] * 5
+    assert flight.in_flight() == 0
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    first = asyncio.create_task(flight.do("k", fetch))
+    second = asyncio.create_task(flight.do("k", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_concurrent_group_lookups_share_one_listing(mocker):
+    listing = mocker.Mock()
+    listing.content = CoGroupsResponse(CoGroups=[]).model_dump_json()
+    mock_get = mocker.patch.object(CoManageClient, "_get", side_effect=slow(listing))
+
+    client = CoManageClient()
+    await asyncio.gather(
+        client.get_group_by_name("urn:a"), client.get_group_by_name("urn:b")
+    )
+
+    assert mock_get.await_count == 1
+
+
+async def test_concurrent_creates_collapse_into_one_post(mocker):
+    created = mocker.Mock()
+    created.content = NewObjectResponse(ObjectType="CoGroup", Id=42).model_dump_json()
+    mock_post = mocker.patch.object(CoManageClient, "_post", side_effect=slow(created))
+    mock_get = mocker.patch.object(CoManageClient, "_get", return_value=mocker.Mock())
+    mock_get.return_value.content = CoGroupsResponse(CoGroups=[]).model_dump_json()
+
+    client = CoManageClient()
+    groups = await asyncio.gather(*(client.create_group("urn:new") for _ in range(3)))
+    assert {g.id for g in groups} == {42}
+
+    await client.create_group("urn:new")
+    assert mock_post.await_count == 1
+
+
+async def test_concurrent_person_lookups_share_one_resolution(mocker):
+    person = Person(id=1, email="a@b.com", identifier="uid")
+    mock_resolve = mocker.patch.object(
+        CoManageClient, "_resolve_person", side_effect=slow(person)
+    )
+
+    client = CoManageClient()
+    results = await asyncio.gather(
+        *(client.resolve_person_by_email_and_uid("a@b.com", "uid") for _ in range(3))
+    )
+
+    assert results == [person] * 3
+    assert mock_resolve.await_count == 1
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from rems_co import tracing
+from rems_co.models import ApproveEvent, Group, Person
+from rems_co.service.planner import process_batch
+from rems_co.settings import settings
+from rems_co.tracing import OtlpExporter, Span, span
+
+EVENT = ApproveEvent(
+    application=24,
+    resource="urn:a",
+    user="alice",
+    mail="alice@example.com",
+    end=None,
+)
+
+
+@pytest.fixture
+def jsonl_tracing(monkeypatch, tmp_path):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "trace_exporter", "jsonl")
+    monkeypatch.setattr(settings, "trace_jsonl_path", str(path))
+    monkeypatch.setattr(settings, "trace_slow_threshold_ms", 0)
+    tracing.configure_tracing()
+    yield path
+    monkeypatch.setattr(tracing, "_tracer", None)
+
+
+def read_spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_span_is_noop_when_disabled():
+    with span("anything", key="value") as s:
+        s.set("more", 1)
+    assert not isinstance(s, Span)
+
+
+async def test_process_batch_exports_span_tree(jsonl_tracing, mock_client):
+    mock_client.resolve_person_by_email_and_uid.return_value = Person(
+        id=1, email="alice@example.com", identifier="alice"
+    )
+    mock_client.get_group_by_name.return_value = Group(id=10, name="urn:a")
+    mock_client.add_people_to_groups.return_value = [None]
+
+    await process_batch([EVENT], mock_client)
+
+    spans = {s["name"]: s for s in read_spans(jsonl_tracing)}
+    root = spans["process_batch"]
+    assert root["parent_id"] is None
+    assert root["attributes"]["events"] == 1
+    for step, parent in [
+        ("plan_batch", "process_batch"),
+        ("resolve_person", "plan_batch"),
+        ("resolve_group", "plan_batch"),
+        ("add_members", "process_batch"),
+    ]:
+        assert spans[step]["parent_id"] == spans[parent]["span_id"]
+        assert spans[step]["trace_id"] == root["trace_id"]
+
+
+async def test_fast_traces_are_not_exported(jsonl_tracing, monkeypatch):
+    monkeypatch.setattr(tracing._tracer, "slow_threshold_ms", 60_000)
+
+    with span("fast"):
+        pass
+
+    assert not jsonl_tracing.exists()
+
+
+def test_failed_span_records_error(jsonl_tracing):
+    with pytest.raises(ValueError), span("broken"):
+        raise ValueError("boom")
+
+    [record] = read_spans(jsonl_tracing)
+    assert record["error"] == "ValueError: boom"
+
+
+def test_otlp_payload_encodes_parent_and_attributes():
+    with Span("root", None, {"events": 2}) as root, Span("child", root, {}) as child:
+        pass
+
+    payload = OtlpExporter("http://collector/v1/traces").payload([child, root])
+    [encoded_child, encoded_root] = payload["resourceSpans"][0]["scopeSpans"][0][
+        "spans"
+    ]
+    assert encoded_child["parentSpanId"] == root.span_id
+    assert encoded_child["traceId"] == encoded_root["traceId"]
+    assert "parentSpanId" not in encoded_root
+    assert encoded_root["attributes"] == [{"key": "events", "value": {"intValue": "2"}}]
@@ -0,0 +1,73 @@
+import asyncio
+
+from rems_co.exceptions import PersonNotFound
+from rems_co.models import ApproveEvent, Person
+from rems_co.service.warmup import WarmUp, warm_up
+from rems_co.settings import settings
+from tests.conftest import make_event
+
+
+async def test_warm_up_opens_connections_and_fills_caches(
+    mock_client, queue, monkeypatch
+):
+    monkeypatch.setattr(settings, "prewarm_connections", 3)
+    monkeypatch.setattr(settings, "prewarm_people", 2)
+    mock_client.group_index = []
+    await queue.put(
+        [
+            make_event(ApproveEvent, "alice", "urn:a"),
+            make_event(ApproveEvent, "bob", "urn:a"),
+            make_event(ApproveEvent, "bob", "urn:b"),
+        ]
+    )
+    await queue.put([make_event(ApproveEvent, "carol", "urn:a")])
+    mock_client.resolve_person_by_email_and_uid.side_effect = [
+        Person(id=1, email="carol@example.com", identifier="carol"),
+        PersonNotFound("gone"),
+    ]
+
+    await warm_up(mock_client, queue)
+
+    mock_client.open_connections.assert_awaited_once_with(3)
+    mock_client.refresh_group_index.assert_awaited_once()
+    looked_up = [c.args for c in mock_client.resolve_person_by_email_and_uid.mock_calls]
+    assert looked_up == [("carol@example.com", "carol"), ("bob@example.com", "bob")]
+
+
+async def test_warm_up_tolerates_failed_steps(mock_client, queue):
+    mock_client.group_index = []
+    mock_client.open_connections.side_effect = OSError("refused")
+
+    await warm_up(mock_client, queue)
+
+    mock_client.refresh_group_index.assert_awaited_once()
+
+
+async def test_ready_after_warm_up_times_out(mock_client, queue, monkeypatch):
+    monkeypatch.setattr(settings, "prewarm_timeout_seconds", 0.01)
+    mock_client.group_index = []
+    loading = asyncio.Event()
+
+    async def slow_refresh() -> None:
+        loading.set()
+        await asyncio.sleep(1)
+
+    mock_client.refresh_group_index.side_effect = slow_refresh
+    warmup = WarmUp(mock_client, queue)
+
+    warmup.start()
+    await loading.wait()
+    assert not warmup.ready
+    await asyncio.sleep(0.05)
+
+    assert warmup.ready
+    await warmup.stop()
+
+
+def test_ready_at_once_when_disabled(mock_client, queue, monkeypatch):
+    monkeypatch.setattr(settings, "prewarm_enabled", False)
+    warmup = WarmUp(mock_client, queue)
+
+    warmup.start()
+
+    assert warmup.ready